@@ -0,0 +1,338 @@
+"""
+Playwright 浏览器池 - 进程级共享
+功能：
+1. 长驻 Chromium 实例，避免每次爬取冷启动 playwright + 浏览器
+2. 按站点(key)缓存预热的 BrowserContext，爬虫租用/归还
+3. 健康检查：浏览器断连、页面关闭、页面无响应时自动丢弃重建
+4. 回收策略：上下文使用 N 次后关闭重建，浏览器创建 N 个上下文后重启
+
+用法：
+    pool = get_browser_pool()
+    lease = await pool.acquire('openvlab')
+    try:
+        await lease.page.goto(...)
+    finally:
+        await pool.release(lease)
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict, Callable, Awaitable
+from playwright.async_api import async_playwright, Playwright, Browser, BrowserContext, Page
+from config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# 所有爬虫共用的默认上下文参数
+DEFAULT_CONTEXT_OPTIONS = {
+    'viewport': {'width': 1920, 'height': 1080},
+    'user_agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+}
+
+DEFAULT_LAUNCH_ARGS = ['--no-sandbox', '--disable-setuid-sandbox']
+
+
+@dataclass
+class _PooledBrowser:
+    """池内浏览器实例"""
+    browser: Browser
+    headless: bool
+    contexts_created: int = 0
+    active_contexts: int = 0
+    retiring: bool = False
+
+
+@dataclass
+class BrowserLease:
+    """租用凭证 - 爬虫通过 page/context 操作浏览器"""
+    key: str
+    context: BrowserContext
+    page: Page
+    owner: _PooledBrowser
+    uses: int = 0
+    created_at: float = field(default_factory=time.time)
+
+    @property
+    def browser(self) -> Browser:
+        return self.owner.browser
+
+
+class BrowserPool:
+    """进程级 Playwright 浏览器池"""
+
+    def __init__(
+        self,
+        max_browsers: int = 1,
+        max_contexts: int = 4,
+        max_context_uses: int = 50,
+        max_browser_contexts: int = 200,
+        health_check_timeout: float = 5.0
+    ):
+        """
+        Args:
+            max_browsers: 每种模式(headless/有界面)最多启动的浏览器数
+            max_contexts: 同时租出的上下文上限
+            max_context_uses: 单个上下文最多复用次数，超过后关闭重建
+            max_browser_contexts: 单个浏览器最多创建的上下文数，超过后重启浏览器
+            health_check_timeout: 健康检查超时（秒）
+        """
+        self.max_browsers = max_browsers
+        self.max_contexts = max_contexts
+        self.max_context_uses = max_context_uses
+        self.max_browser_contexts = max_browser_contexts
+        self.health_check_timeout = health_check_timeout
+
+        self._playwright: Optional[Playwright] = None
+        self._browsers: List[_PooledBrowser] = []
+        self._idle: Dict[str, List[BrowserLease]] = {}
+        self._lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(max_contexts)
+
+    # ----------------------------------------
+    # 租用 / 归还
+    # ----------------------------------------
+    async def acquire(
+        self,
+        key: str,
+        headless: bool = True,
+        context_options: Optional[Dict] = None,
+        on_create: Optional[Callable[[BrowserContext], Awaitable[None]]] = None
+    ) -> BrowserLease:
+        """
+        租用一个上下文
+
+        Args:
+            key: 站点标识，同一 key 复用同一批预热上下文（保留cookies/登录态）
+            headless: 是否无头模式
+            context_options: new_context 参数，仅在新建上下文时生效
+            on_create: 新建上下文后的初始化回调（如注入cookies）
+        """
+        await self._semaphore.acquire()
+        try:
+            lease = await self._take_idle(key, headless)
+            if lease is None:
+                lease = await self._create_lease(key, headless, context_options, on_create)
+            return lease
+        except Exception:
+            self._semaphore.release()
+            raise
+
+    async def release(self, lease: BrowserLease, discard: bool = False):
+        """
+        归还上下文
+
+        Args:
+            lease: acquire 返回的租用凭证
+            discard: 强制丢弃（如爬取过程中页面状态异常）
+        """
+        try:
+            lease.uses += 1
+            if discard or lease.uses >= self.max_context_uses or not self._is_alive(lease):
+                await self._dispose(lease)
+                return
+
+            # 关闭爬虫额外打开的页面，只保留主页面
+            for page in list(lease.context.pages):
+                if page is not lease.page:
+                    try:
+                        await page.close()
+                    except Exception:
+                        pass
+
+            async with self._lock:
+                self._idle.setdefault(lease.key, []).append(lease)
+        finally:
+            self._semaphore.release()
+
+    async def warmup(self, keys: List[str], headless: bool = True):
+        """预热：启动浏览器并为每个 key 准备一个空闲上下文"""
+        for key in keys:
+            lease = await self.acquire(key, headless=headless)
+            await self.release(lease)
+        logger.info(f"浏览器池预热完成: {keys}")
+
+    async def close(self):
+        """关闭池内所有上下文和浏览器"""
+        async with self._lock:
+            idle = [lease for leases in self._idle.values() for lease in leases]
+            self._idle.clear()
+            browsers = list(self._browsers)
+            self._browsers.clear()
+
+        for lease in idle:
+            await self._close_context(lease)
+        for pooled in browsers:
+            await self._close_browser(pooled)
+
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+        logger.info("浏览器池已关闭")
+
+    def stats(self) -> Dict:
+        """池状态（用于监控）"""
+        return {
+            "browsers": [
+                {
+                    "headless": b.headless,
+                    "connected": b.browser.is_connected(),
+                    "contexts_created": b.contexts_created,
+                    "active_contexts": b.active_contexts,
+                }
+                for b in self._browsers
+            ],
+            "idle": {key: len(leases) for key, leases in self._idle.items()},
+        }
+
+    # ----------------------------------------
+    # 内部实现
+    # ----------------------------------------
+    async def _take_idle(self, key: str, headless: bool) -> Optional[BrowserLease]:
+        """取出一个健康的空闲上下文"""
+        while True:
+            async with self._lock:
+                leases = self._idle.get(key, [])
+                index = next(
+                    (i for i in range(len(leases) - 1, -1, -1) if leases[i].owner.headless == headless),
+                    None
+                )
+                if index is None:
+                    return None
+                lease = leases.pop(index)
+
+            if await self._health_check(lease):
+                return lease
+            logger.info(f"浏览器池: {key} 上下文健康检查失败，丢弃重建")
+            await self._dispose(lease)
+
+    async def _create_lease(
+        self,
+        key: str,
+        headless: bool,
+        context_options: Optional[Dict],
+        on_create: Optional[Callable[[BrowserContext], Awaitable[None]]]
+    ) -> BrowserLease:
+        """在可用浏览器上新建上下文"""
+        async with self._lock:
+            owner = await self._pick_browser(headless)
+            owner.contexts_created += 1
+            owner.active_contexts += 1
+            if owner.contexts_created >= self.max_browser_contexts:
+                owner.retiring = True
+
+        try:
+            context = await owner.browser.new_context(**(context_options or DEFAULT_CONTEXT_OPTIONS))
+            if on_create:
+                await on_create(context)
+            page = await context.new_page()
+        except Exception:
+            owner.active_contexts -= 1
+            await self._maybe_retire(owner)
+            raise
+
+        logger.info(f"浏览器池: 新建 {key} 上下文")
+        return BrowserLease(key=key, context=context, page=page, owner=owner)
+
+    async def _pick_browser(self, headless: bool) -> _PooledBrowser:
+        """选择负载最低的浏览器，必要时启动新实例（需持有锁）"""
+        candidates = [
+            b for b in self._browsers
+            if b.headless == headless and not b.retiring and b.browser.is_connected()
+        ]
+        if candidates and (
+            len(candidates) >= self.max_browsers
+            or min(b.active_contexts for b in candidates) == 0
+        ):
+            return min(candidates, key=lambda b: b.active_contexts)
+
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+
+        browser = await self._playwright.chromium.launch(
+            headless=headless,
+            args=DEFAULT_LAUNCH_ARGS
+        )
+        pooled = _PooledBrowser(browser=browser, headless=headless)
+        self._browsers.append(pooled)
+        logger.info(f"浏览器池: 启动 Chromium (headless={headless})，当前 {len(self._browsers)} 个")
+        return pooled
+
+    def _is_alive(self, lease: BrowserLease) -> bool:
+        return lease.owner.browser.is_connected() and not lease.page.is_closed()
+
+    async def _health_check(self, lease: BrowserLease) -> bool:
+        """检查浏览器连接和页面响应"""
+        if lease.owner.retiring or not self._is_alive(lease):
+            return False
+        try:
+            await asyncio.wait_for(lease.page.evaluate("1"), timeout=self.health_check_timeout)
+            return True
+        except Exception:
+            return False
+
+    async def _dispose(self, lease: BrowserLease):
+        """关闭上下文，并在浏览器退役且空闲时关闭浏览器"""
+        await self._close_context(lease)
+        async with self._lock:
+            lease.owner.active_contexts -= 1
+        await self._maybe_retire(lease.owner)
+
+    async def _maybe_retire(self, owner: _PooledBrowser):
+        async with self._lock:
+            idle_on_owner = [
+                lease for leases in self._idle.values() for lease in leases if lease.owner is owner
+            ]
+            should_close = (
+                (owner.retiring or not owner.browser.is_connected())
+                and owner.active_contexts - len(idle_on_owner) <= 0
+            )
+            if not should_close:
+                return
+            for leases in self._idle.values():
+                leases[:] = [lease for lease in leases if lease.owner is not owner]
+            if owner in self._browsers:
+                self._browsers.remove(owner)
+
+        for lease in idle_on_owner:
+            await self._close_context(lease)
+        await self._close_browser(owner)
+        logger.info("浏览器池: 浏览器已回收")
+
+    async def _close_context(self, lease: BrowserLease):
+        try:
+            await lease.context.close()
+        except Exception as e:
+            logger.debug(f"关闭上下文失败: {e}")
+
+    async def _close_browser(self, pooled: _PooledBrowser):
+        try:
+            await pooled.browser.close()
+        except Exception as e:
+            logger.debug(f"关闭浏览器失败: {e}")
+
+
+# 全局单例
+_browser_pool: Optional[BrowserPool] = None
+
+
+def get_browser_pool() -> BrowserPool:
+    """获取浏览器池单例"""
+    global _browser_pool
+    if _browser_pool is None:
+        settings = get_settings()
+        _browser_pool = BrowserPool(
+            max_browsers=settings.BROWSER_POOL_MAX_BROWSERS,
+            max_contexts=settings.BROWSER_POOL_MAX_CONTEXTS,
+            max_context_uses=settings.BROWSER_POOL_MAX_CONTEXT_USES,
+            max_browser_contexts=settings.BROWSER_POOL_MAX_BROWSER_CONTEXTS
+        )
+    return _browser_pool
+
+
+async def close_browser_pool():
+    """关闭浏览器池（应用退出时调用）"""
+    global _browser_pool
+    if _browser_pool is not None:
+        await _browser_pool.close()
+        _browser_pool = None
@@ -9,7 +9,9 @@ import asyncio
 import logging
 from datetime import datetime, date
 from typing import Optional, List, Dict
-from playwright.async_api import async_playwright, Page, Browser
+from playwright.async_api import Page, Browser
+from app.crawlers.browser_pool import get_browser_pool, close_browser_pool, BrowserLease
+from app.services.rate_limiter import TokenBucket
 from config.settings import get_settings
 from pathlib import Path
 import json
@@ -42,6 +44,7 @@ class JiaoyiKechaSpider:
         self.settings = settings
         self.browser: Optional[Browser] = None
         self.page: Optional[Page] = None
+        self.lease: Optional[BrowserLease] = None
         self.is_logged_in = False
         self.save_dir = Path(__file__).parent.parent.parent / "交易可查" / "images"
         self.save_dir.mkdir(parents=True, exist_ok=True)
@@ -53,17 +56,10 @@ class JiaoyiKechaSpider:
         )
 
     async def init_browser(self, headless: bool = True):
-        """初始化浏览器"""
-        playwright = await async_playwright().start()
-        self.browser = await playwright.chromium.launch(
-            headless=headless,
-            args=['--no-sandbox', '--disable-setuid-sandbox']
-        )
-        context = await self.browser.new_context(
-            viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-        )
-        self.page = await context.new_page()
+        """从浏览器池租用上下文（池内上下文保留登录态）"""
+        self.lease = await get_browser_pool().acquire('jiaoyikecha', headless=headless)
+        self.browser = self.lease.browser
+        self.page = self.lease.page
         logger.info("浏览器初始化成功")
 
     async def login(self) -> bool:
@@ -512,22 +508,28 @@ class JiaoyiKechaSpider:
             logger.error(f"分析图片失败: {e}")
             return None
 
-    async def fetch_variety_positions(self, variety_code: str) -> Optional[List[Dict]]:
+    async def fetch_variety_positions(
+        self,
+        variety_code: str,
+        page: Optional[Page] = None
+    ) -> Optional[List[Dict]]:
         """
         获取品种的席位持仓数据
         variety_code: 如 'rb' (螺纹钢)
+        page: 使用的页面，默认为主页面（并发抓取时每个worker传入自己的页面）
         """
+        page = page or self.page
         try:
             logger.info(f"开始获取 {variety_code} 的席位数据...")
 
             url = f"https://www.jiaoyikecha.com/#/variety/structure?code={variety_code}"
             # 增加超时时间
-            await self.page.goto(url, wait_until="networkidle", timeout=30000)
-            await self.page.wait_for_timeout(5000)
+            await page.goto(url, wait_until="networkidle", timeout=30000)
+            await page.wait_for_timeout(5000)
 
             # 等待表格加载
             try:
-                await self.page.wait_for_selector("table", timeout=20000)
+                await page.wait_for_selector("table", timeout=20000)
             except:
                 logger.warning(f"{variety_code} 未找到表格，尝试查找其他元素")
                 # 可能是数据未加载或需要点击某个tab
@@ -535,7 +537,7 @@ class JiaoyiKechaSpider:
 
             # 提取表格数据 - 针对特定席位
             # 目标席位: 东方财富, 国泰君安, 东证期货
-            positions = await self.page.evaluate("""
+            positions = await page.evaluate("""
                 () => {
                     const rows = document.querySelectorAll('table tbody tr');
                     const data = [];
@@ -571,11 +573,65 @@ class JiaoyiKechaSpider:
             logger.error(f"获取席位数据失败: {e}")
             return None
 
+    async def fetch_all_positions(
+        self,
+        variety_codes: List[str],
+        concurrency: int = 3,
+        rate_limiter: Optional[TokenBucket] = None
+    ) -> Dict[str, Optional[List[Dict]]]:
+        """
+        并发获取多个品种的席位持仓数据
+
+        在同一个已登录的上下文中打开 concurrency 个页面，各页面从队列中领取品种；
+        每次页面跳转前从站点令牌桶取令牌，控制对交易可查的整体请求速率。
+
+        Args:
+            variety_codes: 品种代码列表，如 ['rb', 'hc']
+            concurrency: 并发页面数，1 即为串行
+            rate_limiter: 站点令牌桶，为空则不限速
+        Returns:
+            {品种代码: 席位列表或None}
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        for code in variety_codes:
+            queue.put_nowait(code)
+
+        results: Dict[str, Optional[List[Dict]]] = {}
+        worker_count = max(1, min(concurrency, len(variety_codes)))
+
+        async def worker(page: Page):
+            while True:
+                try:
+                    code = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                if rate_limiter:
+                    await rate_limiter.acquire()
+                results[code] = await self.fetch_variety_positions(code, page=page)
+
+        # 主页面作为第一个worker，其余页面共享登录态
+        pages = [self.page]
+        try:
+            for _ in range(worker_count - 1):
+                pages.append(await self.page.context.new_page())
+            await asyncio.gather(*(worker(page) for page in pages))
+        finally:
+            for page in pages[1:]:
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+
+        return results
+
     async def close(self):
-        """关闭浏览器"""
-        if self.browser:
-            await self.browser.close()
-            logger.info("浏览器已关闭")
+        """归还浏览器上下文到浏览器池"""
+        if self.lease:
+            await get_browser_pool().release(self.lease)
+            self.lease = None
+            self.browser = None
+            self.page = None
+            logger.info("浏览器上下文已归还")
 
 
 async def main():
@@ -600,6 +656,7 @@ async def main():
 
     finally:
         await spider.close()
+        await close_browser_pool()
 
 
 if __name__ == "__main__":
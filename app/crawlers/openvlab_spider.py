@@ -8,7 +8,8 @@ import asyncio
 import logging
 from datetime import datetime, date
 from typing import Optional, List, Dict
-from playwright.async_api import async_playwright, Page, Browser
+from playwright.async_api import Page, Browser
+from app.crawlers.browser_pool import get_browser_pool, close_browser_pool, BrowserLease
 import httpx
 import json
 from pathlib import Path
@@ -23,6 +24,7 @@ class OpenvlabSpider:
         self.base_url = "https://www.openvlab.cn"
         self.browser: Optional[Browser] = None
         self.page: Optional[Page] = None
+        self.lease: Optional[BrowserLease] = None
         self.client = httpx.AsyncClient(
             headers={
                 "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36",
@@ -35,17 +37,10 @@ class OpenvlabSpider:
         self.save_dir.mkdir(parents=True, exist_ok=True)
 
     async def init_browser(self, headless: bool = True):
-        """初始化浏览器"""
-        playwright = await async_playwright().start()
-        self.browser = await playwright.chromium.launch(
-            headless=headless,
-            args=['--no-sandbox']
-        )
-        context = await self.browser.new_context(
-            viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-        )
-        self.page = await context.new_page()
+        """从浏览器池租用上下文"""
+        self.lease = await get_browser_pool().acquire('openvlab', headless=headless)
+        self.browser = self.lease.browser
+        self.page = self.lease.page
         logger.info("浏览器初始化成功")
 
     async def fetch_option_flow_data(self) -> List[Dict]:
@@ -75,8 +70,11 @@ class OpenvlabSpider:
 
             self.page.on("response", handle_response)
 
-            # 等待数据加载
-            await self.page.wait_for_timeout(5000)
+            # 等待数据加载（页面来自浏览器池，用完需移除监听器）
+            try:
+                await self.page.wait_for_timeout(5000)
+            finally:
+                self.page.remove_listener("response", handle_response)
 
             # 如果API拦截失败，尝试从页面提取
             if not api_data:
@@ -246,9 +244,12 @@ class OpenvlabSpider:
         logger.info(f"数据已保存至: {filepath}")
 
     async def close(self):
-        """关闭资源"""
-        if self.browser:
-            await self.browser.close()
+        """关闭资源（浏览器上下文归还到浏览器池）"""
+        if self.lease:
+            await get_browser_pool().release(self.lease)
+            self.lease = None
+            self.browser = None
+            self.page = None
         await self.client.aclose()
         logger.info("资源已释放")
 
@@ -278,6 +279,7 @@ async def main():
 
     finally:
         await spider.close()
+        await close_browser_pool()
 
 
 if __name__ == "__main__":
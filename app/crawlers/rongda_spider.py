@@ -8,7 +8,8 @@ import asyncio
 import logging
 from datetime import datetime, date
 from typing import Optional, List, Dict
-from playwright.async_api import async_playwright, Page, Browser
+from playwright.async_api import Page, Browser, BrowserContext
+from app.crawlers.browser_pool import get_browser_pool, close_browser_pool, BrowserLease
 import json
 from pathlib import Path
 
@@ -22,6 +23,7 @@ class RongdaSpider:
         self.base_url = "https://dt.rongdaqh.com"
         self.browser: Optional[Browser] = None
         self.page: Optional[Page] = None
+        self.lease: Optional[BrowserLease] = None
         self.save_dir = Path(__file__).parent.parent.parent / "融达数据" / "data"
         self.save_dir.mkdir(parents=True, exist_ok=True)
         # cookies文件路径
@@ -44,25 +46,22 @@ class RongdaSpider:
             return False
 
     async def init_browser(self, headless: bool = True):
-        """初始化浏览器"""
-        playwright = await async_playwright().start()
-        self.browser = await playwright.chromium.launch(
+        """从浏览器池租用上下文"""
+        self.lease = await get_browser_pool().acquire(
+            'rongda',
             headless=headless,
-            args=['--no-sandbox']
-        )
-        context = await self.browser.new_context(
-            viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+            on_create=self._inject_cookies
         )
+        self.browser = self.lease.browser
+        self.page = self.lease.page
+        logger.info("浏览器初始化成功")
 
-        # 加载cookies
+    async def _inject_cookies(self, context: BrowserContext):
+        """新建上下文时注入cookies"""
         if await self.load_cookies():
             await context.add_cookies(self.cookies)
             logger.info("cookies已注入到浏览器")
 
-        self.page = await context.new_page()
-        logger.info("浏览器初始化成功")
-
     async def login(self) -> bool:
         """登录融达数据 - 优先使用cookies"""
         try:
@@ -304,10 +303,13 @@ class RongdaSpider:
         logger.info(f"数据已保存至: {filepath}")
 
     async def close(self):
-        """关闭浏览器"""
-        if self.browser:
-            await self.browser.close()
-            logger.info("浏览器已关闭")
+        """归还浏览器上下文到浏览器池"""
+        if self.lease:
+            await get_browser_pool().release(self.lease)
+            self.lease = None
+            self.browser = None
+            self.page = None
+            logger.info("浏览器上下文已归还")
 
 
 async def main():
@@ -337,6 +339,7 @@ async def main():
 
     finally:
         await spider.close()
+        await close_browser_pool()
 
 
 if __name__ == "__main__":
@@ -3,7 +3,11 @@
 数据源:
 1. 仓单数据: DataAPI.MktFutWRdGet
 2. 持仓量数据: DataAPI.MktFutdGet
+
+批量模式(默认): 每个交易所各拉取一次仓单和日行情(3个交易所共6次调用),
+在pandas中按contractObject拆分并向量化计算所有品种的虚实比,最后一次性写库。
 """
+import numpy as np
 import pandas as pd
 import logging
 from datetime import datetime, timedelta, date
@@ -13,6 +17,7 @@ from sqlalchemy.orm import Session
 from app.models.models import WarehouseReceipt
 from app.models.database import SessionLocal
 from app.services.uqer_sdk_client import get_uqer_sdk_client
+from app.services.trading_calendar import get_trading_calendar
 from config.settings import get_settings
 
 logger = logging.getLogger(__name__)
@@ -372,12 +377,225 @@ class VirtualRealRatioSpiderUqer:
         logger.info(f"✅ {variety_name}虚实比数据保存成功: 虚实比={calc_result['ratio']:.2f}, 风险={calc_result['squeeze_risk']}")
         return True
 
-    def crawl_all_varieties(self) -> Dict[str, bool]:
+    # ========================================
+    # 批量模式
+    # ========================================
+    def fetch_exchange_frames(self, begin_date: str, end_date: str) -> Dict[str, Dict[str, pd.DataFrame]]:
+        """
+        按交易所批量拉取仓单和日行情
+
+        Args:
+            begin_date: 开始日期 YYYYMMDD
+            end_date: 结束日期 YYYYMMDD
+        Returns:
+            {交易所代码: {"warehouse": DataFrame, "daily": DataFrame}}，拉取失败的交易所不在结果中
+        """
+        frames = {}
+        exchanges = sorted({item[3] for item in VARIETY_MAPPING.values()})
+
+        for exchange_cd in exchanges:
+            warehouse_df = self.uqer_client.get_warehouse_receipt(
+                exchange_cd=exchange_cd,
+                begin_date=begin_date,
+                end_date=end_date
+            )
+            daily_df = self.uqer_client.get_futures_daily(
+                exchange_cd=exchange_cd,
+                begin_date=begin_date,
+                end_date=end_date
+            )
+            if warehouse_df is None or daily_df is None:
+                logger.warning(f"{exchange_cd} 批量数据为空,该交易所品种跳过")
+                continue
+
+            frames[exchange_cd] = {"warehouse": warehouse_df, "daily": daily_df}
+            logger.info(f"{exchange_cd} 批量数据: 仓单{len(warehouse_df)}行, 日行情{len(daily_df)}行")
+
+        return frames
+
+    @staticmethod
+    def build_ratio_frame(warehouse_df: pd.DataFrame, daily_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        向量化计算所有品种的虚实比
+
+        规则与 calculate_virtual_real_ratio 一致:
+        - 仓单: 取每个品种最新日期,汇总所有仓库的 wrVOL / chg
+        - 持仓: 每日取持仓量最大的合约为主力,持仓变化为最新主力持仓减上一日主力持仓
+
+        Returns:
+            以品种代码为索引的DataFrame
+        """
+        mapping = pd.DataFrame(
+            [
+                (code, name, unit, obj.upper())
+                for code, (name, unit, obj, _) in VARIETY_MAPPING.items()
+            ],
+            columns=["comm_code", "variety_name", "contract_unit", "contract_object"]
+        )
+
+        # 1. 仓单: 按(品种, 日期)汇总仓库,再取每个品种的最新日期
+        wr = warehouse_df.assign(
+            contract_object=warehouse_df["contractObject"].str.upper(),
+            trade_date=pd.to_datetime(warehouse_df["tradeDate"])
+        )
+        wr = (
+            wr.groupby(["contract_object", "trade_date"], as_index=False)[["wrVOL", "chg"]].sum()
+            .sort_values("trade_date")
+            .groupby("contract_object")
+            .tail(1)
+            .rename(columns={"wrVOL": "receipt_quantity", "chg": "receipt_change"})
+        )
+
+        # 2. 持仓: 每日主力合约(持仓量最大),再计算与上一日主力的持仓差
+        daily = daily_df.dropna(subset=["openInt"]).assign(
+            contract_object=daily_df["contractObject"].str.upper(),
+            trade_date=pd.to_datetime(daily_df["tradeDate"])
+        )
+        main = daily.loc[daily.groupby(["contract_object", "trade_date"])["openInt"].idxmax()]
+        main = main.sort_values("trade_date")
+        main = main.assign(
+            open_interest_change=main.groupby("contract_object")["openInt"].diff().fillna(0)
+        )
+        main = (
+            main.groupby("contract_object")
+            .tail(1)[["contract_object", "openInt", "open_interest_change", "ticker"]]
+            .rename(columns={"openInt": "open_interest"})
+        )
+
+        df = mapping.merge(wr, on="contract_object").merge(main, on="contract_object")
+        if df.empty:
+            return df.set_index("comm_code")
+
+        # 3. 虚实比 = 持仓量 / 仓单量
+        receipt = df["receipt_quantity"].astype(float)
+        oi = df["open_interest"].astype(float)
+        ratio = (oi / receipt.where(receipt != 0)).fillna(0.0)
+        ratio_txt = ratio.map("{:.2f}".format)
+        times_txt = ratio.map("{:.0f}".format)
+
+        conditions = [receipt == 0, ratio > 100, ratio > 50, ratio > 20]
+        squeeze_risk = np.select(conditions, ["无", "高", "中", "低"], default="无")
+        price_pressure = np.select(conditions, ["中性", "上涨", "上涨", "中性"], default="下跌")
+        impact = np.select(
+            conditions,
+            [
+                "仓单为0,无法计算虚实比",
+                "虚实比高达" + ratio_txt + ",持仓量是仓单的" + times_txt + "倍,存在极高逼仓风险。空头难以交割,买方可能推高价格。",
+                "虚实比为" + ratio_txt + ",持仓量明显高于仓单,存在一定逼仓风险。关注仓单变化和交割压力。",
+                "虚实比为" + ratio_txt + ",市场相对平衡,短期逼仓风险较低。",
+            ],
+            default="虚实比为" + ratio_txt + ",可交割库存充足,无逼仓风险。实物供应充裕可能对价格形成压制。"
+        )
+
+        df = df.assign(
+            record_date=df["trade_date"].dt.date,
+            main_contract=df["contract_object"],
+            virtual_quantity=oi,
+            virtual_real_ratio=ratio,
+            squeeze_risk=squeeze_risk,
+            impact_analysis=impact,
+            price_pressure=price_pressure
+        )
+        return df.set_index("comm_code")
+
+    def bulk_upsert(self, ratio_df: pd.DataFrame) -> int:
+        """
+        一次性写入 WarehouseReceipt: 一次IN查询取出已有记录,批量更新+批量插入,单次提交
+
+        Returns:
+            写入的记录数
+        """
+        if ratio_df.empty:
+            return 0
+
+        columns = [
+            "variety_name", "record_date", "receipt_quantity", "receipt_change",
+            "main_contract", "open_interest", "open_interest_change", "contract_unit",
+            "virtual_quantity", "virtual_real_ratio", "squeeze_risk",
+            "impact_analysis", "price_pressure"
+        ]
+        rows = ratio_df[columns].reset_index().to_dict("records")
+        for row in rows:
+            for key, value in row.items():
+                if isinstance(value, np.generic):
+                    row[key] = value.item()
+
+        existing = self.db.query(
+            WarehouseReceipt.id, WarehouseReceipt.comm_code, WarehouseReceipt.record_date
+        ).filter(
+            WarehouseReceipt.comm_code.in_([row["comm_code"] for row in rows]),
+            WarehouseReceipt.record_date.in_({row["record_date"] for row in rows})
+        ).all()
+        existing_ids = {(code, record_date): rid for rid, code, record_date in existing}
+
+        now = datetime.now()
+        updates, inserts = [], []
+        for row in rows:
+            rid = existing_ids.get((row["comm_code"], row["record_date"]))
+            if rid:
+                row.pop("variety_name")
+                updates.append({**row, "id": rid, "updated_at": now})
+            else:
+                inserts.append(row)
+
+        try:
+            if updates:
+                self.db.bulk_update_mappings(WarehouseReceipt, updates)
+            if inserts:
+                self.db.bulk_insert_mappings(WarehouseReceipt, inserts)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        logger.info(f"虚实比批量写入: 新增{len(inserts)}条, 更新{len(updates)}条")
+        return len(rows)
+
+    def crawl_all_varieties_bulk(self) -> Dict[str, bool]:
+        """
+        批量模式爬取所有品种的虚实比数据
+        Returns:
+            {品种代码: 是否成功}
+        """
+        results = {code: False for code in VARIETY_MAPPING}
+        if not self.uqer_client:
+            logger.error("优矿客户端未初始化")
+            return results
+
+        # 取最近三个交易日,保证能算出主力持仓变化
+        calendar = get_trading_calendar()
+        end = calendar.latest_trading_day()
+        begin = calendar.previous_trading_day(calendar.previous_trading_day(end))
+
+        frames = self.fetch_exchange_frames(begin.strftime("%Y%m%d"), end.strftime("%Y%m%d"))
+        if not frames:
+            logger.warning("所有交易所批量数据均为空")
+            return results
+
+        warehouse_df = pd.concat([f["warehouse"] for f in frames.values()], ignore_index=True)
+        daily_df = pd.concat([f["daily"] for f in frames.values()], ignore_index=True)
+
+        ratio_df = self.build_ratio_frame(warehouse_df, daily_df)
+        self.bulk_upsert(ratio_df)
+
+        for code in ratio_df.index:
+            results[code] = True
+
+        success_count = sum(1 for v in results.values() if v)
+        logger.info(f"虚实比批量爬取完成: 成功{success_count}/{len(results)}个品种")
+        return results
+
+    def crawl_all_varieties(self, bulk: bool = True) -> Dict[str, bool]:
         """
         爬取所有品种的虚实比数据
+        Args:
+            bulk: 是否使用批量模式(按交易所拉取),False 时逐品种调用
         Returns:
             {品种代码: 是否成功}
         """
+        if bulk:
+            return self.crawl_all_varieties_bulk()
+
         results = {}
         for comm_code in VARIETY_MAPPING.keys():
             try:
@@ -4,8 +4,12 @@
 1. 获取品种列表 - API: /api/public/variety/list
 2. 获取多空全景数据 - API: /api/report/overallView
 3. 获取研报淘金数据 - API: /api/report/viewPoint/listPage
+   - fetch_all_research_reports: 异步分页全量拉取，支持按 report_id 增量
 """
+import asyncio
+import math
 import requests
+import httpx
 import logging
 from datetime import datetime, date
 from typing import Optional, List, Dict
@@ -34,6 +38,8 @@ class ZhihuiQixunSpider:
             'zh-platform': 'WEB',
             'authorization': self.auth_token
         }
+        # 异步分页共用的连接池客户端（首次使用时创建）
+        self._async_client: Optional[httpx.AsyncClient] = None
 
     def fetch_variety_list(self) -> List[Dict]:
         """
@@ -268,6 +274,167 @@ class ZhihuiQixunSpider:
             traceback.print_exc()
             return {"reports": [], "total": 0}
 
+    async def fetch_all_research_reports(
+        self,
+        variety_code: Optional[str] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        view_port: str = "全部",
+        page_size: int = 100,
+        concurrency: int = 4,
+        since_report_id: Optional[int] = None
+    ) -> Dict:
+        """
+        异步分页获取研报淘金数据（全量）
+
+        先请求第1页得到总数，其余页按 concurrency 分批并发请求。
+        接口按发布时间倒序返回，指定 since_report_id 时只保留更新的研报，
+        且某一批中出现已见过的 report_id 后不再请求后续页。
+
+        Args:
+            variety_code: 品种代码，默认全部
+            start_date: 开始日期，默认今天
+            end_date: 结束日期，默认今天
+            view_port: 观点筛选（全部/看多/看空/中性）
+            page_size: 每页数量
+            concurrency: 并发请求页数
+            since_report_id: 增量游标，上次已采集到的最大 report_id
+
+        Returns:
+            {
+                "reports": [...],      # 同 fetch_research_reports
+                "total": 230,          # 接口返回的总条数
+                "pages": 3,            # 实际请求的页数
+                "complete": True,      # 所有请求页均成功（为 False 时不应推进游标）
+                "max_report_id": 12345
+            }
+        """
+        start_str = (start_date or date.today()).strftime('%Y-%m-%d')
+        end_str = (end_date or date.today()).strftime('%Y-%m-%d')
+        params = {
+            'limit': page_size,
+            'startDate': start_str,
+            'endDate': end_str,
+            'institutionIds': '',
+            'varietyCode': variety_code or '',
+            'viewPort': view_port
+        }
+
+        logger.info(
+            f"开始分页获取研报淘金数据 (品种: {variety_code or '全部'}, 日期: {start_str}~{end_str}, "
+            f"游标: {since_report_id})..."
+        )
+
+        client = self._get_async_client(concurrency)
+        first = await self._fetch_report_page(client, params, 1)
+        if first is None:
+            return {"reports": [], "total": 0, "pages": 0, "complete": False, "max_report_id": None}
+
+        reports, total = first
+        total_pages = math.ceil(total / page_size) if total else 1
+        fetched_pages = 1
+        complete = True
+        reached_cursor = self._reached_cursor(reports, since_report_id)
+
+        next_page = 2
+        while not reached_cursor and next_page <= total_pages:
+            batch = range(next_page, min(next_page + concurrency, total_pages + 1))
+            results = await asyncio.gather(
+                *(self._fetch_report_page(client, params, page) for page in batch)
+            )
+            for result in results:
+                fetched_pages += 1
+                if result is None:
+                    complete = False
+                    continue
+                page_reports, _ = result
+                reports.extend(page_reports)
+                reached_cursor = reached_cursor or self._reached_cursor(page_reports, since_report_id)
+            next_page += concurrency
+
+        # 去重（翻页期间有新研报发布会导致页边界错位）并过滤已采集的研报
+        unique = {}
+        for report in reports:
+            report_id = report['report_id']
+            if since_report_id is not None and report_id <= since_report_id:
+                continue
+            unique.setdefault(report_id, report)
+        reports = list(unique.values())
+        max_report_id = max(unique) if unique else since_report_id
+
+        logger.info(
+            f"✅ 分页获取研报数据完成: 新增 {len(reports)} 条 (总共{total}条, "
+            f"请求{fetched_pages}/{total_pages}页{'' if complete else ', 存在失败页'})"
+        )
+
+        if reports:
+            self._save_data({
+                "reports": reports,
+                "total": total,
+                "query": {
+                    "variety_code": variety_code,
+                    "start_date": start_str,
+                    "end_date": end_str,
+                    "view_port": view_port,
+                    "since_report_id": since_report_id
+                }
+            }, f"研报淘金_{variety_code or '全部'}")
+
+        return {
+            "reports": reports,
+            "total": total,
+            "pages": fetched_pages,
+            "complete": complete,
+            "max_report_id": max_report_id
+        }
+
+    async def _fetch_report_page(self, client: httpx.AsyncClient, params: Dict, page: int):
+        """请求研报列表的一页，返回 (reports, total)，失败返回 None"""
+        url = f"{self.base_url}/api/report/viewPoint/listPage"
+        try:
+            response = await client.get(url, params={**params, 'page': page})
+            if response.status_code != 200:
+                logger.error(f"研报第{page}页请求失败，状态码: {response.status_code}")
+                return None
+
+            data = response.json()
+            if not data.get('success') or data.get('result') is None:
+                logger.error(f"研报第{page}页API返回错误: {data.get('errDesc')}")
+                return None
+
+            result = data['result']
+            return self._parse_research_reports(result.get('records') or []), result.get('total', 0)
+
+        except Exception as e:
+            logger.error(f"研报第{page}页获取失败: {e}")
+            return None
+
+    @staticmethod
+    def _reached_cursor(reports: List[Dict], since_report_id: Optional[int]) -> bool:
+        """本页是否已翻到上次采集过的研报"""
+        if since_report_id is None:
+            return False
+        return any(report['report_id'] <= since_report_id for report in reports)
+
+    def _get_async_client(self, concurrency: int) -> httpx.AsyncClient:
+        """获取（或创建）连接池客户端，连接数与并发页数一致"""
+        if self._async_client is None or self._async_client.is_closed:
+            self._async_client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=10,
+                limits=httpx.Limits(
+                    max_connections=concurrency,
+                    max_keepalive_connections=concurrency
+                )
+            )
+        return self._async_client
+
+    async def aclose(self):
+        """关闭异步客户端连接池"""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
     def _parse_research_reports(self, report_list: List[Dict]) -> List[Dict]:
         """解析研报淘金数据"""
         parsed_reports = []
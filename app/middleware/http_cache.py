@@ -0,0 +1,232 @@
+"""
+HTTP 缓存与压缩中间件
+前端高频轮询的读接口大多返回与上次相同的数据，此中间件：
+1. 为 GET 的 JSON 响应计算强 ETag（响应体哈希），If-None-Match 命中时返回 304
+2. VERSIONED_ROUTES 中的接口按所依赖表/文件的数据版本缓存响应体：
+   版本未变化时直接返回缓存（或 304），不再执行接口
+3. 超过 HTTP_COMPRESS_MIN_SIZE 的 JSON 按 Accept-Encoding 进行 brotli/gzip 压缩
+
+表的数据版本取 (行数, 最大id, 最大updated_at)，文件取 (mtime, size)，
+探测结果在 HTTP_CACHE_VERSION_TTL 秒内复用。
+"""
+import gzip
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from sqlalchemy import func, select
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.models import models  # noqa: F401 注册业务表结构
+from app.models.base import Base
+from app.models.database import get_async_engine
+from config.settings import get_settings
+
+try:
+    import brotli
+except ImportError:  # 未安装时只使用 gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
+
+DataSource = Union[str, Path]
+
+# 接口路径 -> 响应依赖的表名/数据文件
+VERSIONED_ROUTES: Dict[str, Tuple[DataSource, ...]] = {
+    "/api/v1/summary/overview": ("market_analysis_summary", "commodities"),
+    "/api/v1/summary/top-movers": ("market_analysis_summary", "commodities"),
+    "/api/v1/zhihui/full-view": ("market_full_view",),
+    "/api/v1/zhihui/research-reports": ("research_reports",),
+    "/api/v1/virtual-real-ratio/list": ("warehouse_receipts",),
+    "/api/v1/virtual-real-ratio/summary": ("warehouse_receipts",),
+    "/api/term-structure/all-structures": (
+        "term_structure_snapshots", DATA_DIR / "term_structure_data_all.json"
+    ),
+    "/api/term-structure/recommended-structures": (
+        "term_structure_snapshots", DATA_DIR / "term_structure_data.json"
+    ),
+}
+
+# 按优先级排列的压缩编码
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+class DataVersionTracker:
+    """表/文件的数据版本（短时间内复用探测结果）"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._versions: Dict[DataSource, Tuple[float, str]] = {}
+
+    async def version(self, sources: Sequence[DataSource]) -> Tuple[str, ...]:
+        now = time.monotonic()
+        versions = []
+        for source in sources:
+            cached = self._versions.get(source)
+            if cached is None or cached[0] <= now:
+                value = self._probe_file(source) if isinstance(source, Path) else await self._probe_table(source)
+                cached = (now + self.ttl, value)
+                self._versions[source] = cached
+            versions.append(cached[1])
+        # 接口默认日期（最近交易日）随自然日变化
+        versions.append(date.today().isoformat())
+        return tuple(versions)
+
+    @staticmethod
+    def _probe_file(path: Path) -> str:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return "missing"
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+    @staticmethod
+    async def _probe_table(table_name: str) -> str:
+        table = Base.metadata.tables[table_name]
+        columns = [func.count()]
+        for name in ("id", "updated_at"):
+            if name in table.c:
+                columns.append(func.max(table.c[name]))
+        async with get_async_engine().connect() as conn:
+            row = (await conn.execute(select(*columns).select_from(table))).one()
+        return ":".join(str(value) for value in row)
+
+
+@dataclass
+class CachedResponse:
+    """按数据版本缓存的响应"""
+    version: Tuple[str, ...]
+    etag: str
+    body: bytes
+    status_code: int
+    raw_headers: List[Tuple[bytes, bytes]]
+    encoded: Dict[str, bytes] = field(default_factory=dict)
+
+
+class HttpCacheMiddleware(BaseHTTPMiddleware):
+    """ETag / 条件请求 / 压缩"""
+
+    def __init__(self, app, versioned_routes: Optional[Dict[str, Tuple[DataSource, ...]]] = None):
+        super().__init__(app)
+        settings = get_settings()
+        self.versioned_routes = VERSIONED_ROUTES if versioned_routes is None else versioned_routes
+        self.min_size = settings.HTTP_COMPRESS_MIN_SIZE
+        self.max_entries = settings.HTTP_CACHE_MAX_ENTRIES
+        self.tracker = DataVersionTracker(settings.HTTP_CACHE_VERSION_TTL)
+        self._cache: "OrderedDict[str, CachedResponse]" = OrderedDict()
+
+    async def dispatch(self, request: Request, call_next):
+        if request.method != "GET":
+            return await call_next(request)
+
+        encoding = _choose_encoding(request.headers.get("accept-encoding", ""))
+        if_none_match = request.headers.get("if-none-match")
+        sources = self.versioned_routes.get(request.url.path)
+
+        cache_key = version = None
+        if sources:
+            cache_key = f"{request.url.path}?{request.url.query}"
+            try:
+                version = await self.tracker.version(sources)
+            except Exception as e:
+                logger.warning(f"数据版本探测失败 {request.url.path}: {e}")
+            cached = self._cache.get(cache_key) if version else None
+            if cached is not None and cached.version == version:
+                self._cache.move_to_end(cache_key)
+                return self._respond(cached, encoding, if_none_match)
+
+        response = await call_next(request)
+        if response.status_code != 200 or not _is_json(response) or "content-encoding" in response.headers:
+            return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        entry = CachedResponse(
+            version=version,
+            etag=hashlib.sha1(body).hexdigest()[:32],
+            body=body,
+            status_code=response.status_code,
+            raw_headers=[
+                (key, value) for key, value in response.raw_headers
+                if key not in (b"content-length", b"etag")
+            ]
+        )
+        if version is not None:
+            self._cache[cache_key] = entry
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return self._respond(entry, encoding, if_none_match)
+
+    def _respond(self, entry: CachedResponse, encoding: Optional[str], if_none_match: Optional[str]) -> Response:
+        if len(entry.body) < self.min_size:
+            encoding = None
+        etag = f'"{entry.etag}-{encoding}"' if encoding else f'"{entry.etag}"'
+
+        headers = [(key, value) for key, value in entry.raw_headers]
+        headers.append((b"etag", etag.encode()))
+        headers.append((b"vary", b"Accept-Encoding"))
+        if not any(key == b"cache-control" for key, _ in headers):
+            # 允许浏览器缓存，但每次使用前都需用 ETag 验证
+            headers.append((b"cache-control", b"no-cache"))
+
+        if if_none_match and _etag_matches(if_none_match, entry.etag):
+            response = Response(status_code=304)
+            response.raw_headers = [
+                (key, value) for key, value in headers if key != b"content-type"
+            ]
+            return response
+
+        body = entry.body
+        if encoding:
+            body = entry.encoded.get(encoding)
+            if body is None:
+                body = entry.encoded[encoding] = _compress(entry.body, encoding)
+            headers.append((b"content-encoding", encoding.encode()))
+
+        response = Response(content=body, status_code=entry.status_code)
+        response.raw_headers = headers + [(b"content-length", str(len(body)).encode())]
+        return response
+
+
+def _is_json(response: Response) -> bool:
+    return response.headers.get("content-type", "").startswith("application/json")
+
+
+def _choose_encoding(accept_encoding: str) -> Optional[str]:
+    """按 Accept-Encoding 选择压缩方式（忽略 q=0 的编码）"""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if name and params.replace(" ", "") not in ("q=0", "q=0.0"):
+            accepted.add(name)
+    for encoding in ENCODINGS:
+        if encoding in accepted:
+            return encoding
+    return None
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match 中任一 ETag 与响应体哈希一致（不区分压缩编码后缀）"""
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        value = candidate.strip()
+        if value.startswith("W/"):
+            value = value[2:]
+        if value.strip('"').split("-")[0] == etag:
+            return True
+    return False
@@ -1,8 +1,8 @@
 """
 数据治理模型
-用于记录数据源、采集日志、质量指标
+用于记录数据源、采集日志、质量指标、增量采集游标
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, Boolean, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, Boolean, JSON, UniqueConstraint
 from sqlalchemy.sql import func
 from app.models.base import Base
 
@@ -109,3 +109,17 @@ class DataQualityMetric(Base):
     quality_score = Column(Float, comment="质量评分 0-100")
 
     created_at = Column(DateTime, server_default=func.now())
+
+
+class CrawlCursor(Base):
+    """增量采集游标表 - 记录每个数据源上次采集到的位置（如最大研报ID）"""
+    __tablename__ = "crawl_cursors"
+    __table_args__ = (
+        UniqueConstraint('source_name', 'cursor_key', name='uq_crawl_cursor'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    source_name = Column(String(100), nullable=False, comment="数据源名称")
+    cursor_key = Column(String(100), nullable=False, comment="游标键，如 research_reports")
+    cursor_value = Column(String(200), comment="游标值，如上次最大 report_id")
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
@@ -1,5 +1,8 @@
 """数据库连接管理"""
+from typing import AsyncIterator, Optional
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
 from app.models.base import Base
 from config.settings import get_settings
@@ -24,6 +27,11 @@ def init_db():
     from app.models import data_governance  # 导入数据治理模型
 
     Base.metadata.create_all(bind=engine)
+
+    # create_all 不会给已存在的表补建索引，新增的索引在这里补建
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
     print("数据库表创建成功!")
 
 
@@ -34,3 +42,62 @@ def get_db() -> Session:
         yield db
     finally:
         db.close()
+
+
+# ========================================
+# 异步引擎（接口读查询使用，不阻塞事件循环）
+# ========================================
+# 同步驱动 -> 异步驱动
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+
+
+def to_async_url(database_url: str) -> str:
+    """同步连接串转换为对应的异步驱动连接串"""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"不支持异步访问的数据库: {backend}")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def get_async_engine() -> AsyncEngine:
+    """获取异步引擎（首次调用时创建）"""
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        _async_engine = create_async_engine(
+            to_async_url(settings.DATABASE_URL),
+            echo=settings.DEBUG,
+            pool_pre_ping=True
+        )
+        _async_session_factory = async_sessionmaker(
+            _async_engine, expire_on_commit=False, autoflush=False
+        )
+    return _async_engine
+
+
+def AsyncSessionLocal() -> AsyncSession:
+    """创建异步会话"""
+    get_async_engine()
+    return _async_session_factory()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """获取异步数据库会话依赖"""
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+async def dispose_async_engine():
+    """关闭异步引擎连接池"""
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_session_factory = None
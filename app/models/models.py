@@ -1,5 +1,5 @@
 """数据库模型定义"""
-from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Text, Enum as SQLEnum, BigInteger
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Text, Enum as SQLEnum, BigInteger, UniqueConstraint, Boolean, Index
 from sqlalchemy.sql import func
 from datetime import datetime
 import enum
@@ -48,6 +48,23 @@ class MarketAnalysisSummary(Base):
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), comment="更新时间")
 
 
+class AnalysisChangeLog(Base):
+    """分析变更日志表 - 采集任务写入数据后记录受影响的 品种+日期，供增量分析重算"""
+    __tablename__ = "analysis_change_log"
+    __table_args__ = (
+        UniqueConstraint('comm_code', 'record_date', name='uq_analysis_change'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    comm_code = Column(String(20), nullable=False, comment="品种代码")
+    record_date = Column(Date, nullable=False, index=True, comment="受影响的分析日期")
+    source = Column(String(100), comment="最近一次写入的数据源")
+    analyzed_at = Column(DateTime, comment="最近一次增量分析时间，早于 updated_at 表示待重算")
+
+    created_at = Column(DateTime, default=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), comment="最近一次变更时间")
+
+
 class FundamentalReport(Base):
     """基本面数据表"""
     __tablename__ = "fundamental_reports"
@@ -120,6 +137,26 @@ class OptionFlow(Base):
     created_at = Column(DateTime, default=func.now())
 
 
+class OptionFlowRollup(Base):
+    """期权资金流向汇总表 - 按 1分钟/5分钟/1小时/1天 粒度预聚合 OptionFlow，随采集增量更新"""
+    __tablename__ = "option_flow_rollups"
+    __table_args__ = (
+        # 唯一索引同时服务于按 粒度+时间段 的查询
+        UniqueConstraint('resolution', 'bucket_start', 'comm_code', 'contract_code', name='uq_option_flow_rollup'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    resolution = Column(String(4), nullable=False, comment="粒度: 1m/5m/1h/1d")
+    bucket_start = Column(DateTime, nullable=False, comment="时间段起点")
+    comm_code = Column(String(20), nullable=False, index=True, comment="品种代码")
+    contract_code = Column(String(100), nullable=False, default="", comment="合约代码")
+    net_flow = Column(Float, default=0, comment="净流入合计(万)")
+    volume = Column(Float, default=0, comment="成交量变化合计(万)")
+    record_count = Column(Integer, default=0, comment="原始记录数")
+
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+
 class ContractInfo(Base):
     """合约信息表 - 用于计算市值"""
     __tablename__ = "contract_infos"
@@ -155,6 +192,27 @@ class ResearchReport(Base):
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
 
+class ResearchSummaryCache(Base):
+    """研报AI汇总缓存表 - 按 品种+日期+研报集合 缓存，研报增减后哈希变化即失效"""
+    __tablename__ = "research_summary_cache"
+    __table_args__ = (
+        UniqueConstraint('comm_code', 'publish_date', 'reports_hash', name='uq_research_summary_cache'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    comm_code = Column(String(20), nullable=False, comment="品种代码")
+    publish_date = Column(Date, nullable=False, index=True, comment="研报发布日期")
+    reports_hash = Column(String(40), nullable=False, comment="排序后 report_id 列表的哈希")
+    reports_count = Column(Integer, default=0, comment="汇总的研报数")
+
+    trade_logic = Column(Text, comment="交易逻辑汇总")
+    related_data = Column(Text, comment="相关数据汇总")
+    risk_factor = Column(Text, comment="风险因素汇总")
+
+    created_at = Column(DateTime, default=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+
 class MarketFullView(Base):
     """多空全景数据表 - 智汇期讯"""
     __tablename__ = "market_full_view"
@@ -178,9 +236,46 @@ class MarketFullView(Base):
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
 
+class TermStructureSnapshot(Base):
+    """期限结构快照表 - 每个 品种+交易日+合约 一行，品种级的结构判断冗余在各合约行上"""
+    __tablename__ = "term_structure_snapshots"
+    __table_args__ = (
+        # 唯一索引同时服务于按 品种+日期 的查询
+        UniqueConstraint('comm_code', 'trade_date', 'symbol', name='uq_term_structure_snapshot'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    comm_code = Column(String(20), nullable=False, comment="品种代码,如CU")
+    variety_name = Column(String(50), comment="品种名称")
+    trade_date = Column(Date, nullable=False, index=True, comment="行情日期")
+
+    # 合约数据
+    symbol = Column(String(20), nullable=False, comment="合约代码,如CU2601")
+    month = Column(String(10), comment="合约月份,如2601")
+    price = Column(Float, comment="价格(结算价优先)")
+    volume = Column(BigInteger, default=0, comment="成交量")
+    open_interest = Column(BigInteger, default=0, comment="持仓量")
+    source = Column(String(20), comment="数据来源")
+
+    # 品种级结构判断
+    market_structure = Column(String(20), comment="市场结构: 正向市场/反向市场/平坦市场/数据不足")
+    grade = Column(String(5), comment="结构等级: S/A/B/C")
+    structure_score = Column(Float, default=0, comment="结构得分")
+    recommend = Column(Boolean, default=False, comment="是否推荐(S/A级)")
+
+    created_at = Column(DateTime, default=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+
 class WarehouseReceipt(Base):
     """仓单日报表 - 用于计算虚实比"""
     __tablename__ = "warehouse_receipts"
+    __table_args__ = (
+        # 按品种取历史（LAG 窗口按 品种 分区、日期 排序）
+        Index('ix_warehouse_receipts_code_date', 'comm_code', 'record_date'),
+        # 按日期取全品种并按虚实比排序
+        Index('ix_warehouse_receipts_date_ratio', 'record_date', 'virtual_real_ratio'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     comm_code = Column(String(20), nullable=False, index=True, comment="品种代码,如AU")
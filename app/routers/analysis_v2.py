@@ -1,17 +1,42 @@
 """
 V2分析系统API路由
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Response
 from typing import List, Dict, Any
 import pandas as pd
+import sys
 from pathlib import Path
 
+from app.services.json_file_cache import JsonSnapshot, get_csv_file_cache, invalidate_file_caches
+from app.services.script_jobs import get_script_job_manager
+from config.settings import get_settings
+
 router = APIRouter()
 
 # 数据文件路径
 DATA_DIR = Path(__file__).parent.parent.parent.parent
 
 
+def _records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """DataFrame -> 记录列表（空值转为 null）"""
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+def _json_response(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
+
+
+def _load_csv_snapshot(csv_path: Path, not_found_detail: str) -> JsonSnapshot:
+    """读取分析结果 CSV（文件未变化且未重新运行分析时复用内存中的 DataFrame 与响应）"""
+    if not csv_path.exists():
+        raise HTTPException(status_code=404, detail=not_found_detail)
+
+    snapshot = get_csv_file_cache(csv_path).get()
+    if snapshot is None:
+        raise HTTPException(status_code=500, detail=f"读取数据失败: {csv_path.name}")
+    return snapshot
+
+
 @router.get("/overview")
 async def get_analysis_overview():
     """
@@ -20,29 +45,30 @@ async def get_analysis_overview():
     """
     try:
         csv_path = DATA_DIR / "期权分析_总览_V2.csv"
-
-        if not csv_path.exists():
-            raise HTTPException(status_code=404, detail="分析数据未找到，请先运行分析系统")
-
-        df = pd.read_csv(csv_path)
-
-        # 转换为字典列表
-        data = df.to_dict('records')
-
-        # 统计信息
-        stats = {
-            "total": len(df),
-            "long": len(df[df['综合方向'] == '多头']),
-            "short": len(df[df['综合方向'] == '空头']),
-            "neutral": len(df[df['综合方向'] == '中性'])
-        }
-
-        return {
-            "success": True,
-            "data": data,
-            "stats": stats
-        }
-
+        snapshot = _load_csv_snapshot(csv_path, "分析数据未找到，请先运行分析系统")
+
+        def build():
+            df = snapshot.data
+
+            # 统计信息
+            direction = df['综合方向']
+            stats = {
+                "total": len(df),
+                "long": int((direction == '多头').sum()),
+                "short": int((direction == '空头').sum()),
+                "neutral": int((direction == '中性').sum())
+            }
+
+            return {
+                "success": True,
+                "data": _records(df),
+                "stats": stats
+            }
+
+        return _json_response(snapshot.render("overview", build))
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"读取数据失败: {str(e)}")
 
@@ -61,17 +87,15 @@ async def get_top5(direction: str):
         else:
             raise HTTPException(status_code=400, detail="direction必须是'long'或'short'")
 
-        if not csv_path.exists():
-            raise HTTPException(status_code=404, detail="Top5数据未找到")
-
-        df = pd.read_csv(csv_path)
-        data = df.to_dict('records')
-
-        return {
+        snapshot = _load_csv_snapshot(csv_path, "Top5数据未找到")
+        body = snapshot.render("top5", lambda: {
             "success": True,
-            "data": data
-        }
+            "data": _records(snapshot.data)
+        })
+        return _json_response(body)
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"读取数据失败: {str(e)}")
 
@@ -83,19 +107,16 @@ async def get_variety_signals(variety_id: str):
     """
     try:
         csv_path = DATA_DIR / f"品种详情_{variety_id}_分析信号_V2.csv"
-
-        if not csv_path.exists():
-            raise HTTPException(status_code=404, detail=f"品种{variety_id}的分析信号未找到")
-
-        df = pd.read_csv(csv_path)
-        data = df.to_dict('records')
-
-        return {
+        snapshot = _load_csv_snapshot(csv_path, f"品种{variety_id}的分析信号未找到")
+        body = snapshot.render("signals", lambda: {
             "success": True,
             "variety": variety_id,
-            "signals": data
-        }
+            "signals": _records(snapshot.data)
+        })
+        return _json_response(body)
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"读取数据失败: {str(e)}")
 
@@ -107,55 +128,79 @@ async def get_variety_term_structure(variety_id: str):
     """
     try:
         csv_path = DATA_DIR / f"品种详情_{variety_id}_期限结构.csv"
-
-        if not csv_path.exists():
-            raise HTTPException(status_code=404, detail=f"品种{variety_id}的期限结构未找到")
-
-        df = pd.read_csv(csv_path)
-        data = df.to_dict('records')
-
-        return {
+        snapshot = _load_csv_snapshot(csv_path, f"品种{variety_id}的期限结构未找到")
+        body = snapshot.render("term_structure", lambda: {
             "success": True,
             "variety": variety_id,
-            "term_structure": data
-        }
+            "term_structure": _records(snapshot.data)
+        })
+        return _json_response(body)
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"读取数据失败: {str(e)}")
 
 
+REFRESH_JOB_NAME = "analysis_v2_refresh"
+
+
 @router.post("/refresh")
 async def refresh_analysis():
     """
-    重新运行分析系统
+    重新运行分析系统（后台执行，立即返回 job_id）
+    已有运行中的任务时返回 409 及该任务的 job_id
     """
-    try:
-        import subprocess
-
-        script_path = DATA_DIR / "option_analysis_system_v2.py"
+    script_path = DATA_DIR / "option_analysis_system_v2.py"
+
+    if not script_path.exists():
+        raise HTTPException(status_code=404, detail="分析脚本未找到")
+
+    settings = get_settings()
+    job, started = get_script_job_manager().start(
+        REFRESH_JOB_NAME,
+        [sys.executable, str(script_path)],
+        cwd=DATA_DIR,
+        timeout=settings.ANALYSIS_V2_REFRESH_TIMEOUT,
+        max_log_lines=settings.ANALYSIS_V2_LOG_LINES,
+        # 分析结果已重新生成，丢弃结果缓存
+        on_success=lambda job: invalidate_file_caches(DATA_DIR)
+    )
+
+    if not started:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "分析正在运行", "job_id": job.job_id}
+        )
 
-        if not script_path.exists():
-            raise HTTPException(status_code=404, detail="分析脚本未找到")
+    return {
+        "success": True,
+        "message": "分析已启动",
+        "job_id": job.job_id,
+        "status": job.status
+    }
 
-        # 异步运行分析脚本
-        result = subprocess.run(
-            ["python3", str(script_path)],
-            cwd=str(DATA_DIR),
-            capture_output=True,
-            text=True,
-            timeout=300
-        )
 
-        if result.returncode != 0:
-            raise HTTPException(status_code=500, detail=f"分析失败: {result.stderr}")
+@router.get("/refresh/latest")
+async def get_latest_refresh(since: int = Query(0, ge=0, description="日志偏移，传上次返回的 next_offset")):
+    """
+    查询最近一次分析任务的状态
+    """
+    job = get_script_job_manager().latest(REFRESH_JOB_NAME)
+    if job is None:
+        raise HTTPException(status_code=404, detail="暂无分析任务")
+    return {"success": True, **job.to_dict(since)}
 
-        return {
-            "success": True,
-            "message": "分析完成",
-            "output": result.stdout
-        }
 
-    except subprocess.TimeoutExpired:
-        raise HTTPException(status_code=408, detail="分析超时（>5分钟）")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"运行失败: {str(e)}")
+@router.get("/refresh/{job_id}")
+async def get_refresh_status(
+    job_id: str,
+    since: int = Query(0, ge=0, description="日志偏移，传上次返回的 next_offset")
+):
+    """
+    查询分析任务的状态、进度与日志
+    """
+    job = get_script_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"未找到分析任务: {job_id}")
+    return {"success": True, **job.to_dict(since)}
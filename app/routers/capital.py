@@ -3,10 +3,12 @@
 提供席位持仓、资金流向等数据
 """
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
-from app.models.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, func, select
+from app.models.database import get_async_db
 from app.models.models import InstitutionalPosition, OptionFlow
+from app.services.option_flow_rollup import flow_totals_query
+from app.services.trading_calendar import get_trading_calendar
 from typing import List, Optional
 from pydantic import BaseModel
 from datetime import date, datetime, timedelta
@@ -31,18 +33,20 @@ async def get_positions(
         variety_code: str,
         target_date: Optional[date] = None,
         limit: int = Query(20, ge=1, le=100),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取品种的席位持仓数据
     """
     if target_date is None:
-        target_date = date.today()
+        target_date = get_trading_calendar().latest_trading_day()
 
-    positions = db.query(InstitutionalPosition).filter(
-        InstitutionalPosition.comm_code == variety_code,
-        InstitutionalPosition.record_date == target_date
-    ).order_by(desc(InstitutionalPosition.net_position)).limit(limit).all()
+    positions = (await db.execute(
+        select(InstitutionalPosition).where(
+            InstitutionalPosition.comm_code == variety_code,
+            InstitutionalPosition.record_date == target_date
+        ).order_by(desc(InstitutionalPosition.net_position)).limit(limit)
+    )).scalars().all()
 
     if not positions:
         raise HTTPException(status_code=404, detail=f"未找到品种 {variety_code} 在 {target_date} 的席位数据")
@@ -54,7 +58,7 @@ async def get_positions(
 async def get_capital_flow(
         variety_code: str,
         days: int = Query(7, ge=1, le=30),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取品种的资金流向趋势
@@ -63,14 +67,16 @@ async def get_capital_flow(
     start_date = end_date - timedelta(days=days)
 
     # 按日期聚合
-    flow_data = db.query(
-        InstitutionalPosition.record_date,
-        func.sum(InstitutionalPosition.net_position).label('total_net'),
-        func.sum(InstitutionalPosition.position_change).label('total_change')
-    ).filter(
-        InstitutionalPosition.comm_code == variety_code,
-        InstitutionalPosition.record_date.between(start_date, end_date)
-    ).group_by(InstitutionalPosition.record_date).order_by(InstitutionalPosition.record_date).all()
+    flow_data = (await db.execute(
+        select(
+            InstitutionalPosition.record_date,
+            func.sum(InstitutionalPosition.net_position).label('total_net'),
+            func.sum(InstitutionalPosition.position_change).label('total_change')
+        ).where(
+            InstitutionalPosition.comm_code == variety_code,
+            InstitutionalPosition.record_date.between(start_date, end_date)
+        ).group_by(InstitutionalPosition.record_date).order_by(InstitutionalPosition.record_date)
+    )).all()
 
     if not flow_data:
         return {
@@ -96,26 +102,30 @@ async def get_capital_flow(
 async def get_top_brokers(
         variety_code: str,
         limit: int = Query(10, ge=1, le=50),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取品种的Top席位排行
     """
-    target_date = date.today()
+    target_date = get_trading_calendar().latest_trading_day()
 
     # 获取多头Top席位
-    long_brokers = db.query(InstitutionalPosition).filter(
-        InstitutionalPosition.comm_code == variety_code,
-        InstitutionalPosition.record_date == target_date,
-        InstitutionalPosition.net_position > 0
-    ).order_by(desc(InstitutionalPosition.net_position)).limit(limit).all()
+    long_brokers = (await db.execute(
+        select(InstitutionalPosition).where(
+            InstitutionalPosition.comm_code == variety_code,
+            InstitutionalPosition.record_date == target_date,
+            InstitutionalPosition.net_position > 0
+        ).order_by(desc(InstitutionalPosition.net_position)).limit(limit)
+    )).scalars().all()
 
     # 获取空头Top席位
-    short_brokers = db.query(InstitutionalPosition).filter(
-        InstitutionalPosition.comm_code == variety_code,
-        InstitutionalPosition.record_date == target_date,
-        InstitutionalPosition.net_position < 0
-    ).order_by(InstitutionalPosition.net_position).limit(limit).all()
+    short_brokers = (await db.execute(
+        select(InstitutionalPosition).where(
+            InstitutionalPosition.comm_code == variety_code,
+            InstitutionalPosition.record_date == target_date,
+            InstitutionalPosition.net_position < 0
+        ).order_by(InstitutionalPosition.net_position).limit(limit)
+    )).scalars().all()
 
     return {
         "variety_code": variety_code,
@@ -144,17 +154,19 @@ async def get_top_brokers(
 @router.get("/{variety_code}/institution-vs-retail")
 async def get_institution_vs_retail(
         variety_code: str,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     机构 vs 散户持仓对比
     """
-    target_date = date.today()
+    target_date = get_trading_calendar().latest_trading_day()
 
-    positions = db.query(InstitutionalPosition).filter(
-        InstitutionalPosition.comm_code == variety_code,
-        InstitutionalPosition.record_date == target_date
-    ).all()
+    positions = (await db.execute(
+        select(InstitutionalPosition).where(
+            InstitutionalPosition.comm_code == variety_code,
+            InstitutionalPosition.record_date == target_date
+        )
+    )).scalars().all()
 
     if not positions:
         raise HTTPException(status_code=404, detail=f"未找到数据")
@@ -191,7 +203,7 @@ async def get_institution_vs_retail(
 @router.get("/option-flow/all")
 async def get_all_option_flow(
         hours: int = Query(1, ge=1, le=24),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取所有品种的期权资金流向汇总
@@ -199,38 +211,30 @@ async def get_all_option_flow(
     end_time = datetime.now()
     start_time = end_time - timedelta(hours=hours)
 
-    flows = db.query(OptionFlow).filter(
-        OptionFlow.record_time.between(start_time, end_time)
-    ).all()
+    # 按汇总表在数据库内求和，不再逐条读取原始记录
+    rows = (await db.execute(flow_totals_query(start_time, end_time))).all()
 
-    if not flows:
+    if not rows:
         return {"varieties": [], "total_count": 0}
 
-    # 按品种汇总
-    variety_summary = {}
-    for f in flows:
-        code = f.comm_code
-        if code not in variety_summary:
-            variety_summary[code] = {
-                "comm_code": code,
-                "total_net_flow": 0,
-                "total_volume": 0,
-                "count": 0
-            }
-        variety_summary[code]["total_net_flow"] += f.net_flow or 0
-        variety_summary[code]["total_volume"] += f.volume or 0
-        variety_summary[code]["count"] += 1
-
     # 按净流入排序
     sorted_varieties = sorted(
-        variety_summary.values(),
+        (
+            {
+                "comm_code": row.comm_code,
+                "total_net_flow": row.total_net_flow or 0,
+                "total_volume": row.total_volume or 0,
+                "count": int(row.record_count or 0)
+            }
+            for row in rows
+        ),
         key=lambda x: x["total_net_flow"],
         reverse=True
     )
 
     return {
         "varieties": sorted_varieties,
-        "total_count": len(flows),
+        "total_count": sum(v["count"] for v in sorted_varieties),
         "period_hours": hours
     }
 
@@ -239,7 +243,7 @@ async def get_all_option_flow(
 async def get_option_flow(
         variety_code: str,
         hours: int = Query(24, ge=1, le=72),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取品种的期权资金流向数据 (Openvlab数据)
@@ -247,22 +251,41 @@ async def get_option_flow(
     end_time = datetime.now()
     start_time = end_time - timedelta(hours=hours)
 
-    flows = db.query(OptionFlow).filter(
-        OptionFlow.comm_code == variety_code,
-        OptionFlow.record_time.between(start_time, end_time)
-    ).order_by(desc(OptionFlow.record_time)).all()
+    flows = (await db.execute(
+        select(OptionFlow).where(
+            OptionFlow.comm_code == variety_code,
+            OptionFlow.record_time.between(start_time, end_time)
+        ).order_by(desc(OptionFlow.record_time))
+    )).scalars().all()
 
     if not flows:
         return {
             "variety_code": variety_code,
             "hours": hours,
             "option_flows": [],
+            "contracts": [],
             "summary": None
         }
 
-    # 计算汇总数据
-    total_net_flow = sum(f.net_flow or 0 for f in flows)
-    total_volume = sum(f.volume or 0 for f in flows)
+    # 汇总数据按合约在数据库内求和
+    contract_rows = (await db.execute(
+        flow_totals_query(start_time, end_time, comm_codes=[variety_code], by_contract=True)
+    )).all()
+    contracts = sorted(
+        (
+            {
+                "contract_code": row.contract_code,
+                "total_net_flow": row.total_net_flow or 0,
+                "total_volume": row.total_volume or 0,
+                "count": int(row.record_count or 0)
+            }
+            for row in contract_rows
+        ),
+        key=lambda x: x["total_net_flow"],
+        reverse=True
+    )
+    total_net_flow = sum(c["total_net_flow"] for c in contracts)
+    total_volume = sum(c["total_volume"] for c in contracts)
 
     return {
         "variety_code": variety_code,
@@ -277,10 +300,11 @@ async def get_option_flow(
             }
             for f in flows
         ],
+        "contracts": contracts,
         "summary": {
             "total_net_flow": total_net_flow,
             "total_volume": total_volume,
             "flow_direction": "流入" if total_net_flow > 0 else "流出",
-            "count": len(flows)
+            "count": sum(c["count"] for c in contracts)
         }
     }
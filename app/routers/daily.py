@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import desc
 from app.models.database import get_db
 from app.models.models import DailyBlueprint, MarketAnalysisSummary
+from app.services.trading_calendar import get_trading_calendar
 from typing import Optional
 from datetime import date, datetime
 from pathlib import Path
@@ -25,7 +26,7 @@ async def get_daily_blueprint(
     获取每日交易蓝图
     """
     if target_date is None:
-        target_date = date.today()
+        target_date = get_trading_calendar().latest_trading_day()
 
     blueprint = db.query(DailyBlueprint).filter(
         DailyBlueprint.record_date == target_date
@@ -147,7 +148,7 @@ async def generate_strategy(
     """
     from app.models.models import MarketAnalysisSummary, InstitutionalPosition
 
-    target_date = date.today()
+    target_date = get_trading_calendar().latest_trading_day()
 
     # 获取四维数据
     summary = db.query(MarketAnalysisSummary).filter(
@@ -255,7 +256,7 @@ async def get_latest_strategies(
     """
     获取最新的策略列表
     """
-    target_date = date.today()
+    target_date = get_trading_calendar().latest_trading_day()
 
     # 获取所有品种的最新策略
     summaries = db.query(MarketAnalysisSummary).filter(
@@ -0,0 +1,29 @@
+"""
+首页看板 API
+一次返回全部品种的四维总览、资金面、技术面与期权资金流向
+"""
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.database import get_async_db
+from app.services.dashboard import get_dashboard_cache
+from app.services.trading_calendar import get_trading_calendar
+from typing import Optional
+from datetime import date
+
+router = APIRouter()
+
+
+@router.get("")
+async def get_dashboard(
+        target_date: Optional[date] = None,
+        refresh: bool = Query(False, description="忽略缓存重新构建"),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    获取全品种看板（按交易日缓存）
+    """
+    if target_date is None:
+        target_date = get_trading_calendar().latest_trading_day()
+
+    body = await get_dashboard_cache().get(db, target_date, refresh=refresh)
+    return Response(content=body, media_type="application/json")
@@ -7,6 +7,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import desc
 from app.models.database import get_db
 from app.models.models import FundamentalReport, Commodity, MarketFullView
+from app.services.trading_calendar import get_trading_calendar
 from typing import List, Optional, Dict
 from pydantic import BaseModel
 from datetime import date, datetime
@@ -180,11 +181,11 @@ async def get_zhihui_market_sentiment(
     获取智汇期讯市场情绪数据（多空全景）
 
     Args:
-        target_date: 目标日期 (格式: YYYYMMDD)，默认为今天
+        target_date: 目标日期 (格式: YYYYMMDD)，默认为最近交易日
         sentiment_filter: 情绪过滤 ('bull', 'bear', 'neutral')，默认返回全部
     """
     if target_date is None:
-        target_date = date.today().strftime('%Y%m%d')
+        target_date = get_trading_calendar().latest_trading_day().strftime('%Y%m%d')
 
     # 读取智汇期讯数据文件
     data_dir = Path(__file__).parent.parent.parent / "智汇期讯" / "data"
@@ -231,17 +232,17 @@ async def get_zhihui_latest_trading_date(db: Session = Depends(get_db)):
                 "latest_date": latest_record[0].strftime('%Y-%m-%d')
             }
         else:
-            # 如果没有数据,返回当前日期
-            logger.warning("数据库中没有交易数据,返回当前日期")
+            # 如果没有数据,返回最近交易日
+            logger.warning("数据库中没有交易数据,返回最近交易日")
             return {
                 "success": True,
-                "latest_date": date.today().strftime('%Y-%m-%d')
+                "latest_date": get_trading_calendar().latest_trading_day().strftime('%Y-%m-%d')
             }
     except Exception as e:
         logger.error(f"获取最新交易日期失败: {e}")
         return {
             "success": False,
-            "latest_date": date.today().strftime('%Y-%m-%d')
+            "latest_date": get_trading_calendar().latest_trading_day().strftime('%Y-%m-%d')
         }
 
 
@@ -253,7 +254,7 @@ async def get_zhihui_sentiment_stats(target_date: Optional[str] = None):
     返回看多、看空、中性的品种数量和比例
     """
     if target_date is None:
-        target_date = date.today().strftime('%Y%m%d')
+        target_date = get_trading_calendar().latest_trading_day().strftime('%Y%m%d')
 
     data_dir = Path(__file__).parent.parent.parent / "智汇期讯" / "data"
     filename = f"{target_date}_多空全景.json"
@@ -3,12 +3,16 @@
 提供品种总览、多空排行、搜索等功能
 """
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
-from app.models.database import get_db
+from sqlalchemy import desc, func, select
+from app.models.database import get_db, get_async_db
 from app.models.models import MarketAnalysisSummary, Commodity, DirectionEnum
+from app.services.backfill import MAX_WORKERS, AnalysisBackfill, load_checkpoint, start_backfill_in_background
+from app.services.backtest import backtest_signals
+from app.services.trading_calendar import get_trading_calendar
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import date
 
 router = APIRouter()
@@ -37,51 +41,59 @@ class TopMovers(BaseModel):
     short: List[VarietySummary]
 
 
+def _summary_with_name():
+    """总览记录关联品种名称（品种表缺失时名称为 None）"""
+    return select(MarketAnalysisSummary, Commodity.name).outerjoin(
+        Commodity, Commodity.code == MarketAnalysisSummary.comm_code
+    )
+
+
+def _variety_summary(s: MarketAnalysisSummary, name: Optional[str]) -> VarietySummary:
+    return VarietySummary(
+        code=s.comm_code,
+        name=name or s.comm_code,
+        fundamental_score=s.fundamental_score,
+        capital_score=s.capital_score,
+        technical_score=s.technical_score,
+        message_score=s.message_score,
+        total_direction=s.total_direction.value if s.total_direction else "中性",
+        main_reason=s.main_reason or "",
+        date=s.date
+    )
+
+
 @router.get("/overview", response_model=List[VarietySummary])
 async def get_overview(
         target_date: Optional[date] = None,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取所有品种的四维总览
     """
     if target_date is None:
-        target_date = date.today()
+        target_date = get_trading_calendar().latest_trading_day()
 
-    summaries = db.query(MarketAnalysisSummary).filter(
-        MarketAnalysisSummary.date == target_date
-    ).all()
+    rows = (await db.execute(
+        _summary_with_name().where(MarketAnalysisSummary.date == target_date)
+    )).all()
 
-    if not summaries:
+    if not rows:
         raise HTTPException(status_code=404, detail=f"未找到 {target_date} 的数据")
 
-    return [
-        VarietySummary(
-            code=s.comm_code,
-            name=s.comm_code,  # 需要关联 Commodity 表获取名称
-            fundamental_score=s.fundamental_score,
-            capital_score=s.capital_score,
-            technical_score=s.technical_score,
-            message_score=s.message_score,
-            total_direction=s.total_direction.value if s.total_direction else "中性",
-            main_reason=s.main_reason or "",
-            date=s.date
-        )
-        for s in summaries
-    ]
+    return [_variety_summary(s, name) for s, name in rows]
 
 
 @router.get("/top-movers", response_model=TopMovers)
 async def get_top_movers(
         limit: int = Query(3, ge=1, le=10),
         target_date: Optional[date] = None,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取多空前N名品种
     """
     if target_date is None:
-        target_date = date.today()
+        target_date = get_trading_calendar().latest_trading_day()
 
     # 计算总分 = 各维度加权和
     # 这里简单相加，实际可以加权
@@ -93,62 +105,42 @@ async def get_top_movers(
     ).label('total_score')
 
     # 做多品种（总分最高，且大于0）
-    long_list = db.query(MarketAnalysisSummary).filter(
-        MarketAnalysisSummary.date == target_date,
-        total_score_expr > 0
-    ).order_by(desc(total_score_expr)).limit(limit).all()
+    long_list = (await db.execute(
+        _summary_with_name().where(
+            MarketAnalysisSummary.date == target_date,
+            total_score_expr > 0
+        ).order_by(desc(total_score_expr)).limit(limit)
+    )).all()
 
     # 做空品种（总分最低，且小于0）
-    short_list = db.query(MarketAnalysisSummary).filter(
-        MarketAnalysisSummary.date == target_date,
-        total_score_expr < 0
-    ).order_by(total_score_expr).limit(limit).all()
+    short_list = (await db.execute(
+        _summary_with_name().where(
+            MarketAnalysisSummary.date == target_date,
+            total_score_expr < 0
+        ).order_by(total_score_expr).limit(limit)
+    )).all()
 
     return TopMovers(
-        long=[
-            VarietySummary(
-                code=s.comm_code,
-                name=s.comm_code,
-                fundamental_score=s.fundamental_score,
-                capital_score=s.capital_score,
-                technical_score=s.technical_score,
-                message_score=s.message_score,
-                total_direction=s.total_direction.value,
-                main_reason=s.main_reason or "",
-                date=s.date
-            )
-            for s in long_list
-        ],
-        short=[
-            VarietySummary(
-                code=s.comm_code,
-                name=s.comm_code,
-                fundamental_score=s.fundamental_score,
-                capital_score=s.capital_score,
-                technical_score=s.technical_score,
-                message_score=s.message_score,
-                total_direction=s.total_direction.value,
-                main_reason=s.main_reason or "",
-                date=s.date
-            )
-            for s in short_list
-        ]
+        long=[_variety_summary(s, name) for s, name in long_list],
+        short=[_variety_summary(s, name) for s, name in short_list]
     )
 
 
 @router.get("/search")
 async def search_variety(
         q: str = Query(..., min_length=1, description="品种代码或名称"),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     搜索品种
     """
     # 先从品种基础表搜索
-    commodities = db.query(Commodity).filter(
-        (Commodity.code.like(f"%{q}%")) |
-        (Commodity.name.like(f"%{q}%"))
-    ).all()
+    commodities = (await db.execute(
+        select(Commodity).where(
+            (Commodity.code.like(f"%{q}%")) |
+            (Commodity.name.like(f"%{q}%"))
+        )
+    )).scalars().all()
 
     if not commodities:
         raise HTTPException(status_code=404, detail=f"未找到品种: {q}")
@@ -170,18 +162,20 @@ async def search_variety(
 async def get_variety_summary(
         variety_code: str,
         target_date: Optional[date] = None,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取单个品种的四维总览
     """
     if target_date is None:
-        target_date = date.today()
+        target_date = get_trading_calendar().latest_trading_day()
 
-    summary = db.query(MarketAnalysisSummary).filter(
-        MarketAnalysisSummary.comm_code == variety_code,
-        MarketAnalysisSummary.date == target_date
-    ).first()
+    summary = (await db.execute(
+        select(MarketAnalysisSummary).where(
+            MarketAnalysisSummary.comm_code == variety_code,
+            MarketAnalysisSummary.date == target_date
+        ).limit(1)
+    )).scalars().first()
 
     if not summary:
         raise HTTPException(status_code=404, detail=f"未找到品种 {variety_code} 在 {target_date} 的数据")
@@ -198,3 +192,91 @@ async def get_variety_summary(
         "direction": summary.total_direction.value if summary.total_direction else "中性",
         "reason": summary.main_reason or ""
     }
+
+
+class BackfillRequest(BaseModel):
+    """历史回填参数"""
+    start_date: date
+    end_date: date
+    workers: int = Field(min(4, MAX_WORKERS), ge=1, le=MAX_WORKERS, description="进程数，不超过CPU核数")
+    chunk_days: int = Field(20, ge=1)
+    trading_days_only: bool = True
+    comm_codes: Optional[List[str]] = Field(None, description="限定品种代码（字母数字），默认全部")
+    restart: bool = False
+
+
+@router.post("/backfill")
+async def start_backfill(request: BackfillRequest):
+    """
+    按日期区间并行重算四维总览（后台执行，立即返回 run_id）
+    相同参数再次提交会从检查点续跑
+    """
+    try:
+        backfill = AnalysisBackfill(
+            request.start_date,
+            request.end_date,
+            workers=request.workers,
+            chunk_days=request.chunk_days,
+            trading_days_only=request.trading_days_only,
+            comm_codes=request.comm_codes
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    started = start_backfill_in_background(backfill, restart=request.restart)
+    return {
+        "run_id": backfill.run_id,
+        "started": started,
+        "message": "回填已启动" if started else "该区间的回填正在运行"
+    }
+
+
+@router.get("/backfill/{run_id}")
+async def get_backfill_status(run_id: str):
+    """查询回填进度"""
+    checkpoint = load_checkpoint(run_id)
+    if checkpoint is None:
+        raise HTTPException(status_code=404, detail=f"未找到回填任务: {run_id}")
+
+    completed_days = checkpoint.pop("completed_days", [])
+    return {
+        **checkpoint,
+        "done_days": len(completed_days),
+        "last_completed_day": completed_days[-1] if completed_days else None
+    }
+
+
+@router.get("/backtest")
+def backtest(
+    start_date: date = Query(..., description="信号开始日期"),
+    end_date: date = Query(..., description="信号结束日期"),
+    horizons: str = Query("1,5,10", description="持有期（交易日），逗号分隔"),
+    codes: Optional[str] = Query(None, description="限定品种代码，逗号分隔"),
+    recompute: bool = Query(False, description="按当前规则重算得分，而不是读取已保存的结果"),
+    entry_lag: int = Query(1, ge=0, le=5, description="信号日之后第几个交易日收盘入场"),
+    db: Session = Depends(get_db)
+):
+    """
+    四维信号回测：方向信号与各维度得分的胜率、前瞻收益与 IC
+    （同步计算，由 FastAPI 放入线程池执行，不阻塞事件循环）
+    """
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail=f"开始日期 {start_date} 晚于结束日期 {end_date}")
+    try:
+        horizon_list = sorted({int(h) for h in horizons.split(",") if h.strip()})
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"持有期格式错误: {horizons}")
+    if not horizon_list or min(horizon_list) < 1:
+        raise HTTPException(status_code=400, detail="持有期必须为正整数")
+
+    comm_codes = [c.strip().upper() for c in codes.split(",") if c.strip()] if codes else None
+    try:
+        return backtest_signals(
+            db, start_date, end_date,
+            horizons=horizon_list,
+            comm_codes=comm_codes,
+            recompute=recompute,
+            entry_lag=entry_lag
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
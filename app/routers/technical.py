@@ -3,9 +3,9 @@
 提供波动率、期限结构等技术指标数据
 """
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from app.models.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, func, select
+from app.models.database import get_async_db
 from app.models.models import TechnicalIndicator
 from typing import List, Optional
 from pydantic import BaseModel
@@ -29,15 +29,17 @@ class TechIndicator(BaseModel):
 @router.get("/{variety_code}/indicators")
 async def get_technical_indicators(
         variety_code: str,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取品种的技术指标
     """
     # 获取最新一条记录
-    indicator = db.query(TechnicalIndicator).filter(
-        TechnicalIndicator.comm_code == variety_code
-    ).order_by(desc(TechnicalIndicator.record_time)).first()
+    indicator = (await db.execute(
+        select(TechnicalIndicator).where(
+            TechnicalIndicator.comm_code == variety_code
+        ).order_by(desc(TechnicalIndicator.record_time)).limit(1)
+    )).scalars().first()
 
     if not indicator:
         raise HTTPException(status_code=404, detail=f"未找到品种 {variety_code} 的技术指标数据")
@@ -56,14 +58,16 @@ async def get_technical_indicators(
 @router.get("/{variety_code}/structure")
 async def get_term_structure(
         variety_code: str,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取品种的期限结构
     """
-    indicator = db.query(TechnicalIndicator).filter(
-        TechnicalIndicator.comm_code == variety_code
-    ).order_by(desc(TechnicalIndicator.record_time)).first()
+    indicator = (await db.execute(
+        select(TechnicalIndicator).where(
+            TechnicalIndicator.comm_code == variety_code
+        ).order_by(desc(TechnicalIndicator.record_time)).limit(1)
+    )).scalars().first()
 
     if not indicator:
         raise HTTPException(status_code=404, detail=f"未找到数据")
@@ -95,7 +99,7 @@ async def get_term_structure(
 async def get_iv_history(
         variety_code: str,
         days: int = Query(30, ge=1, le=90),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取品种的历史波动率
@@ -103,10 +107,12 @@ async def get_iv_history(
     end_time = datetime.now()
     start_time = end_time - timedelta(days=days)
 
-    indicators = db.query(TechnicalIndicator).filter(
-        TechnicalIndicator.comm_code == variety_code,
-        TechnicalIndicator.record_time.between(start_time, end_time)
-    ).order_by(TechnicalIndicator.record_time).all()
+    indicators = (await db.execute(
+        select(TechnicalIndicator).where(
+            TechnicalIndicator.comm_code == variety_code,
+            TechnicalIndicator.record_time.between(start_time, end_time)
+        ).order_by(TechnicalIndicator.record_time)
+    )).scalars().all()
 
     if not indicators:
         return {
@@ -130,25 +136,25 @@ async def get_iv_history(
 
 @router.get("/structures/significant")
 async def get_significant_structures(
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取所有明显期限结构的品种
     (contango 或 back 结构明显的品种)
     """
     # 获取所有最新的技术指标
-    from sqlalchemy import func
-
-    subq = db.query(
+    subq = select(
         TechnicalIndicator.comm_code,
         func.max(TechnicalIndicator.record_time).label('max_time')
     ).group_by(TechnicalIndicator.comm_code).subquery()
 
-    latest_indicators = db.query(TechnicalIndicator).join(
-        subq,
-        (TechnicalIndicator.comm_code == subq.c.comm_code) &
-        (TechnicalIndicator.record_time == subq.c.max_time)
-    ).all()
+    latest_indicators = (await db.execute(
+        select(TechnicalIndicator).join(
+            subq,
+            (TechnicalIndicator.comm_code == subq.c.comm_code) &
+            (TechnicalIndicator.record_time == subq.c.max_time)
+        )
+    )).scalars().all()
 
     contango_varieties = []
     back_varieties = []
@@ -2,54 +2,118 @@
 期限结构模块 API
 提供期货合约期限结构数据
 """
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List, Dict
-import json
 from datetime import datetime, date
 from pathlib import Path
 import logging
 
+from app.models.database import get_async_db
+from app.services.json_file_cache import JsonSnapshot, get_json_file_cache
+from app.services.term_structure_store import load_structures, load_variety_history, resolve_snapshot_date
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
+RECOMMENDED_DATA_FILE = DATA_DIR / "term_structure_data.json"
+ALL_DATA_FILE = DATA_DIR / "term_structure_data_all.json"
+
+
+def _recommended_snapshot() -> Optional[JsonSnapshot]:
+    """推荐品种 (S/A级) 数据的当前版本（文件未变化时复用内存中的解析结果）"""
+    return get_json_file_cache(RECOMMENDED_DATA_FILE).get()
+
+
+def _all_snapshot() -> Optional[JsonSnapshot]:
+    """所有品种数据的当前版本"""
+    return get_json_file_cache(ALL_DATA_FILE).get()
+
+
 def load_term_structure_data():
     """
     从JSON文件加载期限结构数据 (推荐品种,S/A级)
     """
-    data_file = Path(__file__).parent.parent.parent / "data" / "term_structure_data.json"
-
-    if not data_file.exists():
-        logger.warning(f"期限结构数据文件不存在: {data_file}")
-        return None
-
-    try:
-        with open(data_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        return data
-    except Exception as e:
-        logger.error(f"加载期限结构数据失败: {e}")
-        return None
+    snapshot = _recommended_snapshot()
+    return snapshot.data if snapshot else None
 
 
 def load_all_term_structure_data():
     """
     从JSON文件加载所有品种的期限结构数据
     """
-    data_file = Path(__file__).parent.parent.parent / "data" / "term_structure_data_all.json"
+    snapshot = _all_snapshot()
+    return snapshot.data if snapshot else None
 
-    if not data_file.exists():
-        logger.warning(f"所有品种数据文件不存在: {data_file}")
-        return None
 
-    try:
-        with open(data_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        return data
-    except Exception as e:
-        logger.error(f"加载所有品种数据失败: {e}")
-        return None
+def _json_response(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
+
+
+def _split_all_structures(all_data: Dict) -> Dict[str, List[Dict]]:
+    """所有品种按市场结构分类（正向市场 -> contango，反向市场 -> backwardation）"""
+    contango_varieties = []  # Contango结构品种(做空)
+    backwardation_varieties = []  # Backwardation结构品种(做多)
+
+    for variety_code, variety_data in all_data.items():
+        variety_info = {
+            "variety_code": variety_data["variety_code"],
+            "variety_name": variety_data["variety_name"],
+            "market_structure": variety_data["market_structure"],
+            "structure_desc": variety_data["structure_desc"],
+            "trade_suggestion": variety_data["trade_suggestion"],
+            "trade_reason": variety_data["trade_reason"],
+            "contracts": variety_data["contracts"],
+            "total_contracts": variety_data["total_contracts"],
+            "grade": variety_data.get("grade", "C"),
+            "structure_score": variety_data.get("structure_score", 0),
+            "recommend": variety_data.get("recommend", False),
+            "update_time": variety_data.get("update_time", "")
+        }
+
+        # 根据市场结构分类
+        if variety_data["market_structure"] == "正向市场":
+            contango_varieties.append(variety_info)
+        elif variety_data["market_structure"] == "反向市场":
+            backwardation_varieties.append(variety_info)
+
+    return {"contango": contango_varieties, "backwardation": backwardation_varieties}
+
+
+def _split_recommended_structures(recommended_data: Dict) -> Dict[str, List[Dict]]:
+    """推荐品种按市场结构分类，并按结构得分降序"""
+    contango_varieties = []  # Contango结构品种(做空)
+    backwardation_varieties = []  # Backwardation结构品种(做多)
+
+    for variety_code, variety_data in recommended_data.items():
+        variety_info = {
+            "variety_code": variety_data["variety_code"],
+            "variety_name": variety_data["variety_name"],
+            "market_structure": variety_data["market_structure"],
+            "structure_desc": variety_data["structure_desc"],
+            "trade_suggestion": variety_data["trade_suggestion"],
+            "trade_reason": variety_data["trade_reason"],
+            "contracts": variety_data["contracts"],
+            "total_contracts": variety_data["total_contracts"],
+            "grade": variety_data.get("grade", "A"),
+            "structure_score": variety_data.get("structure_score", 0),
+            "update_time": variety_data.get("update_time", "")
+        }
+
+        # 根据市场结构分类
+        if variety_data["market_structure"] == "正向市场":
+            contango_varieties.append(variety_info)
+        elif variety_data["market_structure"] == "反向市场":
+            backwardation_varieties.append(variety_info)
+
+    # 按得分排序
+    contango_varieties.sort(key=lambda x: x['structure_score'], reverse=True)
+    backwardation_varieties.sort(key=lambda x: x['structure_score'], reverse=True)
+
+    return {"contango": contango_varieties, "backwardation": backwardation_varieties}
 
 
 @router.get("/varieties")
@@ -84,10 +148,61 @@ async def get_available_varieties():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _parse_date(value: str) -> date:
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"日期格式错误: {value}，应为 YYYY-MM-DD")
+
+
+async def _load_dated_structures(
+    db: AsyncSession,
+    query_date: str,
+    recommended_only: bool,
+    comm_code: Optional[str] = None
+):
+    """
+    从快照表读取指定日期的期限结构（非交易日取之前最近的快照）
+
+    Returns:
+        (快照日期, {品种代码: 品种数据})
+    """
+    snapshot_date = await db.run_sync(resolve_snapshot_date, _parse_date(query_date))
+    if snapshot_date is None:
+        raise HTTPException(status_code=404, detail=f"{query_date} 及之前没有期限结构快照")
+    return snapshot_date, await db.run_sync(load_structures, snapshot_date, recommended_only, comm_code)
+
+
+def _variety_structure(variety_data: Dict, query_date: Optional[str]) -> Dict:
+    """单个品种的期限结构响应"""
+    return {
+        "success": True,
+        "variety_code": variety_data["variety_code"],
+        "query_date": query_date or date.today().strftime('%Y-%m-%d'),
+        "market_structure": variety_data["market_structure"],
+        "structure_desc": variety_data["structure_desc"],
+        "trade_suggestion": variety_data["trade_suggestion"],
+        "trade_reason": variety_data["trade_reason"],
+        "contracts": variety_data["contracts"],
+        "total_contracts": variety_data["total_contracts"],
+        "update_time": variety_data.get("update_time", "")
+    }
+
+
+def _variety_not_found(variety_code: str) -> Dict:
+    return {
+        "success": False,
+        "variety_code": variety_code,
+        "message": f"未找到品种 {variety_code} 的数据",
+        "contracts": []
+    }
+
+
 @router.get("/structure/{variety_code}")
 async def get_term_structure(
     variety_code: str,
-    query_date: Optional[str] = Query(None, description="查询日期 YYYY-MM-DD")
+    query_date: Optional[str] = Query(None, description="查询日期 YYYY-MM-DD，为空时返回最新数据"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取指定品种的期限结构数据
@@ -97,38 +212,34 @@ async def get_term_structure(
     try:
         variety_code = variety_code.upper()
 
-        # 从JSON文件加载数据
-        all_data = load_term_structure_data()
+        # 指定日期：从快照表查询历史
+        if query_date:
+            snapshot_date, dated_data = await _load_dated_structures(
+                db, query_date, recommended_only=True, comm_code=variety_code
+            )
+            variety_data = dated_data.get(variety_code)
+            if not variety_data:
+                return _variety_not_found(variety_code)
+            return {**_variety_structure(variety_data, query_date), "snapshot_date": snapshot_date.isoformat()}
+
+        response_date = query_date or date.today().strftime('%Y-%m-%d')
+
+        # 从JSON文件加载数据（文件未变化时直接返回缓存的响应）
+        snapshot = _recommended_snapshot()
 
-        if all_data is None:
+        if snapshot is None:
             raise HTTPException(
                 status_code=500,
                 detail="无法加载期限结构数据,请稍后重试"
             )
 
-        # 获取指定品种的数据
-        variety_data = all_data.get(variety_code)
+        def build():
+            variety_data = snapshot.data.get(variety_code)
+            if not variety_data:
+                return _variety_not_found(variety_code)
+            return _variety_structure(variety_data, response_date)
 
-        if not variety_data:
-            return {
-                "success": False,
-                "variety_code": variety_code,
-                "message": f"未找到品种 {variety_code} 的数据",
-                "contracts": []
-            }
-
-        return {
-            "success": True,
-            "variety_code": variety_data["variety_code"],
-            "query_date": query_date or date.today().strftime('%Y-%m-%d'),
-            "market_structure": variety_data["market_structure"],
-            "structure_desc": variety_data["structure_desc"],
-            "trade_suggestion": variety_data["trade_suggestion"],
-            "trade_reason": variety_data["trade_reason"],
-            "contracts": variety_data["contracts"],
-            "total_contracts": variety_data["total_contracts"],
-            "update_time": variety_data.get("update_time", "")
-        }
+        return _json_response(snapshot.render(("structure", variety_code, response_date), build))
 
     except HTTPException:
         raise
@@ -140,57 +251,55 @@ async def get_term_structure(
 
 
 @router.get("/all-structures")
-async def get_all_term_structures(query_date: Optional[str] = Query(None, description="查询日期 YYYY-MM-DD")):
+async def get_all_term_structures(
+    query_date: Optional[str] = Query(None, description="查询日期 YYYY-MM-DD，为空时返回最新数据"),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
     获取所有品种的期限结构数据 (包含所有品种)
 
     返回所有支持品种的期限结构汇总,包括Contango和Backwardation分类
     """
     try:
+        # 指定日期：从快照表查询历史
+        if query_date:
+            snapshot_date, dated_data = await _load_dated_structures(db, query_date, recommended_only=False)
+            split = _split_all_structures(dated_data)
+            return {
+                "success": True,
+                "query_date": query_date,
+                "snapshot_date": snapshot_date.isoformat(),
+                "total_varieties": len(dated_data),
+                "contango_count": len(split["contango"]),
+                "backwardation_count": len(split["backwardation"]),
+                "contango_varieties": split["contango"],
+                "backwardation_varieties": split["backwardation"]
+            }
+
         # 从JSON文件加载所有品种数据
-        all_data = load_all_term_structure_data()
+        snapshot = _all_snapshot()
 
-        if all_data is None:
+        if snapshot is None:
             raise HTTPException(
                 status_code=500,
                 detail="无法加载期限结构数据,请稍后重试"
             )
 
-        contango_varieties = []  # Contango结构品种(做空)
-        backwardation_varieties = []  # Backwardation结构品种(做多)
-
-        # 分类所有品种
-        for variety_code, variety_data in all_data.items():
-            variety_info = {
-                "variety_code": variety_data["variety_code"],
-                "variety_name": variety_data["variety_name"],
-                "market_structure": variety_data["market_structure"],
-                "structure_desc": variety_data["structure_desc"],
-                "trade_suggestion": variety_data["trade_suggestion"],
-                "trade_reason": variety_data["trade_reason"],
-                "contracts": variety_data["contracts"],
-                "total_contracts": variety_data["total_contracts"],
-                "grade": variety_data.get("grade", "C"),
-                "structure_score": variety_data.get("structure_score", 0),
-                "recommend": variety_data.get("recommend", False),
-                "update_time": variety_data.get("update_time", "")
-            }
+        response_date = query_date or date.today().strftime('%Y-%m-%d')
 
-            # 根据市场结构分类
-            if variety_data["market_structure"] == "正向市场":
-                contango_varieties.append(variety_info)
-            elif variety_data["market_structure"] == "反向市场":
-                backwardation_varieties.append(variety_info)
+        def build():
+            split = snapshot.derive("split", _split_all_structures)
+            return {
+                "success": True,
+                "query_date": response_date,
+                "total_varieties": len(snapshot.data),
+                "contango_count": len(split["contango"]),
+                "backwardation_count": len(split["backwardation"]),
+                "contango_varieties": split["contango"],
+                "backwardation_varieties": split["backwardation"]
+            }
 
-        return {
-            "success": True,
-            "query_date": query_date or date.today().strftime('%Y-%m-%d'),
-            "total_varieties": len(all_data),
-            "contango_count": len(contango_varieties),
-            "backwardation_count": len(backwardation_varieties),
-            "contango_varieties": contango_varieties,
-            "backwardation_varieties": backwardation_varieties
-        }
+        return _json_response(snapshot.render(("all-structures", response_date), build))
 
     except HTTPException:
         raise
@@ -202,60 +311,55 @@ async def get_all_term_structures(query_date: Optional[str] = Query(None, descri
 
 
 @router.get("/recommended-structures")
-async def get_recommended_term_structures(query_date: Optional[str] = Query(None, description="查询日期 YYYY-MM-DD")):
+async def get_recommended_term_structures(
+    query_date: Optional[str] = Query(None, description="查询日期 YYYY-MM-DD，为空时返回最新数据"),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
     获取推荐的期限结构品种 (S/A级)
 
     返回最符合Contango/Backwardation结构的品种
     """
     try:
+        # 指定日期：从快照表查询历史
+        if query_date:
+            snapshot_date, dated_data = await _load_dated_structures(db, query_date, recommended_only=True)
+            split = _split_recommended_structures(dated_data)
+            return {
+                "success": True,
+                "query_date": query_date,
+                "snapshot_date": snapshot_date.isoformat(),
+                "total_varieties": len(dated_data),
+                "contango_count": len(split["contango"]),
+                "backwardation_count": len(split["backwardation"]),
+                "contango_varieties": split["contango"],
+                "backwardation_varieties": split["backwardation"]
+            }
+
         # 从JSON文件加载推荐品种数据
-        recommended_data = load_term_structure_data()
+        snapshot = _recommended_snapshot()
 
-        if recommended_data is None:
+        if snapshot is None:
             raise HTTPException(
                 status_code=500,
                 detail="无法加载推荐品种数据,请稍后重试"
             )
 
-        contango_varieties = []  # Contango结构品种(做空)
-        backwardation_varieties = []  # Backwardation结构品种(做多)
-
-        # 分类推荐品种
-        for variety_code, variety_data in recommended_data.items():
-            variety_info = {
-                "variety_code": variety_data["variety_code"],
-                "variety_name": variety_data["variety_name"],
-                "market_structure": variety_data["market_structure"],
-                "structure_desc": variety_data["structure_desc"],
-                "trade_suggestion": variety_data["trade_suggestion"],
-                "trade_reason": variety_data["trade_reason"],
-                "contracts": variety_data["contracts"],
-                "total_contracts": variety_data["total_contracts"],
-                "grade": variety_data.get("grade", "A"),
-                "structure_score": variety_data.get("structure_score", 0),
-                "update_time": variety_data.get("update_time", "")
-            }
-
-            # 根据市场结构分类
-            if variety_data["market_structure"] == "正向市场":
-                contango_varieties.append(variety_info)
-            elif variety_data["market_structure"] == "反向市场":
-                backwardation_varieties.append(variety_info)
+        response_date = query_date or date.today().strftime('%Y-%m-%d')
 
-        # 按得分排序
-        contango_varieties.sort(key=lambda x: x['structure_score'], reverse=True)
-        backwardation_varieties.sort(key=lambda x: x['structure_score'], reverse=True)
+        def build():
+            split = snapshot.derive("split", _split_recommended_structures)
+            return {
+                "success": True,
+                "query_date": response_date,
+                "total_varieties": len(snapshot.data),
+                "contango_count": len(split["contango"]),
+                "backwardation_count": len(split["backwardation"]),
+                "contango_varieties": split["contango"],
+                "backwardation_varieties": split["backwardation"]
+            }
 
-        return {
-            "success": True,
-            "query_date": query_date or date.today().strftime('%Y-%m-%d'),
-            "total_varieties": len(recommended_data),
-            "contango_count": len(contango_varieties),
-            "backwardation_count": len(backwardation_varieties),
-            "contango_varieties": contango_varieties,
-            "backwardation_varieties": backwardation_varieties
-        }
+        return _json_response(snapshot.render(("recommended-structures", response_date), build))
 
     except HTTPException:
         raise
@@ -266,6 +370,74 @@ async def get_recommended_term_structures(query_date: Optional[str] = Query(None
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _structure_analysis(variety_code: str, variety_data: Optional[Dict]) -> Dict:
+    """计算相邻合约价差、年化展期收益率与套利机会"""
+    if not variety_data:
+        return _variety_not_found(variety_code)
+
+    contracts = variety_data["contracts"]
+
+    if len(contracts) < 2:
+        return {
+            "success": False,
+            "message": "合约数量不足，无法进行分析"
+        }
+
+    # 计算相邻合约价差和年化展期收益率
+    spreads = []
+    for i in range(len(contracts) - 1):
+        near = contracts[i]
+        far = contracts[i + 1]
+
+        price_diff = far['price'] - near['price']
+        price_diff_pct = (price_diff / near['price']) * 100
+
+        # 计算月份差异（简化计算）
+        try:
+            near_month = int(near['month'][-2:])  # 取最后两位作为月份
+            far_month = int(far['month'][-2:])
+            month_diff = far_month - near_month
+            if month_diff <= 0:
+                month_diff += 12
+
+            # 年化收益率
+            annualized_return = (price_diff_pct / month_diff) * 12
+        except:
+            month_diff = 1
+            annualized_return = 0
+
+        spreads.append({
+            "near_contract": near['symbol'],
+            "far_contract": far['symbol'],
+            "price_diff": round(price_diff, 2),
+            "price_diff_pct": round(price_diff_pct, 2),
+            "annualized_return": round(annualized_return, 2),
+            "month_diff": month_diff
+        })
+
+    # 寻找套利机会
+    arbitrage_opportunities = []
+    for spread in spreads:
+        if abs(spread['annualized_return']) > 10:  # 年化收益率超过10%
+            direction = "做多近月做空远月" if spread['annualized_return'] < 0 else "做多远月做空近月"
+            arbitrage_opportunities.append({
+                "spread": f"{spread['near_contract']}-{spread['far_contract']}",
+                "annualized_return": spread['annualized_return'],
+                "direction": direction,
+                "risk_level": "高" if abs(spread['annualized_return']) > 20 else "中"
+            })
+
+    return {
+        "success": True,
+        "variety_code": variety_code,
+        "market_structure": variety_data["market_structure"],
+        "structure_desc": variety_data["structure_desc"],
+        "spreads": spreads,
+        "arbitrage_opportunities": arbitrage_opportunities,
+        "total_opportunities": len(arbitrage_opportunities)
+    }
+
+
 @router.get("/analysis/{variety_code}")
 async def get_term_structure_analysis(variety_code: str):
     """
@@ -276,75 +448,50 @@ async def get_term_structure_analysis(variety_code: str):
         variety_code = variety_code.upper()
 
         # 获取期限结构数据
-        structure_response = await get_term_structure(variety_code)
-
-        if not structure_response['success']:
-            return structure_response
+        snapshot = _recommended_snapshot()
 
-        contracts = structure_response['contracts']
-
-        if len(contracts) < 2:
-            return {
-                "success": False,
-                "message": "合约数量不足，无法进行分析"
-            }
-
-        # 计算相邻合约价差和年化展期收益率
-        spreads = []
-        for i in range(len(contracts) - 1):
-            near = contracts[i]
-            far = contracts[i + 1]
-
-            price_diff = far['price'] - near['price']
-            price_diff_pct = (price_diff / near['price']) * 100
-
-            # 计算月份差异（简化计算）
-            try:
-                near_month = int(near['month'][-2:])  # 取最后两位作为月份
-                far_month = int(far['month'][-2:])
-                month_diff = far_month - near_month
-                if month_diff <= 0:
-                    month_diff += 12
-
-                # 年化收益率
-                annualized_return = (price_diff_pct / month_diff) * 12
-            except:
-                month_diff = 1
-                annualized_return = 0
-
-            spreads.append({
-                "near_contract": near['symbol'],
-                "far_contract": far['symbol'],
-                "price_diff": round(price_diff, 2),
-                "price_diff_pct": round(price_diff_pct, 2),
-                "annualized_return": round(annualized_return, 2),
-                "month_diff": month_diff
-            })
-
-        # 寻找套利机会
-        arbitrage_opportunities = []
-        for spread in spreads:
-            if abs(spread['annualized_return']) > 10:  # 年化收益率超过10%
-                direction = "做多近月做空远月" if spread['annualized_return'] < 0 else "做多远月做空近月"
-                arbitrage_opportunities.append({
-                    "spread": f"{spread['near_contract']}-{spread['far_contract']}",
-                    "annualized_return": spread['annualized_return'],
-                    "direction": direction,
-                    "risk_level": "高" if abs(spread['annualized_return']) > 20 else "中"
-                })
+        if snapshot is None:
+            raise HTTPException(
+                status_code=500,
+                detail="无法加载期限结构数据,请稍后重试"
+            )
 
-        return {
-            "success": True,
-            "variety_code": variety_code,
-            "market_structure": structure_response['market_structure'],
-            "structure_desc": structure_response['structure_desc'],
-            "spreads": spreads,
-            "arbitrage_opportunities": arbitrage_opportunities,
-            "total_opportunities": len(arbitrage_opportunities)
-        }
+        body = snapshot.render(
+            ("analysis", variety_code),
+            lambda: _structure_analysis(variety_code, snapshot.data.get(variety_code))
+        )
+        return _json_response(body)
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"期限结构分析失败: {e}")
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/history/{variety_code}")
+async def get_term_structure_history(
+    variety_code: str,
+    start_date: Optional[str] = Query(None, description="开始日期 YYYY-MM-DD"),
+    end_date: Optional[str] = Query(None, description="结束日期 YYYY-MM-DD"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    获取品种期限结构的历史快照
+    用于绘制曲线形态随时间的变化
+    """
+    variety_code = variety_code.upper()
+    history = await db.run_sync(
+        load_variety_history,
+        variety_code,
+        start_date=_parse_date(start_date) if start_date else None,
+        end_date=_parse_date(end_date) if end_date else None
+    )
+    return {
+        "success": True,
+        "variety_code": variety_code,
+        "total_days": len(history),
+        "history": history
+    }
@@ -1,19 +1,27 @@
 """
 虚实比数据API路由
 """
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import desc, func, literal_column, select
 from typing import List, Optional
 from datetime import date, datetime, timedelta
 
-from app.models.database import get_db
+from app.models.database import get_db, get_async_db
 from app.models.models import WarehouseReceipt
+from app.services.trading_calendar import get_trading_calendar
 from pydantic import BaseModel
 
 
 router = APIRouter()
 
+# 默认返回的变化周期（数据期数）
+CHANGE_PERIODS = (1, 5, 20)
+MAX_CHANGE_PERIOD = 60
+# 品种个别日期缺数据时 LAG 会跨过更多日期，回看范围额外放宽的日期数
+LAG_GAP_ALLOWANCE = 10
+
 
 # 响应模型
 class VirtualRealRatioResponse(BaseModel):
@@ -49,120 +57,194 @@ class VirtualRealRatioSummary(BaseModel):
     high_risk_varieties: List[dict]
 
 
+async def _latest_record_date(db: AsyncSession) -> Optional[date]:
+    """仓单数据的最新日期"""
+    return (await db.execute(
+        select(WarehouseReceipt.record_date).order_by(desc(WarehouseReceipt.record_date)).limit(1)
+    )).scalar()
+
+
+def _pct(change: Optional[float], base: Optional[float]) -> Optional[float]:
+    if change is None or base is None:
+        return None
+    return round(change / base * 100, 2) if base != 0 else 0
+
+
+def _diff(current: Optional[float], prev: Optional[float]) -> Optional[float]:
+    if current is None or prev is None:
+        return None
+    return current - prev
+
+
+def _ratio_changes_query(
+    periods: List[int],
+    start_date: Optional[date],
+    end_date: Optional[date],
+    comm_code: Optional[str],
+    risk_level: Optional[str]
+):
+    """
+    虚实比列表及 N 期变化（单条 SQL）
+
+    内层按 品种 分区、日期 排序，用 LAG(列, n) 取每个品种往前第 n 条记录；
+    外层再按日期范围、风险等级筛选（风险等级不能放在内层，否则会改变 LAG 的取值）。
+    未指定日期时用 MAX(record_date) 子查询取最新日期。
+    """
+    wr = WarehouseReceipt
+    if start_date is None:
+        latest = select(func.max(wr.record_date)).scalar_subquery()
+        start_bound, end_bound = latest, latest
+    else:
+        start_bound, end_bound = start_date, end_date
+
+    # 内层只扫描起始日期往前 max(periods) + LAG_GAP_ALLOWANCE 个数据日期，避免对全部历史开窗
+    lookback = select(wr.record_date).where(
+        wr.record_date <= start_bound
+    ).distinct().order_by(desc(wr.record_date)).offset(
+        max(periods) + LAG_GAP_ALLOWANCE
+    ).limit(1).scalar_subquery()
+
+    lag_columns = []
+    for n in periods:
+        # 偏移量以字面量输出（MySQL 要求 LAG 的 N 为常量）
+        offset = literal_column(str(int(n)))
+        for column in ("record_date", "virtual_real_ratio", "receipt_quantity", "open_interest"):
+            source = getattr(wr, column)
+            lag_columns.append(
+                func.lag(source, offset, type_=source.type).over(
+                    partition_by=wr.comm_code, order_by=wr.record_date
+                ).label(f"prev_{column}_{n}")
+            )
+
+    inner = select(wr, *lag_columns).where(
+        wr.record_date >= func.coalesce(lookback, date(1970, 1, 1)),
+        wr.record_date <= end_bound
+    )
+    if comm_code:
+        inner = inner.where(wr.comm_code == comm_code.upper())
+    sub = inner.subquery()
+
+    query = select(sub).where(sub.c.record_date >= start_bound, sub.c.record_date <= end_bound)
+    if risk_level:
+        query = query.where(sub.c.squeeze_risk == risk_level)
+    return query.order_by(desc(sub.c.record_date), desc(sub.c.virtual_real_ratio))
+
+
+def _ratio_change_item(row, periods: List[int]) -> dict:
+    """单行结果转为接口返回格式，保留原有的上一期对比字段"""
+    item = {
+        "id": row["id"],
+        "comm_code": row["comm_code"],
+        "variety_name": row["variety_name"],
+        "record_date": row["record_date"].isoformat(),
+        "receipt_quantity": row["receipt_quantity"],
+        "receipt_change": row["receipt_change"],
+        "main_contract": row["main_contract"],
+        "open_interest": row["open_interest"],
+        "open_interest_change": row["open_interest_change"],
+        "contract_unit": row["contract_unit"],
+        "virtual_quantity": row["virtual_quantity"],
+        "virtual_real_ratio": row["virtual_real_ratio"],
+        "squeeze_risk": row["squeeze_risk"],
+        "impact_analysis": row["impact_analysis"],
+        "price_pressure": row["price_pressure"],
+        "created_at": row["created_at"].isoformat() if row["created_at"] else None,
+        "updated_at": row["updated_at"].isoformat() if row["updated_at"] else None,
+    }
+
+    # 上一期对比（兼容原字段）
+    prev_ratio = row["prev_virtual_real_ratio_1"]
+    if row["prev_record_date_1"] is not None:
+        ratio_change = _diff(row["virtual_real_ratio"], prev_ratio)
+        item["prev_virtual_real_ratio"] = prev_ratio
+        item["ratio_change"] = round(ratio_change, 2) if ratio_change is not None else None
+        item["ratio_change_pct"] = _pct(ratio_change, prev_ratio)
+        item["receipt_change_pct"] = _pct(row["receipt_change"], row["prev_receipt_quantity_1"])
+        item["oi_change_pct"] = _pct(row["open_interest_change"], row["prev_open_interest_1"])
+        item["prev_date"] = row["prev_record_date_1"].isoformat()
+    else:
+        item["prev_virtual_real_ratio"] = None
+        item["ratio_change"] = None
+        item["ratio_change_pct"] = None
+        item["receipt_change_pct"] = None
+        item["oi_change_pct"] = None
+        item["prev_date"] = None
+
+    # N 期变化
+    changes = {}
+    for n in periods:
+        prev_date = row[f"prev_record_date_{n}"]
+        if prev_date is None:
+            changes[f"{n}d"] = None
+            continue
+        prev_ratio = row[f"prev_virtual_real_ratio_{n}"]
+        prev_receipt = row[f"prev_receipt_quantity_{n}"]
+        prev_oi = row[f"prev_open_interest_{n}"]
+        ratio_change = _diff(row["virtual_real_ratio"], prev_ratio)
+        receipt_change = _diff(row["receipt_quantity"], prev_receipt)
+        oi_change = _diff(row["open_interest"], prev_oi)
+        changes[f"{n}d"] = {
+            "prev_date": prev_date.isoformat(),
+            "prev_virtual_real_ratio": prev_ratio,
+            "ratio_change": round(ratio_change, 2) if ratio_change is not None else None,
+            "ratio_change_pct": _pct(ratio_change, prev_ratio),
+            "receipt_change": receipt_change,
+            "receipt_change_pct": _pct(receipt_change, prev_receipt),
+            "oi_change": oi_change,
+            "oi_change_pct": _pct(oi_change, prev_oi),
+        }
+    item["changes"] = changes
+    return item
+
+
 @router.get("/list")
 async def get_virtual_real_ratio_list(
     query_date: Optional[str] = Query(None, description="查询日期 YYYY-MM-DD"),
+    start_date: Optional[str] = Query(None, description="开始日期 YYYY-MM-DD（与 end_date 组成日期范围）"),
+    end_date: Optional[str] = Query(None, description="结束日期 YYYY-MM-DD，默认今天"),
     comm_code: Optional[str] = Query(None, description="品种代码,如AU"),
     risk_level: Optional[str] = Query(None, description="风险等级: 高/中/低/无"),
-    db: Session = Depends(get_db)
+    periods: str = Query(",".join(map(str, CHANGE_PERIODS)), description="变化周期（数据期数），逗号分隔，如 1,5,20"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    获取虚实比数据列表,包含与上一期对比数据
+    获取虚实比数据列表,包含与前 N 期对比数据
+
+    - 默认返回最近一天的数据；query_date 指定单日；start_date/end_date 指定日期范围
+    - 每条记录的 changes 包含各周期（1d/5d/20d...）的变化，"上一期"为该品种自身的前第 N 条记录
+    - 结果按日期、虚实比降序排列
     """
-    query = db.query(WarehouseReceipt)
+    try:
+        period_list = {int(p) for p in periods.split(",") if p.strip()}
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"变化周期格式错误: {periods}")
+    if any(n < 1 or n > MAX_CHANGE_PERIOD for n in period_list):
+        raise HTTPException(status_code=400, detail=f"变化周期需在 1-{MAX_CHANGE_PERIOD} 之间")
+    # 原有的上一期对比字段依赖 1 期变化
+    period_list = sorted(period_list | {1})
 
     # 日期筛选
     if query_date:
-        target_date = datetime.strptime(query_date, "%Y-%m-%d").date()
-        query = query.filter(WarehouseReceipt.record_date == target_date)
+        start = end = datetime.strptime(query_date, "%Y-%m-%d").date()
+    elif start_date or end_date:
+        end = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else date.today()
+        start = datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else end
+        if start > end:
+            raise HTTPException(status_code=400, detail="开始日期不能晚于结束日期")
     else:
-        # 默认返回最近一天的数据
-        latest_date = db.query(WarehouseReceipt.record_date).order_by(
-            desc(WarehouseReceipt.record_date)
-        ).first()
-        if latest_date:
-            target_date = latest_date[0]
-            query = query.filter(WarehouseReceipt.record_date == target_date)
-        else:
-            return []
-
-    # 品种筛选
-    if comm_code:
-        query = query.filter(WarehouseReceipt.comm_code == comm_code.upper())
+        # 默认返回最近一天的数据（在同一条 SQL 中取最新日期）
+        start = end = None
 
-    # 风险等级筛选
-    if risk_level:
-        query = query.filter(WarehouseReceipt.squeeze_risk == risk_level)
-
-    # 按虚实比降序排列
-    results = query.order_by(desc(WarehouseReceipt.virtual_real_ratio)).all()
-
-    # 获取上一期数据进行对比
-    if results and target_date:
-        # 查找上一个交易日数据
-        prev_date = db.query(WarehouseReceipt.record_date).filter(
-            WarehouseReceipt.record_date < target_date
-        ).order_by(desc(WarehouseReceipt.record_date)).first()
-
-        prev_data_dict = {}
-        if prev_date:
-            prev_records = db.query(WarehouseReceipt).filter(
-                WarehouseReceipt.record_date == prev_date[0]
-            ).all()
-            prev_data_dict = {r.comm_code: r for r in prev_records}
-
-        # 构建返回数据,添加对比信息
-        response_data = []
-        for record in results:
-            item = {
-                "id": record.id,
-                "comm_code": record.comm_code,
-                "variety_name": record.variety_name,
-                "record_date": record.record_date.isoformat(),
-                "receipt_quantity": record.receipt_quantity,
-                "receipt_change": record.receipt_change,
-                "main_contract": record.main_contract,
-                "open_interest": record.open_interest,
-                "open_interest_change": record.open_interest_change,
-                "contract_unit": record.contract_unit,
-                "virtual_quantity": record.virtual_quantity,
-                "virtual_real_ratio": record.virtual_real_ratio,
-                "squeeze_risk": record.squeeze_risk,
-                "impact_analysis": record.impact_analysis,
-                "price_pressure": record.price_pressure,
-                "created_at": record.created_at.isoformat(),
-                "updated_at": record.updated_at.isoformat(),
-            }
-
-            # 添加对比数据
-            if record.comm_code in prev_data_dict:
-                prev = prev_data_dict[record.comm_code]
-
-                # 虚实比变化
-                ratio_change = record.virtual_real_ratio - prev.virtual_real_ratio
-                ratio_change_pct = (ratio_change / prev.virtual_real_ratio * 100) if prev.virtual_real_ratio != 0 else 0
-
-                # 仓单变化百分比
-                receipt_change_pct = (record.receipt_change / prev.receipt_quantity * 100) if prev.receipt_quantity != 0 else 0
-
-                # 持仓变化百分比
-                oi_change_pct = (record.open_interest_change / prev.open_interest * 100) if prev.open_interest != 0 else 0
-
-                item["prev_virtual_real_ratio"] = prev.virtual_real_ratio
-                item["ratio_change"] = round(ratio_change, 2)
-                item["ratio_change_pct"] = round(ratio_change_pct, 2)
-                item["receipt_change_pct"] = round(receipt_change_pct, 2)
-                item["oi_change_pct"] = round(oi_change_pct, 2)
-                item["prev_date"] = prev_date[0].isoformat()
-            else:
-                item["prev_virtual_real_ratio"] = None
-                item["ratio_change"] = None
-                item["ratio_change_pct"] = None
-                item["receipt_change_pct"] = None
-                item["oi_change_pct"] = None
-                item["prev_date"] = None
-
-            response_data.append(item)
-
-        return response_data
-
-    return []
+    rows = (await db.execute(
+        _ratio_changes_query(period_list, start, end, comm_code, risk_level)
+    )).mappings().all()
+    return [_ratio_change_item(row, period_list) for row in rows]
 
 
 @router.get("/summary", response_model=VirtualRealRatioSummary)
 async def get_virtual_real_ratio_summary(
     query_date: Optional[str] = Query(None, description="查询日期 YYYY-MM-DD"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取虚实比汇总统计
@@ -171,15 +253,12 @@ async def get_virtual_real_ratio_summary(
     if query_date:
         target_date = datetime.strptime(query_date, "%Y-%m-%d").date()
     else:
-        latest_date = db.query(WarehouseReceipt.record_date).order_by(
-            desc(WarehouseReceipt.record_date)
-        ).first()
-        target_date = latest_date[0] if latest_date else date.today()
+        target_date = await _latest_record_date(db) or get_trading_calendar().latest_trading_day()
 
     # 查询该日期的所有数据
-    records = db.query(WarehouseReceipt).filter(
-        WarehouseReceipt.record_date == target_date
-    ).all()
+    records = (await db.execute(
+        select(WarehouseReceipt).where(WarehouseReceipt.record_date == target_date)
+    )).scalars().all()
 
     # 统计各风险等级数量
     high_risk = [r for r in records if r.squeeze_risk == "高"]
@@ -210,7 +289,7 @@ async def get_virtual_real_ratio_summary(
 async def get_virtual_real_ratio_detail(
     comm_code: str,
     query_date: Optional[str] = Query(None, description="查询日期 YYYY-MM-DD"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取指定品种的虚实比详情
@@ -219,18 +298,16 @@ async def get_virtual_real_ratio_detail(
     if query_date:
         target_date = datetime.strptime(query_date, "%Y-%m-%d").date()
     else:
-        latest_date = db.query(WarehouseReceipt.record_date).order_by(
-            desc(WarehouseReceipt.record_date)
-        ).first()
-        target_date = latest_date[0] if latest_date else date.today()
+        target_date = await _latest_record_date(db) or get_trading_calendar().latest_trading_day()
 
-    record = db.query(WarehouseReceipt).filter(
-        WarehouseReceipt.comm_code == comm_code.upper(),
-        WarehouseReceipt.record_date == target_date
-    ).first()
+    record = (await db.execute(
+        select(WarehouseReceipt).where(
+            WarehouseReceipt.comm_code == comm_code.upper(),
+            WarehouseReceipt.record_date == target_date
+        ).limit(1)
+    )).scalars().first()
 
     if not record:
-        from fastapi import HTTPException
         raise HTTPException(status_code=404, detail=f"未找到品种 {comm_code} 在日期 {target_date} 的数据")
 
     return record
@@ -240,7 +317,7 @@ async def get_virtual_real_ratio_detail(
 async def get_virtual_real_ratio_history(
     comm_code: str,
     days: int = Query(30, description="查询天数", ge=1, le=365),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取指定品种的虚实比历史数据
@@ -248,11 +325,13 @@ async def get_virtual_real_ratio_history(
     end_date = date.today()
     start_date = end_date - timedelta(days=days)
 
-    records = db.query(WarehouseReceipt).filter(
-        WarehouseReceipt.comm_code == comm_code.upper(),
-        WarehouseReceipt.record_date >= start_date,
-        WarehouseReceipt.record_date <= end_date
-    ).order_by(WarehouseReceipt.record_date).all()
+    records = (await db.execute(
+        select(WarehouseReceipt).where(
+            WarehouseReceipt.comm_code == comm_code.upper(),
+            WarehouseReceipt.record_date >= start_date,
+            WarehouseReceipt.record_date <= end_date
+        ).order_by(WarehouseReceipt.record_date)
+    )).scalars().all()
 
     # 格式化为图表数据
     dates = [r.record_date.strftime("%Y-%m-%d") for r in records]
@@ -2,30 +2,104 @@
 智汇期讯API路由
 """
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, desc
-from app.models.database import get_db
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, desc, select
+from app.models.database import AsyncSessionLocal, get_async_db
 from app.models.models import ResearchReport, MarketFullView
-from datetime import date, datetime, timedelta
-from typing import List, Optional
+from app.services.ingestion import upsert_full_view, insert_research_reports
+from app.services.research_summary import (
+    build_summary, cache_to_summary, cached_summary_query, reports_hash, save_summary
+)
+from app.services.single_flight import get_single_flight
+from app.services.trading_calendar import get_trading_calendar
+from config.settings import get_settings
+from datetime import date, datetime
+from typing import Dict, List, Optional
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+WAIT_QUERY = Query(True, description="数据缺失时是否等待爬取完成；false 时立即返回 pending，后台爬取")
+
+
+def _pending_response(target_date: date) -> JSONResponse:
+    """数据缺失且不等待时的响应（后台爬取完成后再次请求即可取到数据）"""
+    return JSONResponse(status_code=202, content={
+        "success": True,
+        "status": "pending",
+        "date": target_date.strftime('%Y-%m-%d'),
+        "data": [],
+        "total": 0
+    })
+
+
+async def _crawl_full_view(target_date: date) -> int:
+    """爬取并保存某日的多空全景（使用独立会话，可在请求结束后继续运行）"""
+    from app.crawlers.zhihui_spider import ZhihuiQixunSpider
+
+    logger.info(f"数据库中没有{target_date}的多空全景数据,开始爬取...")
+    spider = ZhihuiQixunSpider()
+    full_view_data = await asyncio.to_thread(spider.fetch_full_view, publish_date=target_date)
+
+    async with AsyncSessionLocal() as session:
+        written = await session.run_sync(upsert_full_view, full_view_data, target_date)
+    logger.info(f"成功保存{written.inserted + written.updated}条多空全景数据到数据库")
+    return written.inserted + written.updated
+
+
+async def _crawl_research_reports(target_date: date) -> int:
+    """爬取并保存某日的研报（使用独立会话，可在请求结束后继续运行）"""
+    from app.crawlers.zhihui_spider import ZhihuiQixunSpider
+
+    logger.info(f"数据库中没有{target_date}的研报数据,开始爬取...")
+    settings = get_settings()
+    spider = ZhihuiQixunSpider()
+    # 分页获取当天的所有研报
+    try:
+        reports_data = await spider.fetch_all_research_reports(
+            start_date=target_date,
+            end_date=target_date,
+            page_size=settings.ZHIHUI_REPORT_PAGE_SIZE,
+            concurrency=settings.ZHIHUI_REPORT_CONCURRENCY
+        )
+    finally:
+        await spider.aclose()
+
+    async with AsyncSessionLocal() as session:
+        written = await session.run_sync(insert_research_reports, reports_data['reports'])
+    logger.info(f"成功保存{written.inserted}条研报到数据库")
+    return written.inserted
+
+
+async def _summarize_reports(
+    reports: List[ResearchReport],
+    comm_code: str,
+    target_date: date,
+    digest: str
+) -> Dict[str, str]:
+    """汇总研报并写入缓存（AI 调用放到线程池）"""
+    summary, cacheable = await asyncio.to_thread(build_summary, reports)
+    if cacheable:
+        async with AsyncSessionLocal() as session:
+            await session.run_sync(save_summary, comm_code, target_date, digest, len(reports), summary)
+    return summary
+
 
 @router.get("/latest-date")
-async def get_latest_trading_date(db: Session = Depends(get_db)):
+async def get_latest_trading_date(db: AsyncSession = Depends(get_async_db)):
     """
     获取数据库中最新的交易日期
     用于前端日期选择器默认值
     """
     try:
         # 从MarketFullView表查询最新日期
-        latest_record = db.query(MarketFullView.record_date).order_by(
-            desc(MarketFullView.record_date)
-        ).first()
+        latest_record = (await db.execute(
+            select(MarketFullView.record_date).order_by(desc(MarketFullView.record_date)).limit(1)
+        )).first()
 
         if latest_record:
             return {
@@ -33,74 +107,52 @@ async def get_latest_trading_date(db: Session = Depends(get_db)):
                 "latest_date": latest_record[0].strftime('%Y-%m-%d')
             }
         else:
-            # 如果没有数据,返回当前日期
+            # 如果没有数据,返回最近交易日
             return {
                 "success": True,
-                "latest_date": date.today().strftime('%Y-%m-%d')
+                "latest_date": get_trading_calendar().latest_trading_day().strftime('%Y-%m-%d')
             }
     except Exception as e:
         logger.error(f"获取最新交易日期失败: {e}")
         return {
             "success": False,
-            "latest_date": date.today().strftime('%Y-%m-%d')
+            "latest_date": get_trading_calendar().latest_trading_day().strftime('%Y-%m-%d')
         }
 
 
 @router.get("/full-view")
 async def get_full_view(
     query_date: Optional[str] = Query(None, description="查询日期 YYYY-MM-DD"),
-    db: Session = Depends(get_db)
+    wait: bool = WAIT_QUERY,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取智汇期讯多空全景数据
-    优先从数据库获取,没有则实时爬取并保存
+    优先从数据库获取,没有则实时爬取并保存（同一日期的并发请求只爬取一次）
     """
-    from app.crawlers.zhihui_spider import ZhihuiQixunSpider
-
     try:
         # 解析日期
         if query_date:
             target_date = datetime.strptime(query_date, '%Y-%m-%d').date()
         else:
-            target_date = date.today()
+            target_date = get_trading_calendar().latest_trading_day()
 
         # 先从数据库查询
-        records = db.query(MarketFullView).filter(
-            MarketFullView.record_date == target_date
-        ).all()
+        full_view_query = select(MarketFullView).where(MarketFullView.record_date == target_date)
+        records = (await db.execute(full_view_query)).scalars().all()
 
         # 如果数据库没有数据,从API获取并保存
         if not records:
-            logger.info(f"数据库中没有{target_date}的多空全景数据,开始爬取...")
-            spider = ZhihuiQixunSpider()
-            full_view_data = spider.fetch_full_view(publish_date=target_date)
-
-            # 保存到数据库
-            for item in full_view_data:
-                record = MarketFullView(
-                    comm_code=item['variety_code'],
-                    variety_name=item['variety_name'],
-                    record_date=target_date,
-                    excessive_num=item['excessive_num'],
-                    excessive_ratio=item['excessive_ratio'],
-                    neutral_num=item['neutral_num'],
-                    neutral_ratio=item['neutral_ratio'],
-                    empty_num=item['empty_num'],
-                    empty_ratio=item['empty_ratio'],
-                    total_num=item['sum'],
-                    more_port=item['more_port'],
-                    more_rate=item['more_rate'],
-                    main_sentiment=item['main_sentiment']
-                )
-                db.add(record)
+            key = ("full-view", target_date)
+            if not wait:
+                get_single_flight().start(key, lambda: _crawl_full_view(target_date))
+                return _pending_response(target_date)
+            await get_single_flight().do(key, lambda: _crawl_full_view(target_date))
 
-            db.commit()
-            logger.info(f"成功保存{len(full_view_data)}条多空全景数据到数据库")
-
-            # 重新查询
-            records = db.query(MarketFullView).filter(
-                MarketFullView.record_date == target_date
-            ).all()
+            # 爬取在独立会话中提交；结束本会话的读事务后再查询，
+            # 否则 REPEATABLE READ（MySQL 默认）下仍读取首次查询时的快照
+            await db.rollback()
+            records = (await db.execute(full_view_query)).scalars().all()
 
         # 转换为字典
         full_view_data = [
@@ -138,62 +190,36 @@ async def get_full_view(
 @router.get("/research-reports")
 async def get_research_reports(
     query_date: Optional[str] = Query(None, description="查询日期 YYYY-MM-DD"),
-    db: Session = Depends(get_db)
+    wait: bool = WAIT_QUERY,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取智汇期讯研报淘金数据
-    从数据库获取,如果没有则实时爬取
+    从数据库获取,如果没有则实时爬取（同一日期的并发请求只爬取一次）
     """
     try:
         # 解析日期
         if query_date:
             target_date = datetime.strptime(query_date, '%Y-%m-%d').date()
         else:
-            target_date = date.today()
+            target_date = get_trading_calendar().latest_trading_day()
 
         # 先从数据库查询
-        reports = db.query(ResearchReport).filter(
-            ResearchReport.publish_date == target_date
-        ).all()
+        reports_query = select(ResearchReport).where(ResearchReport.publish_date == target_date)
+        reports = (await db.execute(reports_query)).scalars().all()
 
         # 如果数据库没有数据,从API获取
         if not reports:
-            logger.info(f"数据库中没有{target_date}的研报数据,开始爬取...")
-            from app.crawlers.zhihui_spider import ZhihuiQixunSpider
-
-            spider = ZhihuiQixunSpider()
-            # 获取当天的所有研报 (可能有很多页,这里先获取100条)
-            reports_data = spider.fetch_research_reports(
-                start_date=target_date,
-                end_date=target_date,
-                limit=100
-            )
-
-            # 保存到数据库
-            for report_dict in reports_data['reports']:
-                report = ResearchReport(
-                    report_id=report_dict['report_id'],
-                    comm_code=report_dict['variety_code'],
-                    variety_name=report_dict['variety'],
-                    institution_id=report_dict['institution_id'],
-                    institution_name=report_dict['institution_name'],
-                    publish_date=datetime.strptime(report_dict['publish_date'], '%Y-%m-%d').date(),
-                    view_port=report_dict['view_port'],
-                    sentiment=report_dict['sentiment'],
-                    trade_logic=report_dict['trade_logic'],
-                    related_data=report_dict['related_data'],
-                    risk_factor=report_dict['risk_factor'],
-                    report_link=report_dict['link']
-                )
-                db.add(report)
-
-            db.commit()
-            logger.info(f"成功保存{len(reports_data['reports'])}条研报到数据库")
+            key = ("research-reports", target_date)
+            if not wait:
+                get_single_flight().start(key, lambda: _crawl_research_reports(target_date))
+                return _pending_response(target_date)
+            await get_single_flight().do(key, lambda: _crawl_research_reports(target_date))
 
-            # 重新查询
-            reports = db.query(ResearchReport).filter(
-                ResearchReport.publish_date == target_date
-            ).all()
+            # 爬取在独立会话中提交；结束本会话的读事务后再查询，
+            # 否则 REPEATABLE READ（MySQL 默认）下仍读取首次查询时的快照
+            await db.rollback()
+            reports = (await db.execute(reports_query)).scalars().all()
 
         # 转换为字典
         reports_list = [
@@ -231,26 +257,28 @@ async def get_research_reports(
 async def get_research_summary(
     comm_code: str = Query(..., description="品种代码,如RB"),
     query_date: Optional[str] = Query(None, description="查询日期 YYYY-MM-DD"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取某个品种的研报汇总
-    使用AI汇总交易逻辑、相关数据、风险因素
+    使用AI汇总交易逻辑、相关数据、风险因素（结果按研报集合缓存，每晚预计算）
     """
     try:
         # 解析日期
         if query_date:
             target_date = datetime.strptime(query_date, '%Y-%m-%d').date()
         else:
-            target_date = date.today()
+            target_date = get_trading_calendar().latest_trading_day()
 
         # 查询该品种在指定日期的所有研报
-        reports = db.query(ResearchReport).filter(
-            and_(
-                ResearchReport.comm_code == comm_code.upper(),
-                ResearchReport.publish_date == target_date
+        reports = (await db.execute(
+            select(ResearchReport).where(
+                and_(
+                    ResearchReport.comm_code == comm_code.upper(),
+                    ResearchReport.publish_date == target_date
+                )
             )
-        ).all()
+        )).scalars().all()
 
         if not reports:
             return {
@@ -265,29 +293,18 @@ async def get_research_summary(
                 }
             }
 
-        # 收集所有研报的内容
-        trade_logics = [r.trade_logic for r in reports if r.trade_logic]
-        related_datas = [r.related_data for r in reports if r.related_data]
-        risk_factors = [r.risk_factor for r in reports if r.risk_factor]
-
-        # 使用AI汇总(如果内容较多)
-        if len(trade_logics) > 1:
-            # 调用AI汇总服务
-            from app.services.analysis import summarize_research_reports
-
-            summary = summarize_research_reports(
-                trade_logics=trade_logics,
-                related_datas=related_datas,
-                risk_factors=risk_factors,
-                variety_name=reports[0].variety_name
-            )
+        # 按研报集合读取AI汇总缓存，未命中时汇总（同一研报集合的并发请求只调用一次AI）
+        digest = reports_hash(reports)
+        cached = (await db.execute(
+            cached_summary_query(comm_code.upper(), target_date, digest)
+        )).scalars().first()
+        if cached is not None:
+            summary = cache_to_summary(cached)
         else:
-            # 单个研报直接返回
-            summary = {
-                "trade_logic": trade_logics[0] if trade_logics else "暂无数据",
-                "related_data": related_datas[0] if related_datas else "暂无数据",
-                "risk_factor": risk_factors[0] if risk_factors else "暂无数据"
-            }
+            summary = await get_single_flight().do(
+                ("research-summary", comm_code.upper(), target_date, digest),
+                lambda: _summarize_reports(reports, comm_code.upper(), target_date, digest)
+            )
 
         # 返回详细研报列表
         reports_list = [
@@ -306,7 +323,8 @@ async def get_research_summary(
             "date": target_date.strftime('%Y-%m-%d'),
             "reports_count": len(reports),
             "reports": reports_list,
-            "summary": summary
+            "summary": summary,
+            "cached": cached is not None
         }
 
     except Exception as e:
@@ -6,15 +6,17 @@
 - 智汇期讯: 每30分钟一次
 - 方期看盘: 早盘8:50 / 夜盘20:50
 - 交易可查: 19:00爬取，失败30分钟重试
-- Openvlab: 交易时段分钟级监控 (9:00-11:30, 13:00-15:00)
+- Openvlab: 交易时段分钟级监控 (按交易日历的日盘/夜盘时段)
 - 融达数据分析家: 每天15:00
+
+收盘后类任务使用 TradingDayTrigger，只在交易日触发；
+交易时段类任务使用 TradingSessionTrigger，只在真实交易时段内唤醒。
 """
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 from datetime import datetime, date
 import logging
-import asyncio
 
 from app.crawlers.jiaoyikecha_spider import JiaoyiKechaSpider
 from app.crawlers.zhihui_spider import ZhihuiQixunSpider
@@ -22,11 +24,19 @@ from app.crawlers.fangqi_spider import FangqiSpider
 from app.crawlers.openvlab_spider import OpenvlabSpider
 from app.crawlers.rongda_spider import RongdaSpider
 from app.services.blueprint_parser import BlueprintParser
-from app.services.data_collector import DataCollector
+from app.services.data_collector import DataCollector, get_crawl_cursor, save_crawl_cursor
+from app.services.change_log import record_changes
+from app.services.ingestion import UpsertResult, upsert_full_view, insert_research_reports
+from app.services.job_runner import get_job_runner
+from app.services.option_flow_rollup import apply_option_flows
+from app.services.rate_limiter import get_rate_limiter
+from app.services.trading_calendar import (
+    get_trading_calendar, TradingSessionTrigger, TradingDayTrigger
+)
 import json
 from app.models.database import SessionLocal
 from app.models.models import (
-    DailyBlueprint, InstitutionalPosition,
+    Commodity, DailyBlueprint, InstitutionalPosition,
     FundamentalReport, TechnicalIndicator, OptionFlow
 )
 from config.settings import get_settings
@@ -37,11 +47,19 @@ settings = get_settings()
 # 创建调度器
 scheduler = AsyncIOScheduler()
 
+# 阻塞操作统一交给任务执行器的线程池/进程池，保持事件循环空闲
+runner = get_job_runner()
+
 # ========================================
 # 智汇期讯爬虫 - 每30分钟一次
 # ========================================
+ZHIHUI_SOURCE_NAME = "智汇期讯-多空全景"
+ZHIHUI_REPORT_CURSOR = "research_reports"  # 研报增量游标：已采集的最大 report_id
+
+
+@runner.job("智汇期讯")
 @DataCollector(
-    source_name="智汇期讯-多空全景",
+    source_name=ZHIHUI_SOURCE_NAME,
     max_retries=3,
     retry_delay=60,
     timeout=120,
@@ -53,108 +71,49 @@ async def crawl_zhihui_data():
     logger.info("[智汇期讯] 开始执行数据爬取任务")
     logger.info("=" * 50)
 
-    from app.models.models import MarketFullView, ResearchReport
     spider = ZhihuiQixunSpider()
 
     try:
-        # 1. 获取多空全景数据
-        full_view = spider.fetch_full_view()
+        # 1. 获取多空全景数据（requests 同步接口，放到线程池）
+        full_view = await runner.run_in_thread(spider.fetch_full_view)
 
+        written = UpsertResult()
         if full_view:
             logger.info(f"[智汇期讯] 成功获取多空全景数据 {len(full_view)} 条")
+            written += await runner.run_in_thread(_save_full_view, full_view, date.today())
+            logger.info("[智汇期讯] 多空全景数据已保存到数据库")
 
-            db = SessionLocal()
-            try:
-                today = date.today()
-                # 保存多空全景数据到MarketFullView表
-                for item in full_view:
-                    # 检查是否已存在
-                    existing = db.query(MarketFullView).filter(
-                        MarketFullView.comm_code == item['variety_code'],
-                        MarketFullView.record_date == today
-                    ).first()
-
-                    if existing:
-                        # 更新现有记录
-                        existing.excessive_num = item['excessive_num']
-                        existing.excessive_ratio = item['excessive_ratio']
-                        existing.neutral_num = item['neutral_num']
-                        existing.neutral_ratio = item['neutral_ratio']
-                        existing.empty_num = item['empty_num']
-                        existing.empty_ratio = item['empty_ratio']
-                        existing.total_num = item['sum']
-                        existing.more_port = item['more_port']
-                        existing.more_rate = item['more_rate']
-                        existing.main_sentiment = item['main_sentiment']
-                    else:
-                        # 创建新记录
-                        record = MarketFullView(
-                            comm_code=item['variety_code'],
-                            variety_name=item['variety_name'],
-                            record_date=today,
-                            excessive_num=item['excessive_num'],
-                            excessive_ratio=item['excessive_ratio'],
-                            neutral_num=item['neutral_num'],
-                            neutral_ratio=item['neutral_ratio'],
-                            empty_num=item['empty_num'],
-                            empty_ratio=item['empty_ratio'],
-                            total_num=item['sum'],
-                            more_port=item['more_port'],
-                            more_rate=item['more_rate'],
-                            main_sentiment=item['main_sentiment']
-                        )
-                        db.add(record)
-
-                db.commit()
-                logger.info("[智汇期讯] 多空全景数据已保存到数据库")
-            finally:
-                db.close()
-
-        # 2. 获取研报淘金数据
+        # 2. 获取研报淘金数据（异步分页，按 report_id 增量）
         logger.info("[智汇期讯] 开始获取研报淘金数据...")
-        reports_data = spider.fetch_research_reports(
-            variety_code=None,  # 获取所有品种
-            start_date=date.today(),
-            end_date=date.today(),
-            limit=100  # 每次最多100条
-        )
+        cursor = await runner.run_in_thread(get_crawl_cursor, ZHIHUI_SOURCE_NAME, ZHIHUI_REPORT_CURSOR)
+        since_report_id = int(cursor) if cursor else None
+        try:
+            reports_data = await spider.fetch_all_research_reports(
+                variety_code=None,  # 获取所有品种
+                start_date=date.today(),
+                end_date=date.today(),
+                page_size=settings.ZHIHUI_REPORT_PAGE_SIZE,
+                concurrency=settings.ZHIHUI_REPORT_CONCURRENCY,
+                since_report_id=since_report_id
+            )
+        finally:
+            await spider.aclose()
 
         if reports_data and reports_data.get('reports'):
-            logger.info(f"[智汇期讯] 成功获取研报数据 {len(reports_data['reports'])} 条")
-
-            db = SessionLocal()
-            try:
-                today = date.today()
-                for report_dict in reports_data['reports']:
-                    # 检查是否已存在（根据report_id）
-                    existing = db.query(ResearchReport).filter(
-                        ResearchReport.report_id == report_dict['report_id']
-                    ).first()
-
-                    if not existing:
-                        report = ResearchReport(
-                            report_id=report_dict['report_id'],
-                            comm_code=report_dict['variety_code'],
-                            variety_name=report_dict['variety'],
-                            institution_id=report_dict['institution_id'],
-                            institution_name=report_dict['institution_name'],
-                            publish_date=datetime.strptime(report_dict['publish_date'], '%Y-%m-%d').date(),
-                            view_port=report_dict['view_port'],
-                            sentiment=report_dict['sentiment'],
-                            trade_logic=report_dict['trade_logic'],
-                            related_data=report_dict['related_data'],
-                            risk_factor=report_dict['risk_factor'],
-                            report_link=report_dict['link']
-                        )
-                        db.add(report)
+            logger.info(f"[智汇期讯] 成功获取新研报 {len(reports_data['reports'])} 条")
+            written += await runner.run_in_thread(_save_research_reports, reports_data['reports'])
+            logger.info(f"[智汇期讯] 研报数据已保存到数据库")
 
-                db.commit()
-                logger.info(f"[智汇期讯] 研报数据已保存到数据库")
-            finally:
-                db.close()
+        # 全部页都成功入库后才推进游标，避免失败页中的研报被永久跳过
+        if reports_data.get('complete') and reports_data.get('max_report_id') is not None:
+            await runner.run_in_thread(
+                save_crawl_cursor, ZHIHUI_SOURCE_NAME, ZHIHUI_REPORT_CURSOR,
+                str(reports_data['max_report_id'])
+            )
 
         return {"full_view": len(full_view) if full_view else 0,
-                "reports": len(reports_data.get('reports', [])) if reports_data else 0}
+                "reports": len(reports_data.get('reports', [])) if reports_data else 0,
+                **written.as_collector_stats()}
 
     except Exception as e:
         logger.error(f"[智汇期讯] 数据爬取失败: {e}")
@@ -163,9 +122,36 @@ async def crawl_zhihui_data():
         raise
 
 
+def _save_full_view(full_view: list, record_date: date) -> UpsertResult:
+    """保存多空全景数据到MarketFullView表（线程池中执行）"""
+    db = SessionLocal()
+    try:
+        written = upsert_full_view(db, full_view, record_date)
+        record_changes(db, [(item['variety_code'], record_date) for item in full_view], ZHIHUI_SOURCE_NAME)
+        return written
+    finally:
+        db.close()
+
+
+def _save_research_reports(reports: list) -> UpsertResult:
+    """保存研报淘金数据到ResearchReport表，已存在的 report_id 跳过（线程池中执行）"""
+    db = SessionLocal()
+    try:
+        written = insert_research_reports(db, reports)
+        record_changes(
+            db,
+            [(r['variety_code'], datetime.strptime(r['publish_date'], '%Y-%m-%d').date()) for r in reports],
+            ZHIHUI_SOURCE_NAME
+        )
+        return written
+    finally:
+        db.close()
+
+
 # ========================================
 # 方期看盘爬虫 - 早盘8:50 / 夜盘20:50
 # ========================================
+@runner.job("方期看盘-早盘")
 async def crawl_fangqi_morning():
     """方期看盘早盘数据爬取 - 每天 8:50"""
     try:
@@ -180,22 +166,8 @@ async def crawl_fangqi_morning():
             morning_data = await spider.fetch_all_varieties_detail(opening_type="早盘提示")
             logger.info(f"[方期看盘-早盘] 成功获取数据 {len(morning_data)} 条")
 
-            db = SessionLocal()
-            try:
-                for item in morning_data:
-                    report = FundamentalReport(
-                        comm_code=item.get('variety', ''),
-                        source='founderfu',
-                        report_type='morning',
-                        sentiment=_determine_sentiment(item.get('direction', '')),
-                        content_summary=item.get('summary', ''),
-                        publish_time=datetime.now()
-                    )
-                    db.add(report)
-                db.commit()
-                logger.info("[方期看盘-早盘] 数据已保存到数据库")
-            finally:
-                db.close()
+            await runner.run_in_thread(_save_fangqi_reports, morning_data, 'morning')
+            logger.info("[方期看盘-早盘] 数据已保存到数据库")
 
         finally:
             await spider.close()
@@ -204,6 +176,7 @@ async def crawl_fangqi_morning():
         logger.error(f"[方期看盘-早盘] 数据爬取失败: {e}")
 
 
+@runner.job("方期看盘-夜盘")
 async def crawl_fangqi_night():
     """方期看盘夜盘数据爬取 - 每天 20:50"""
     try:
@@ -218,22 +191,8 @@ async def crawl_fangqi_night():
             night_data = await spider.fetch_all_varieties_detail(opening_type="夜盘提示")
             logger.info(f"[方期看盘-夜盘] 成功获取数据 {len(night_data)} 条")
 
-            db = SessionLocal()
-            try:
-                for item in night_data:
-                    report = FundamentalReport(
-                        comm_code=item.get('variety', ''),
-                        source='founderfu',
-                        report_type='night',
-                        sentiment=_determine_sentiment(item.get('direction', '')),
-                        content_summary=item.get('summary', ''),
-                        publish_time=datetime.now()
-                    )
-                    db.add(report)
-                db.commit()
-                logger.info("[方期看盘-夜盘] 数据已保存到数据库")
-            finally:
-                db.close()
+            await runner.run_in_thread(_save_fangqi_reports, night_data, 'night')
+            logger.info("[方期看盘-夜盘] 数据已保存到数据库")
 
         finally:
             await spider.close()
@@ -242,9 +201,33 @@ async def crawl_fangqi_night():
         logger.error(f"[方期看盘-夜盘] 数据爬取失败: {e}")
 
 
+def _save_fangqi_reports(items: list, report_type: str):
+    """保存方期看盘数据到FundamentalReport表（线程池中执行）"""
+    db = SessionLocal()
+    try:
+        for item in items:
+            report = FundamentalReport(
+                comm_code=item.get('variety', ''),
+                source='founderfu',
+                report_type=report_type,
+                sentiment=_determine_sentiment(item.get('direction', '')),
+                content_summary=item.get('summary', ''),
+                publish_time=datetime.now()
+            )
+            db.add(report)
+        record_changes(
+            db, [(item.get('variety', ''), date.today()) for item in items],
+            f"方期看盘-{report_type}", commit=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
 # ========================================
 # 交易可查爬虫 - 19:00爬取
 # ========================================
+@runner.job("交易可查")
 @DataCollector(
     source_name="交易可查-每日蓝图",
     max_retries=3,
@@ -270,31 +253,9 @@ async def crawl_jiaoyikecha():
             if blueprint:
                 logger.info("[交易可查] 成功获取交易蓝图")
 
-                # 保存到数据库
-                db = SessionLocal()
-                try:
-                    # Parse strategies
-                    strategies_json = "[]"
-                    try:
-                        parser = BlueprintParser()
-                        strategies = parser.parse_image(blueprint.get('local_path'))
-                        strategies_json = json.dumps(strategies, ensure_ascii=False)
-                        logger.info(f"[交易可查] 成功解析 {len(strategies)} 条策略")
-                    except Exception as e:
-                        logger.error(f"[交易可查] 策略解析失败: {e}")
-
-                    db_blueprint = DailyBlueprint(
-                        image_url=blueprint.get('image_url'),
-                        local_path=blueprint.get('local_path'),
-                        record_date=date.today(),
-                        parsed_strategies=strategies_json,
-                        created_at=datetime.now()
-                    )
-                    db.add(db_blueprint)
-                    db.commit()
-                    logger.info("[交易可查] 蓝图已保存到数据库")
-                finally:
-                    db.close()
+                # 解析策略并保存到数据库（图片解析和提交都是阻塞调用，放到线程池）
+                strategies_json = await runner.run_in_thread(_save_blueprint, blueprint)
+                logger.info("[交易可查] 蓝图已保存到数据库")
 
                 # 获取席位数据
                 await _crawl_jyk_positions(spider)
@@ -309,61 +270,130 @@ async def crawl_jiaoyikecha():
         await spider.close()
 
 
+def _save_blueprint(blueprint: dict) -> str:
+    """解析交易蓝图策略并保存到DailyBlueprint表，返回策略JSON（线程池中执行）"""
+    strategies_json = "[]"
+    try:
+        parser = BlueprintParser()
+        strategies = parser.parse_image(blueprint.get('local_path'))
+        strategies_json = json.dumps(strategies, ensure_ascii=False)
+        logger.info(f"[交易可查] 成功解析 {len(strategies)} 条策略")
+    except Exception as e:
+        logger.error(f"[交易可查] 策略解析失败: {e}")
+
+    db = SessionLocal()
+    try:
+        db_blueprint = DailyBlueprint(
+            image_url=blueprint.get('image_url'),
+            local_path=blueprint.get('local_path'),
+            record_date=date.today(),
+            parsed_strategies=strategies_json,
+            created_at=datetime.now()
+        )
+        db.add(db_blueprint)
+        db.commit()
+    finally:
+        db.close()
+    return strategies_json
+
+
+# 席位爬取默认品种（品种注册表为空时使用）
+JYK_DEFAULT_VARIETIES = ['rb', 'hc', 'i', 'j', 'jm', 'cu', 'al', 'zn', 'au', 'ag']
+
+
+def _load_position_varieties() -> list:
+    """从品种注册表(commodities)读取需要爬取席位的品种"""
+    db = SessionLocal()
+    try:
+        codes = [row[0] for row in db.query(Commodity.code).order_by(Commodity.code).all()]
+    finally:
+        db.close()
+    if not codes:
+        logger.warning("[交易可查] 品种注册表为空，使用默认品种列表")
+        return list(JYK_DEFAULT_VARIETIES)
+    return [code.lower() for code in codes]
+
+
 async def _crawl_jyk_positions(spider: JiaoyiKechaSpider):
-    """爬取席位持仓数据"""
+    """爬取席位持仓数据 - 多页面并发 + 站点令牌桶限速"""
     try:
         logger.info("[交易可查] 开始爬取席位持仓数据...")
 
-        # 主流品种列表
-        varieties = ['rb', 'hc', 'i', 'j', 'jm', 'cu', 'al', 'zn', 'au', 'ag']
+        varieties = await runner.run_in_thread(_load_position_varieties)
+        logger.info(
+            f"[交易可查] 共 {len(varieties)} 个品种，"
+            f"并发数 {settings.JYK_POSITIONS_CONCURRENCY}"
+        )
 
-        db = SessionLocal()
-        try:
-            for variety_code in varieties:
-                logger.info(f"[交易可查] 正在获取 {variety_code} 的席位数据...")
-                positions = await spider.fetch_variety_positions(variety_code)
-
-                if positions:
-                    for pos in positions:
-                        try:
-                            net_pos = pos.get('net_position', '0')
-                            if isinstance(net_pos, str):
-                                net_pos = int(net_pos.replace(',', '').replace(' ', '') or '0')
-                            change = pos.get('change', '0')
-                            if isinstance(change, str):
-                                change = int(change.replace(',', '').replace(' ', '') or '0')
-
-                            position = InstitutionalPosition(
-                                comm_code=variety_code.upper(),
-                                broker_name=pos.get('broker', ''),
-                                net_position=net_pos,
-                                position_change=change,
-                                record_date=date.today(),
-                                created_at=datetime.now()
-                            )
-                            db.add(position)
-                        except (ValueError, TypeError) as e:
-                            logger.warning(f"解析持仓数据失败: {e}")
-                            continue
-
-                    logger.info(f"[交易可查] {variety_code} 席位数据已添加")
-
-                await asyncio.sleep(2)  # 延迟避免请求过快
-
-            db.commit()
-            logger.info("[交易可查] 所有席位数据已保存")
+        rate_limiter = get_rate_limiter(
+            'jiaoyikecha',
+            rate=settings.JYK_RATE_LIMIT,
+            capacity=settings.JYK_RATE_BURST
+        )
+        results = await spider.fetch_all_positions(
+            varieties,
+            concurrency=settings.JYK_POSITIONS_CONCURRENCY,
+            rate_limiter=rate_limiter
+        )
 
-        finally:
-            db.close()
+        await runner.run_in_thread(_save_positions, varieties, results)
+        logger.info("[交易可查] 所有席位数据已保存")
 
     except Exception as e:
         logger.error(f"[交易可查] 席位数据爬取失败: {e}")
 
 
+def _save_positions(varieties: list, results: dict):
+    """保存席位持仓数据到InstitutionalPosition表（线程池中执行）"""
+    db = SessionLocal()
+    try:
+        for variety_code in varieties:
+            positions = results.get(variety_code)
+            if not positions:
+                continue
+
+            for pos in positions:
+                try:
+                    net_pos = pos.get('net_position', '0')
+                    if isinstance(net_pos, str):
+                        net_pos = int(net_pos.replace(',', '').replace(' ', '') or '0')
+                    change = pos.get('change', '0')
+                    if isinstance(change, str):
+                        change = int(change.replace(',', '').replace(' ', '') or '0')
+
+                    position = InstitutionalPosition(
+                        comm_code=variety_code.upper(),
+                        broker_name=pos.get('broker', ''),
+                        net_position=net_pos,
+                        position_change=change,
+                        record_date=date.today(),
+                        created_at=datetime.now()
+                    )
+                    db.add(position)
+                except (ValueError, TypeError) as e:
+                    logger.warning(f"解析持仓数据失败: {e}")
+                    continue
+
+            logger.info(f"[交易可查] {variety_code} 席位数据已添加")
+
+        record_changes(
+            db, [(code.upper(), date.today()) for code in varieties if results.get(code)],
+            "交易可查-席位持仓", commit=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
 # ========================================
 # Openvlab爬虫 - 交易时段分钟级监控
-# 9:00-11:30, 13:00-15:00
+# 由 TradingSessionTrigger 按交易日历调度
 # ========================================
+
+# Openvlab 监控的商品期权所在交易所
+OPENVLAB_EXCHANGES = ['SHFE', 'INE', 'DCE', 'CZCE', 'GFEX']
+
+@runner.job("Openvlab")
 @DataCollector(
     source_name="openvlab-期权流向",
     max_retries=2,
@@ -374,28 +404,9 @@ async def _crawl_jyk_positions(spider: JiaoyiKechaSpider):
 async def crawl_openvlab():
     """Openvlab期权数据爬取 - 交易时段分钟级监控"""
     now = datetime.now()
-    current_time = now.time()
-
-    # 检查是否在交易时间内
-    # 日盘: 9:00-11:30, 13:00-15:00
-    # 夜盘: 21:00-次日02:00
-    morning_start = datetime.strptime("09:00", "%H:%M").time()
-    morning_end = datetime.strptime("11:30", "%H:%M").time()
-    afternoon_start = datetime.strptime("13:00", "%H:%M").time()
-    afternoon_end = datetime.strptime("15:00", "%H:%M").time()
-    night_start = datetime.strptime("21:00", "%H:%M").time()
-    night_end = datetime.strptime("02:00", "%H:%M").time()
-
-    # 夜盘跨越午夜,需要特殊处理
-    is_night_time = (current_time >= night_start) or (current_time <= night_end)
-
-    is_trading_time = (
-        (morning_start <= current_time <= morning_end) or
-        (afternoon_start <= current_time <= afternoon_end) or
-        is_night_time
-    )
 
-    if not is_trading_time:
+    # 触发器已按交易时段调度，这里兜底手动调用的情况
+    if not get_trading_calendar().is_in_session(now, exchanges=OPENVLAB_EXCHANGES):
         logger.debug("[Openvlab] 非交易时间，跳过")
         return []
 
@@ -411,24 +422,8 @@ async def crawl_openvlab():
         if option_flow:
             logger.info(f"[Openvlab] 成功获取期权流数据 {len(option_flow)} 条")
 
-            db = SessionLocal()
-            try:
-                for item in option_flow:
-                    flow_record = OptionFlow(
-                        comm_code=item.get('variety', ''),
-                        contract_code=item.get('contract_code', ''),
-                        net_flow=item.get('net_flow', 0),
-                        volume=item.get('volume', 0),
-                        change_ratio=item.get('change_ratio', 0),
-                        record_time=datetime.now(),
-                        created_at=datetime.now()
-                    )
-                    db.add(flow_record)
-
-                db.commit()
-                logger.info("[Openvlab] 数据已保存到数据库")
-            finally:
-                db.close()
+            await runner.run_in_thread(_save_option_flow, option_flow)
+            logger.info("[Openvlab] 数据已保存到数据库")
 
         return option_flow
 
@@ -436,6 +431,84 @@ async def crawl_openvlab():
         await spider.close()
 
 
+def _save_option_flow(option_flow: list):
+    """保存期权流数据到OptionFlow表（线程池中执行）"""
+    db = SessionLocal()
+    try:
+        records = []
+        for item in option_flow:
+            flow_record = OptionFlow(
+                comm_code=item.get('variety', ''),
+                contract_code=item.get('contract_code', ''),
+                net_flow=item.get('net_flow', 0),
+                volume=item.get('volume', 0),
+                change_ratio=item.get('change_ratio', 0),
+                record_time=datetime.now(),
+                created_at=datetime.now()
+            )
+            db.add(flow_record)
+            records.append(flow_record)
+
+        # 与原始记录同一事务更新分钟/小时/日汇总
+        apply_option_flows(db, records)
+        record_changes(
+            db, [(item.get('variety', ''), date.today()) for item in option_flow],
+            "openvlab-期权流向", commit=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+# ========================================
+# 虚实比数据 - 交易日18:00
+# ========================================
+@runner.job("虚实比数据", executor="thread")
+@DataCollector(
+    source_name="虚实比数据-AKShare",
+    max_retries=2,
+    retry_delay=600,
+    timeout=180,
+    enable_alert=True
+)
+def crawl_virtual_real_ratio():
+    """虚实比数据爬取 - 每天18:00（同步任务，由执行器放到线程池）"""
+    logger.info("=" * 50)
+    logger.info("[虚实比] 开始执行数据爬取任务")
+    logger.info("=" * 50)
+
+    from app.crawlers.virtual_real_ratio_spider_uqer import VirtualRealRatioSpiderUqer
+    from app.services.uqer_sdk_client import init_uqer_sdk_client
+
+    # 初始化优矿SDK客户端
+    if settings.UQER_TOKEN:
+        init_uqer_sdk_client(settings.UQER_TOKEN)
+    else:
+        logger.error("[虚实比] 优矿Token未配置")
+        return
+
+    db = SessionLocal()
+    try:
+        spider = VirtualRealRatioSpiderUqer(db=db)
+        results = spider.crawl_all_varieties()
+
+        success_count = sum(1 for v in results.values() if v)
+        total_count = len(results)
+
+        logger.info(f"[虚实比] 数据爬取完成: 成功 {success_count}/{total_count} 个品种")
+
+        if success_count > 0:
+            logger.info("[虚实比] ✅ 至少部分品种更新成功")
+        else:
+            logger.warning("[虚实比] ⚠️ 所有品种更新失败")
+
+    except Exception as e:
+        logger.error(f"[虚实比] 数据爬取失败: {e}")
+        raise
+    finally:
+        db.close()
+
+
 # ========================================
 # 融达数据分析家爬虫 - 每天15:00
 # ========================================
@@ -511,38 +584,38 @@ def init_scheduler():
         replace_existing=True
     )
 
-    # 2. 方期看盘-早盘 - 每天 8:50
+    # 2. 方期看盘-早盘 - 交易日 8:50
     scheduler.add_job(
         crawl_fangqi_morning,
-        CronTrigger(hour=8, minute=50),
+        TradingDayTrigger(hour=8, minute=50),
         id='crawl_fangqi_morning',
         name='方期看盘-早盘8:50',
         replace_existing=True
     )
 
-    # 3. 方期看盘-夜盘 - 每天 20:50
+    # 3. 方期看盘-夜盘 - 有夜盘的交易日 20:50
     scheduler.add_job(
         crawl_fangqi_night,
-        CronTrigger(hour=20, minute=50),
+        TradingDayTrigger(hour=20, minute=50, night_session_only=True),
         id='crawl_fangqi_night',
         name='方期看盘-夜盘20:50',
         replace_existing=True
     )
 
-    # 4. 交易可查 - 每天 19:00 (失败30分钟重试)
+    # 4. 交易可查 - 交易日 19:00 (失败30分钟重试)
     scheduler.add_job(
         crawl_jiaoyikecha,
-        CronTrigger(hour=19, minute=0),
+        TradingDayTrigger(hour=19, minute=0),
         id='crawl_jiaoyikecha',
         name='交易可查-19:00',
         replace_existing=True
     )
 
     # 5. Openvlab - 交易时段每分钟监控
-    #    9:00-11:30, 13:00-15:00
+    #    只在交易日历中的日盘/夜盘时段唤醒
     scheduler.add_job(
         crawl_openvlab,
-        IntervalTrigger(minutes=1),
+        TradingSessionTrigger(minutes=1, exchanges=OPENVLAB_EXCHANGES),
         id='crawl_openvlab',
         name='Openvlab-分钟级监控',
         replace_existing=True
@@ -557,76 +630,35 @@ def init_scheduler():
     #     replace_existing=True
     # )
 
-    # 7. 每日全品种分析 - 每天 21:30 (所有数据爬取完成后)
-    from app.services.analysis import AnalysisService
-    from app.models.database import SessionLocal
-    
-    async def run_analysis_job():
-        db = SessionLocal()
-        try:
-            service = AnalysisService(db)
-            service.run_daily_analysis()
-        finally:
-            db.close()
+    # 7. 每日全品种分析 - 交易日 19:30 (所有数据爬取完成后)
+    #    先处理变更日志，再补算当天还没有结果的品种；放到进程池，避免占用事件循环和 GIL
+    from app.services.analysis import run_daily_analysis_job, run_incremental_analysis_job
 
     scheduler.add_job(
-        run_analysis_job,
-        CronTrigger(hour=19, minute=30),
+        runner.job("每日全品种分析", executor="process")(run_daily_analysis_job),
+        TradingDayTrigger(hour=19, minute=30),
+        kwargs={'incremental': True},
         id='run_daily_analysis',
         name='每日全品种分析-19:30',
         replace_existing=True
     )
 
-    # 8. 虚实比数据爬取 - 每天18:00
-    @DataCollector(
-        source_name="虚实比数据-AKShare",
-        max_retries=2,
-        retry_delay=600,
-        timeout=180,
-        enable_alert=True
+    # 7.1 增量分析 - 按变更日志只重算有新数据的 品种+日期
+    scheduler.add_job(
+        runner.job("增量分析", executor="thread")(run_incremental_analysis_job),
+        IntervalTrigger(minutes=settings.ANALYSIS_INCREMENTAL_INTERVAL_MINUTES),
+        id='run_incremental_analysis',
+        name=f'增量分析-每{settings.ANALYSIS_INCREMENTAL_INTERVAL_MINUTES}分钟',
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
     )
-    async def crawl_virtual_real_ratio():
-        """虚实比数据爬取 - 每天18:00"""
-        logger.info("=" * 50)
-        logger.info("[虚实比] 开始执行数据爬取任务")
-        logger.info("=" * 50)
-
-        from app.crawlers.virtual_real_ratio_spider_uqer import VirtualRealRatioSpiderUqer
-        from app.services.uqer_sdk_client import init_uqer_sdk_client
-        from config.settings import get_settings
-
-        # 初始化优矿SDK客户端
-        settings = get_settings()
-        if settings.UQER_TOKEN:
-            init_uqer_sdk_client(settings.UQER_TOKEN)
-        else:
-            logger.error("[虚实比] 优矿Token未配置")
-            return
-
-        db = SessionLocal()
-        try:
-            spider = VirtualRealRatioSpiderUqer(db=db)
-            results = spider.crawl_all_varieties()
-
-            success_count = sum(1 for v in results.values() if v)
-            total_count = len(results)
-
-            logger.info(f"[虚实比] 数据爬取完成: 成功 {success_count}/{total_count} 个品种")
-
-            if success_count > 0:
-                logger.info("[虚实比] ✅ 至少部分品种更新成功")
-            else:
-                logger.warning("[虚实比] ⚠️ 所有品种更新失败")
-
-        except Exception as e:
-            logger.error(f"[虚实比] 数据爬取失败: {e}")
-            raise
-        finally:
-            db.close()
 
+    # 8. 虚实比数据爬取 - 交易日18:00
+    #    优矿SDK与数据库写入均为同步调用，整个任务放到线程池
     scheduler.add_job(
-        lambda: asyncio.create_task(crawl_virtual_real_ratio()),
-        CronTrigger(hour=18, minute=0),
+        crawl_virtual_real_ratio,
+        TradingDayTrigger(hour=18, minute=0),
         id='crawl_virtual_real_ratio',
         name='虚实比数据-18:00',
         replace_existing=True
@@ -651,10 +683,13 @@ def init_scheduler():
         except Exception as e:
             logger.error(f"❌ {backup_type} 备份异常: {e}")
 
+    backup_job = runner.job("数据库备份", executor="thread")(run_backup)
+
     # 小时级备份 - 每小时执行
     scheduler.add_job(
-        lambda: run_backup('hourly'),
+        backup_job,
         IntervalTrigger(hours=1),
+        args=['hourly'],
         id='backup_hourly',
         name='数据库备份-小时级',
         replace_existing=True
@@ -662,8 +697,9 @@ def init_scheduler():
 
     # 天级备份 - 每天凌晨3点
     scheduler.add_job(
-        lambda: run_backup('daily'),
+        backup_job,
         CronTrigger(hour=3, minute=0),
+        args=['daily'],
         id='backup_daily',
         name='数据库备份-天级-03:00',
         replace_existing=True
@@ -671,33 +707,62 @@ def init_scheduler():
 
     # 周级备份 - 每周日凌晨3点
     scheduler.add_job(
-        lambda: run_backup('weekly'),
+        backup_job,
         CronTrigger(day_of_week='sun', hour=3, minute=0),
+        args=['weekly'],
         id='backup_weekly',
         name='数据库备份-周级-周日03:00',
         replace_existing=True
     )
 
+    # 10. 数据保留 - 每天凌晨3:30（天级备份之后），过期数据归档到 backups/archive 后删除
+    from app.services.retention import run_retention_job
+
+    scheduler.add_job(
+        runner.job("数据保留归档", executor="thread")(run_retention_job),
+        CronTrigger(hour=3, minute=30),
+        id='apply_retention',
+        name='数据保留归档-03:30',
+        max_instances=1,
+        replace_existing=True
+    )
+
+    # 11. 研报AI汇总预计算 - 交易日 22:00（当天研报已采集完成），页面访问直接读缓存
+    from app.services.research_summary import run_research_summary_job
+
+    scheduler.add_job(
+        runner.job("研报汇总预计算", executor="thread")(run_research_summary_job),
+        TradingDayTrigger(hour=22, minute=0),
+        id='precompute_research_summary',
+        name='研报汇总预计算-22:00',
+        max_instances=1,
+        replace_existing=True
+    )
+
     logger.info("")
     logger.info("定时任务配置完成:")
     logger.info("  ┌──────────────────────────────────────────────────────┐")
     logger.info("  │  智汇期讯        │ 每 30 分钟一次                    │")
-    logger.info("  │  方期看盘-早盘   │ 每天 08:50                        │")
-    logger.info("  │  方期看盘-夜盘   │ 每天 20:50                        │")
-    logger.info("  │  交易可查        │ 每天 19:00 (失败30分钟重试)       │")
-    logger.info("  │  Openvlab        │ 交易时段每分钟 (日盘+夜盘21-02)  │")
-    logger.info("  │  每日全品种分析  │ 每天 19:30                        │")
-    logger.info("  │  虚实比数据      │ 每天 18:00                        │")
+    logger.info("  │  方期看盘-早盘   │ 交易日 08:50                      │")
+    logger.info("  │  方期看盘-夜盘   │ 有夜盘的交易日 20:50              │")
+    logger.info("  │  交易可查        │ 交易日 19:00 (失败30分钟重试)     │")
+    logger.info("  │  Openvlab        │ 交易时段每分钟 (按交易日历)       │")
+    logger.info("  │  每日全品种分析  │ 交易日 19:30                      │")
+    logger.info(f"  │  增量分析        │ 每 {settings.ANALYSIS_INCREMENTAL_INTERVAL_MINUTES} 分钟 (按变更日志)            │")
+    logger.info("  │  虚实比数据      │ 交易日 18:00                      │")
     logger.info("  │  数据库备份-小时 │ 每小时一次                        │")
     logger.info("  │  数据库备份-天级 │ 每天 03:00                        │")
     logger.info("  │  数据库备份-周级 │ 每周日 03:00                      │")
+    logger.info("  │  数据保留归档    │ 每天 03:30                        │")
+    logger.info("  │  研报汇总预计算  │ 交易日 22:00                      │")
     logger.info("  └──────────────────────────────────────────────────────┘")
     logger.info("")
 
 
 def start_scheduler():
-    """启动调度器"""
+    """启动调度器（需在事件循环中调用）"""
     scheduler.start()
+    runner.monitor.start()
     logger.info("✅ 定时任务调度器已启动")
 
     # 列出所有任务
@@ -726,5 +791,6 @@ def get_scheduler_status():
                 "next_run": str(job.next_run_time) if job.next_run_time else None
             }
             for job in jobs
-        ]
+        ],
+        "execution": runner.stats()
     }
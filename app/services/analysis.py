@@ -4,243 +4,443 @@
 1. 汇总基本面、资金面、技术面、消息面数据
 2. 计算各维度得分 (-10 ~ 10)
 3. 判定综合方向 (多/空/中性)
+
+全部品种批量计算：每张表查询一次，pandas 向量化评分，单事务写入；
+增量模式只重算变更日志(analysis_change_log)中记录的 品种+日期
 """
 import logging
-from datetime import date, datetime, timedelta
+from datetime import date, datetime, time, timedelta
 from typing import List, Dict, Optional
+import numpy as np
+import pandas as pd
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, and_
 
 from app.models.models import (
     MarketAnalysisSummary, Commodity, FundamentalReport,
-    InstitutionalPosition, TechnicalIndicator, OptionFlow,
+    InstitutionalPosition, TechnicalIndicator,
     ContractInfo, DirectionEnum
 )
+from app.services.change_log import pending_changes, mark_analyzed
+from app.services.ingestion import bulk_upsert
+from app.services.option_flow_rollup import flow_totals_query
+from app.services.trading_calendar import get_trading_calendar
 
 logger = logging.getLogger(__name__)
 
 
+# 基本面：研报回看天数
+FUNDAMENTAL_LOOKBACK_DAYS = 3
+
+# 资金面：席位关键字与市值阈值（元）
+RETAIL_BROKER = "东方财富"
+INSTITUTION_BROKERS = ("国泰君安", "东证期货")
+RETAIL_THRESHOLD = 200_000_000
+INSTITUTION_THRESHOLD = 500_000_000
+DEFAULT_MULTIPLIER = 10
+
+# 技术面：期权净流入阈值（万）
+OPTION_FLOW_THRESHOLD = 1000
+
+# 综合方向阈值
+DIRECTION_THRESHOLD = 5
+
+SUMMARY_UPDATE_COLUMNS = [
+    "fundamental_score", "capital_score", "technical_score", "message_score",
+    "total_direction", "main_reason", "updated_at"
+]
+
+
 class AnalysisService:
+    """
+    四维分析批量引擎
+
+    每张数据表按 当日 + 品种集合 只查询一次，在 pandas 中按品种向量化计算四个维度的得分，
+    最后在一个事务里批量写入 MarketAnalysisSummary。查询次数不随品种数量增长。
+    """
+
     def __init__(self, db: Session):
         self.db = db
 
-    def run_daily_analysis(self, target_date: Optional[date] = None):
-        """执行每日全品种分析"""
+    def run_daily_analysis(
+        self,
+        target_date: Optional[date] = None,
+        comm_codes: Optional[List[str]] = None,
+        prices: Optional[pd.Series] = None
+    ) -> pd.DataFrame:
+        """
+        执行每日全品种分析
+
+        Args:
+            target_date: 分析日期，默认今天
+            comm_codes: 限定品种，默认品种表中的全部品种
+            prices: 各品种当日价格（index 为品种代码），历史回填时替代 ContractInfo 的最新价
+
+        Returns:
+            各品种得分 DataFrame（index 为品种代码）
+        """
         if target_date is None:
             target_date = date.today()
-            
+
         logger.info(f"开始执行每日分析: {target_date}")
 
-        # 获取所有活跃品种
-        commodities = self.db.query(Commodity).all()
-        
-        for comm in commodities:
-            try:
-                self.analyze_commodity(comm.code, target_date)
-            except Exception as e:
-                logger.error(f"分析品种 {comm.code} 失败: {e}")
+        if comm_codes is None:
+            comm_codes = [code for (code,) in self.db.query(Commodity.code).all()]
+        if not comm_codes:
+            logger.info("品种表为空，跳过分析")
+            return pd.DataFrame()
+
+        scores = self.score_commodities(comm_codes, target_date, prices)
+        self._save_summaries(scores, target_date)
+
+        for comm_code, row in scores.iterrows():
+            logger.info(f"品种 {comm_code} 分析完成: {row.total_direction.value} (分: {row.total_score})")
+        return scores
 
     def analyze_commodity(self, comm_code: str, target_date: date):
         """分析单个品种"""
-        # 1. 基本面评分
-        fund_score, fund_reason = self._analyze_fundamental(comm_code, target_date)
-        
-        # 2. 资金面评分
-        cap_score, cap_reason = self._analyze_capital(comm_code, target_date)
-        
-        # 3. 技术面评分
-        tech_score, tech_reason = self._analyze_technical(comm_code, target_date)
-        
-        # 4. 消息面评分
-        msg_score, msg_reason = self._analyze_message(comm_code, target_date)
-        
-        # 5. 综合判定
-        total_score = fund_score + cap_score + tech_score + msg_score
-        
-        direction = DirectionEnum.NEUTRAL
-        if total_score >= 5:
-            direction = DirectionEnum.LONG
-        elif total_score <= -5:
-            direction = DirectionEnum.SHORT
-            
+        self.run_daily_analysis(target_date, [comm_code])
+
+    def run_incremental_analysis(self, limit: Optional[int] = None) -> int:
+        """
+        增量分析：只重算变更日志中待处理的 (品种, 日期)
+
+        Args:
+            limit: 单次最多处理的组合数，默认全部
+
+        Returns:
+            重算的组合数
+        """
+        started_at = datetime.now()
+        pending = pending_changes(self.db, limit)
+        if not pending:
+            return 0
+
+        registered = {code for (code,) in self.db.query(Commodity.code).all()}
+        analyzed = 0
+        for target_date, codes in sorted(pending.items()):
+            # 采集数据中可能出现品种表之外的代码，不生成分析结果
+            targets = [code for code in codes if code in registered]
+            if targets:
+                self.run_daily_analysis(target_date, targets)
+                analyzed += len(targets)
+
+        mark_analyzed(
+            self.db,
+            [(code, target_date) for target_date, codes in pending.items() for code in codes],
+            started_at
+        )
+        logger.info(f"增量分析完成: 重算 {analyzed} 个品种-日期组合")
+        return analyzed
+
+    def fill_missing_summaries(self, target_date: Optional[date] = None) -> int:
+        """为当日还没有分析结果的品种补算（增量分析未覆盖到的品种）"""
+        target_date = target_date or date.today()
+        done = {
+            code for (code,) in self.db.query(MarketAnalysisSummary.comm_code).filter(
+                MarketAnalysisSummary.date == target_date
+            ).all()
+        }
+        missing = [code for (code,) in self.db.query(Commodity.code).all() if code not in done]
+        if missing:
+            self.run_daily_analysis(target_date, missing)
+        return len(missing)
+
+    def score_commodities(
+        self,
+        comm_codes: List[str],
+        target_date: date,
+        prices: Optional[pd.Series] = None
+    ) -> pd.DataFrame:
+        """
+        计算各品种四维得分
+
+        Args:
+            comm_codes: 品种代码
+            target_date: 分析日期（只读取截至当天的数据）
+            prices: 各品种当日价格（index 为品种代码），回测重算时替代 ContractInfo 的最新价
+
+        Returns:
+            DataFrame，index 为品种代码，列为
+            fundamental/capital/technical/message 的 score 与 reason、total_score、total_direction、main_reason
+        """
+        codes = pd.Index(list(dict.fromkeys(comm_codes)), name="comm_code")
+        scores = pd.concat([
+            self._score_fundamental(codes, target_date).add_prefix("fundamental_"),
+            self._score_capital(codes, target_date, prices).add_prefix("capital_"),
+            self._score_technical(codes, target_date).add_prefix("technical_"),
+            self._score_message(codes).add_prefix("message_"),
+        ], axis=1)
+
+        scores["total_score"] = (
+            scores.fundamental_score + scores.capital_score
+            + scores.technical_score + scores.message_score
+        )
+        scores["total_direction"] = np.select(
+            [scores.total_score >= DIRECTION_THRESHOLD, scores.total_score <= -DIRECTION_THRESHOLD],
+            [DirectionEnum.LONG, DirectionEnum.SHORT],
+            DirectionEnum.NEUTRAL
+        )
+
         # 汇总理由
-        reasons = []
-        if fund_reason: reasons.append(f"[基本面] {fund_reason}")
-        if cap_reason: reasons.append(f"[资金面] {cap_reason}")
-        if tech_reason: reasons.append(f"[技术面] {tech_reason}")
-        if msg_reason: reasons.append(f"[消息面] {msg_reason}")
-        
-        main_reason = "\n".join(reasons)
-        
-        # 保存结果
-        summary = self.db.query(MarketAnalysisSummary).filter(
-            MarketAnalysisSummary.comm_code == comm_code,
-            MarketAnalysisSummary.date == target_date
-        ).first()
-        
-        if not summary:
-            summary = MarketAnalysisSummary(
-                comm_code=comm_code,
-                date=target_date
-            )
-            
-        summary.fundamental_score = fund_score
-        summary.capital_score = cap_score
-        summary.technical_score = tech_score
-        summary.message_score = msg_score
-        summary.total_direction = direction
-        summary.main_reason = main_reason
-        summary.updated_at = datetime.now()
-        
-        self.db.add(summary)
-        self.db.commit()
-        
-        logger.info(f"品种 {comm_code} 分析完成: {direction.value} (分: {total_score})")
-
-    def _analyze_fundamental(self, comm_code: str, target_date: date) -> (int, str):
+        labels = ["[基本面] ", "[资金面] ", "[技术面] ", "[消息面] "]
+        reason_columns = [
+            scores.fundamental_reason, scores.capital_reason,
+            scores.technical_reason, scores.message_reason
+        ]
+        scores["main_reason"] = [
+            "\n".join(label + reason for label, reason in zip(labels, reasons) if reason)
+            for reasons in zip(*reason_columns)
+        ]
+        return scores
+
+    @staticmethod
+    def _as_of(target_date: date) -> datetime:
+        """
+        评分数据的截止时间：历史日期截至当天结束，回填/回测不读取之后的数据；
+        最近交易日截至当前时间（夜盘跨过零点的数据仍计入）
+        """
+        end_of_day = datetime.combine(target_date, time.max)
+        if target_date >= get_trading_calendar().latest_trading_day():
+            return max(datetime.now(), end_of_day)
+        return end_of_day
+
+    def _score_fundamental(self, codes: pd.Index, target_date: date) -> pd.DataFrame:
         """
         基本面分析逻辑
         数据源: 智汇期讯(hzzhqx), 方期看盘(founderfu)
+        近3日看多研报多于看空 +5，反之 -5
         """
-        score = 0
-        reasons = []
-        
-        # 获取最近3天的研报
-        start_date = target_date - timedelta(days=3)
-        reports = self.db.query(FundamentalReport).filter(
-            FundamentalReport.comm_code == comm_code,
-            FundamentalReport.publish_time >= start_date
+        start_time = datetime.combine(target_date - timedelta(days=FUNDAMENTAL_LOOKBACK_DAYS), time.min)
+        rows = self.db.query(FundamentalReport.comm_code, FundamentalReport.sentiment).filter(
+            FundamentalReport.comm_code.in_(list(codes)),
+            FundamentalReport.publish_time >= start_time,
+            FundamentalReport.publish_time <= self._as_of(target_date)
         ).all()
-        
-        bull_count = 0
-        bear_count = 0
-        
-        for report in reports:
-            if report.sentiment == 'bull':
-                bull_count += 1
-            elif report.sentiment == 'bear':
-                bear_count += 1
-                
-        if bull_count > bear_count:
-            score = 5
-            reasons.append(f"近3日看多研报{bull_count}篇 > 看空{bear_count}篇")
-        elif bear_count > bull_count:
-            score = -5
-            reasons.append(f"近3日看空研报{bear_count}篇 > 看多{bull_count}篇")
-        else:
-            reasons.append("多空研报数量持平")
-            
-        return score, "; ".join(reasons)
+        reports = pd.DataFrame(rows, columns=["comm_code", "sentiment"])
+
+        bull = (reports.sentiment == "bull").groupby(reports.comm_code).sum().reindex(codes, fill_value=0).astype(int)
+        bear = (reports.sentiment == "bear").groupby(reports.comm_code).sum().reindex(codes, fill_value=0).astype(int)
+        is_bull = bull > bear
+        is_bear = bear > bull
+
+        reason = pd.Series("多空研报数量持平", index=codes)
+        reason[is_bull] = ("近3日看多研报" + bull.astype(str) + "篇 > 看空" + bear.astype(str) + "篇")[is_bull]
+        reason[is_bear] = ("近3日看空研报" + bear.astype(str) + "篇 > 看多" + bull.astype(str) + "篇")[is_bear]
 
-    def _analyze_capital(self, comm_code: str, target_date: date) -> (int, str):
+        return pd.DataFrame({
+            "score": np.select([is_bull, is_bear], [5, -5], 0),
+            "reason": reason
+        }, index=codes)
+
+    def _score_capital(self, codes: pd.Index, target_date: date, prices: Optional[pd.Series] = None) -> pd.DataFrame:
         """
         资金面分析逻辑
         规则:
         1. 散户(东方财富): 净多>2亿 -> 看空; 净空>2亿 -> 看多 (反向指标)
         2. 机构(国泰君安/东证期货): 净空>5亿 -> 看空; 净多>5亿 -> 看多 (正向指标)
         """
-        score = 0
-        reasons = []
-        
-        # 获取合约乘数和最新价格用于计算市值
-        contract_info = self.db.query(ContractInfo).filter(
-            ContractInfo.comm_code == comm_code
-        ).first()
-        
-        multiplier = contract_info.multiplier if contract_info else 10
-        price = contract_info.latest_price if contract_info else 0
-        
-        if price == 0:
-            return 0, "缺失价格数据，无法计算资金市值"
-            
-        # 获取最新持仓数据
-        positions = self.db.query(InstitutionalPosition).filter(
-            InstitutionalPosition.comm_code == comm_code,
+        # 合约乘数和最新价格用于计算市值
+        contract_rows = self.db.query(
+            ContractInfo.comm_code, ContractInfo.multiplier, ContractInfo.latest_price
+        ).filter(ContractInfo.comm_code.in_(list(codes))).all()
+        contracts = pd.DataFrame(
+            contract_rows, columns=["comm_code", "multiplier", "price"]
+        ).drop_duplicates("comm_code").set_index("comm_code")
+        has_contract = codes.isin(contracts.index)
+        contracts = contracts.reindex(codes).apply(pd.to_numeric)
+        if prices is not None:
+            # 历史日期用当日价格，ContractInfo 只有最新价
+            contracts["price"] = pd.to_numeric(prices.reindex(codes))
+        # 没有合约信息时乘数按默认值、价格按0处理
+        contracts["multiplier"] = contracts.multiplier.where(has_contract, DEFAULT_MULTIPLIER)
+        missing_price = contracts.price.fillna(0) == 0
+
+        position_rows = self.db.query(
+            InstitutionalPosition.id, InstitutionalPosition.comm_code,
+            InstitutionalPosition.broker_name, InstitutionalPosition.net_position
+        ).filter(
+            InstitutionalPosition.comm_code.in_(list(codes)),
             InstitutionalPosition.record_date == target_date
-        ).all()
-        
-        # 散户逻辑 (东方财富)
-        east_money = next((p for p in positions if "东方财富" in p.broker_name), None)
-        if east_money:
-            net_val = east_money.net_position * price * multiplier
-            if net_val > 200_000_000: # 净多超2亿
-                score -= 3
-                reasons.append("散户(东财)大幅净多(反向看空)")
-            elif net_val < -200_000_000: # 净空超2亿
-                score += 3
-                reasons.append("散户(东财)大幅净空(反向看多)")
-                
-        # 机构逻辑 (国泰君安, 东证期货)
-        institutions = [p for p in positions if "国泰君安" in p.broker_name or "东证期货" in p.broker_name]
-        for inst in institutions:
-            net_val = inst.net_position * price * multiplier
-            if net_val < -500_000_000: # 净空超5亿
-                score -= 4
-                reasons.append(f"机构({inst.broker_name})大幅净空")
-            elif net_val > 500_000_000: # 净多超5亿
-                score += 4
-                reasons.append(f"机构({inst.broker_name})大幅净多")
-                
-        return min(max(score, -10), 10), "; ".join(reasons)
-
-    def _analyze_technical(self, comm_code: str, target_date: date) -> (int, str):
+        ).order_by(InstitutionalPosition.id).all()
+        positions = pd.DataFrame(position_rows, columns=["id", "comm_code", "broker_name", "net_position"])
+        positions["broker_name"] = positions.broker_name.fillna("")
+        positions["net_position"] = pd.to_numeric(positions.net_position)
+        positions = positions.join(contracts, on="comm_code")
+        positions["net_val"] = positions.net_position * positions.price * positions.multiplier
+
+        # 散户逻辑 (东方财富)：每个品种取第一条匹配席位
+        retail = positions[positions.broker_name.str.contains(RETAIL_BROKER, regex=False)]
+        retail = retail.drop_duplicates("comm_code").assign(order=0)
+        retail_long = retail.net_val > RETAIL_THRESHOLD
+        retail_short = retail.net_val < -RETAIL_THRESHOLD
+        retail["score"] = np.select([retail_long, retail_short], [-3, 3], 0)
+        retail["reason"] = np.select(
+            [retail_long, retail_short],
+            ["散户(东财)大幅净多(反向看空)", "散户(东财)大幅净空(反向看多)"],
+            ""
+        )
+
+        # 机构逻辑 (国泰君安, 东证期货)：每条匹配席位单独计分
+        is_institution = np.logical_or.reduce([
+            positions.broker_name.str.contains(name, regex=False) for name in INSTITUTION_BROKERS
+        ])
+        institutions = positions[is_institution].assign(order=1)
+        inst_short = institutions.net_val < -INSTITUTION_THRESHOLD
+        inst_long = institutions.net_val > INSTITUTION_THRESHOLD
+        institutions["score"] = np.select([inst_short, inst_long], [-4, 4], 0)
+        institutions["reason"] = np.select(
+            [inst_short, inst_long],
+            ["机构(" + institutions.broker_name + ")大幅净空", "机构(" + institutions.broker_name + ")大幅净多"],
+            ""
+        )
+
+        signals = pd.concat([retail, institutions]).sort_values(["order", "id"])
+        signals = signals[signals.comm_code.isin(codes[~missing_price.to_numpy()])]
+
+        score = signals.groupby("comm_code").score.sum().reindex(codes, fill_value=0)
+        reason = signals[signals.reason != ""].groupby("comm_code").reason.agg("; ".join).reindex(codes, fill_value="")
+
+        score = score.where(~missing_price, 0)
+        reason = reason.where(~missing_price, "缺失价格数据，无法计算资金市值")
+        return pd.DataFrame({"score": score.clip(-10, 10).astype(int), "reason": reason}, index=codes)
+
+    def _score_technical(self, codes: pd.Index, target_date: date) -> pd.DataFrame:
         """
         技术面分析逻辑
         数据源: 融达数据(期限结构), OpenVLab(波动率背离)
         """
-        score = 0
-        reasons = []
-        
-        # 1. 期限结构 (融达)
-        # 查找最近的记录
-        tech_ind = self.db.query(TechnicalIndicator).filter(
-            TechnicalIndicator.comm_code == comm_code
-        ).order_by(TechnicalIndicator.record_time.desc()).first()
-        
-        if tech_ind:
-            # 假设 Contango (升水) 天然空头? 用户需求: "Contango结构天然空头"
-            if "contango" in str(tech_ind.term_structure).lower():
-                score -= 3
-                reasons.append("期限结构Contango(天然空头)")
-            # 假设 Back (贴水) 天然多头? 用户需求: "back结构天然多头"
-            elif "back" in str(tech_ind.term_structure).lower():
-                score += 3
-                reasons.append("期限结构Back(天然多头)")
-                
-        # 2. 波动率背离 (OpenVLab) - 暂时没有直接存储背离标志，需从OptionFlow推导或增加字段
-        # 这里简化处理，如果有OptionFlow大额异动也算
-        flows = self.db.query(OptionFlow).filter(
-            OptionFlow.comm_code == comm_code,
-            OptionFlow.record_time >= datetime.combine(target_date, datetime.min.time())
-        ).all()
-        
-        if flows:
-            net_flow_sum = sum(f.net_flow for f in flows if f.net_flow)
-            if net_flow_sum > 1000: # 假设阈值
-                score += 2
-                reasons.append("期权资金大幅净流入")
-            elif net_flow_sum < -1000:
-                score -= 2
-                reasons.append("期权资金大幅净流出")
-                
-        return min(max(score, -10), 10), "; ".join(reasons)
-
-    def _analyze_message(self, comm_code: str, target_date: date) -> (int, str):
+        as_of = self._as_of(target_date)
+
+        # 1. 期限结构 (融达)：每个品种截至分析日的最近一条记录
+        latest = self.db.query(
+            TechnicalIndicator.comm_code,
+            func.max(TechnicalIndicator.record_time).label("record_time")
+        ).filter(
+            TechnicalIndicator.comm_code.in_(list(codes)),
+            TechnicalIndicator.record_time <= as_of
+        ).group_by(TechnicalIndicator.comm_code).subquery()
+        structure_rows = self.db.query(
+            TechnicalIndicator.comm_code, TechnicalIndicator.term_structure
+        ).join(latest, and_(
+            TechnicalIndicator.comm_code == latest.c.comm_code,
+            TechnicalIndicator.record_time == latest.c.record_time
+        )).order_by(TechnicalIndicator.id).all()
+        structures = pd.DataFrame(structure_rows, columns=["comm_code", "term_structure"])
+        structure = structures.drop_duplicates("comm_code").set_index("comm_code").term_structure.reindex(codes)
+        # 与 str(None) 保持一致，缺失记录不匹配任何结构
+        structure = structure.astype(str).str.lower().where(structure.notna(), "")
+
+        # 用户需求: "Contango结构天然空头", "back结构天然多头"
+        is_contango = structure.str.contains("contango", regex=False)
+        is_back = ~is_contango & structure.str.contains("back", regex=False)
+        structure_score = np.select([is_contango, is_back], [-3, 3], 0)
+        structure_reason = np.select(
+            [is_contango, is_back], ["期限结构Contango(天然空头)", "期限结构Back(天然多头)"], ""
+        )
+
+        # 2. 波动率背离 (OpenVLab) - 暂时没有直接存储背离标志，用当日期权资金净流入近似
+        flow_rows = self.db.execute(flow_totals_query(
+            datetime.combine(target_date, time.min), as_of,
+            comm_codes=list(codes)
+        )).all()
+        net_flow = pd.DataFrame(
+            [(row.comm_code, row.total_net_flow) for row in flow_rows], columns=["comm_code", "net_flow"]
+        ).set_index("comm_code").net_flow
+        net_flow = net_flow.reindex(codes).fillna(0)
+
+        inflow = net_flow > OPTION_FLOW_THRESHOLD
+        outflow = net_flow < -OPTION_FLOW_THRESHOLD
+        flow_score = np.select([inflow, outflow], [2, -2], 0)
+        flow_reason = np.select([inflow, outflow], ["期权资金大幅净流入", "期权资金大幅净流出"], "")
+
+        reason = [
+            "; ".join(r for r in pair if r)
+            for pair in zip(structure_reason, flow_reason)
+        ]
+        return pd.DataFrame({
+            "score": np.clip(structure_score + flow_score, -10, 10),
+            "reason": reason
+        }, index=codes)
+
+    def _score_message(self, codes: pd.Index) -> pd.DataFrame:
         """
         消息面分析
         目前主要是金十数据嵌入，后端难以量化，暂时给0分或基于人工录入
         """
-        return 0, ""
+        return pd.DataFrame({"score": 0, "reason": ""}, index=codes)
+
+    def _save_summaries(self, scores: pd.DataFrame, target_date: date):
+        """单个事务批量写入 MarketAnalysisSummary（按 品种+日期 更新或新增）"""
+        now = datetime.now()
+        rows = [
+            {
+                "comm_code": comm_code,
+                "date": target_date,
+                "fundamental_score": int(row.fundamental_score),
+                "capital_score": int(row.capital_score),
+                "technical_score": int(row.technical_score),
+                "message_score": int(row.message_score),
+                "total_direction": row.total_direction,
+                "main_reason": row.main_reason,
+                "updated_at": now,
+            }
+            for comm_code, row in scores.iterrows()
+        ]
+        bulk_upsert(
+            self.db, MarketAnalysisSummary, rows,
+            key_columns=("comm_code", "date"),
+            update_columns=SUMMARY_UPDATE_COLUMNS
+        )
+
+
+def run_daily_analysis_job(target_date: Optional[date] = None, incremental: bool = False):
+    """
+    使用独立会话执行每日全品种分析
+
+    模块级函数，可被调度器提交到进程池执行（子进程中自行创建数据库连接）
+
+    Args:
+        target_date: 分析日期，默认今天
+        incremental: 先处理变更日志，再只补算当日还没有结果的品种，而不是全品种重算
+    """
+    from app.models.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        service = AnalysisService(db)
+        if incremental:
+            service.run_incremental_analysis()
+            service.fill_missing_summaries(target_date)
+        else:
+            service.run_daily_analysis(target_date)
+    finally:
+        db.close()
+
+
+def run_incremental_analysis_job(limit: Optional[int] = None) -> int:
+    """使用独立会话执行增量分析（供调度器定时调用）"""
+    from app.models.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return AnalysisService(db).run_incremental_analysis(limit)
+    finally:
+        db.close()
 
 
 def summarize_research_reports(
     trade_logics: List[str],
     related_datas: List[str],
     risk_factors: List[str],
-    variety_name: str
+    variety_name: str,
+    raise_on_error: bool = False
 ) -> Dict[str, str]:
     """
     使用AI汇总多个研报的内容
+
+    Args:
+        raise_on_error: AI 调用失败时抛出异常（默认返回结构化拼接的降级结果）
     """
     from config.settings import get_settings
     import google.generativeai as genai
@@ -367,27 +567,37 @@ def summarize_research_reports(
 
     except Exception as e:
         logger.error(f"AI汇总失败: {e}")
+        if raise_on_error:
+            raise
         import traceback
         traceback.print_exc()
-        # 降级方案:结构化拼接前3条
-        result = {}
+        return fallback_research_summary(trade_logics, related_datas, risk_factors)
 
-        if trade_logics:
-            logics = trade_logics[:3]
-            result["trade_logic"] = "【核心观点】\n" + "\n".join(f"• {logic[:100]}..." if len(logic) > 100 else f"• {logic}" for logic in logics)
-        else:
-            result["trade_logic"] = "暂无数据"
 
-        if related_datas:
-            datas = related_datas[:3]
-            result["related_data"] = "【关键数据】\n" + "\n".join(f"• {data[:100]}..." if len(data) > 100 else f"• {data}" for data in datas)
-        else:
-            result["related_data"] = "暂无数据"
-
-        if risk_factors:
-            risks = risk_factors[:2]
-            result["risk_factor"] = "【主要风险】\n" + "\n".join(f"• {risk[:80]}..." if len(risk) > 80 else f"• {risk}" for risk in risks)
-        else:
-            result["risk_factor"] = "暂无数据"
-
-        return result
+def fallback_research_summary(
+    trade_logics: List[str],
+    related_datas: List[str],
+    risk_factors: List[str]
+) -> Dict[str, str]:
+    """降级方案:结构化拼接前3条"""
+    result = {}
+
+    if trade_logics:
+        logics = trade_logics[:3]
+        result["trade_logic"] = "【核心观点】\n" + "\n".join(f"• {logic[:100]}..." if len(logic) > 100 else f"• {logic}" for logic in logics)
+    else:
+        result["trade_logic"] = "暂无数据"
+
+    if related_datas:
+        datas = related_datas[:3]
+        result["related_data"] = "【关键数据】\n" + "\n".join(f"• {data[:100]}..." if len(data) > 100 else f"• {data}" for data in datas)
+    else:
+        result["related_data"] = "暂无数据"
+
+    if risk_factors:
+        risks = risk_factors[:2]
+        result["risk_factor"] = "【主要风险】\n" + "\n".join(f"• {risk[:80]}..." if len(risk) > 80 else f"• {risk}" for risk in risks)
+    else:
+        result["risk_factor"] = "暂无数据"
+
+    return result
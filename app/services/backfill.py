@@ -0,0 +1,261 @@
+"""
+四维分析历史回填
+规则调整后按日期区间重算 MarketAnalysisSummary（历史日期的资金面按日线缓存中的当日价格计算，
+回填前先运行 scripts/backtest_signals.py --refresh-bars 覆盖回填区间）：
+1. 区间内的交易日按 chunk_days 切块，分发到进程池，每个子进程自建数据库引擎
+2. 每完成一块写一次检查点（data/backfill_checkpoints/{run_id}.json），中断后同一 run_id 续跑
+3. 写入按 品种+日期 更新或新增，重复执行结果一致
+
+用法：
+    AnalysisBackfill(date(2024, 1, 1), date(2025, 12, 31), workers=4).run()
+"""
+import json
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.services.trading_calendar import get_trading_calendar
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_DIR = Path(__file__).parent.parent.parent / "data" / "backfill_checkpoints"
+
+# SQLite 多进程写入时等待锁的秒数
+SQLITE_BUSY_TIMEOUT = 60
+
+# 进程数上限：每个子进程都会加载 pandas 并建立数据库连接
+MAX_WORKERS = os.cpu_count() or 1
+
+# 品种代码和 run_id 会拼进检查点文件名，只允许字母、数字（run_id 另允许 _ -）
+COMM_CODE_PATTERN = re.compile(r"^[A-Za-z0-9]+$")
+RUN_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def _backfill_chunk(days: List[str], comm_codes: Optional[List[str]] = None) -> int:
+    """
+    子进程入口：用独立引擎重算一块日期
+
+    Args:
+        days: 日期列表 YYYY-MM-DD
+        comm_codes: 限定品种，默认品种表中的全部品种
+
+    Returns:
+        写入的 品种-日期 组合数
+    """
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from config.settings import get_settings
+    from app.models.models import Commodity
+    from app.services.analysis import AnalysisService
+    from app.services.backtest import get_bar_cache
+
+    database_url = get_settings().DATABASE_URL
+    connect_args = {"timeout": SQLITE_BUSY_TIMEOUT} if database_url.startswith("sqlite") else {}
+    engine = create_engine(database_url, pool_pre_ping=True, connect_args=connect_args)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        if comm_codes is None:
+            comm_codes = [code for (code,) in db.query(Commodity.code).all()]
+        if not comm_codes:
+            return 0
+
+        service = AnalysisService(db)
+        bar_cache = get_bar_cache()
+        latest_trading_day = get_trading_calendar().latest_trading_day()
+        written = 0
+        for day in days:
+            target_date = date.fromisoformat(day)
+            # 历史日期按日线缓存中当日主力合约收盘价计算资金市值（ContractInfo 只有最新价）；
+            # 缓存中没有该日时资金面不计分
+            prices = None
+            if target_date < latest_trading_day:
+                prices = bar_cache.closes_on(target_date)
+                if prices.empty:
+                    logger.warning(f"[回填] {day} 日线缓存中无价格，资金面不计分")
+            scores = service.run_daily_analysis(target_date, comm_codes, prices=prices)
+            written += len(scores)
+        return written
+    finally:
+        db.close()
+        engine.dispose()
+
+
+class AnalysisBackfill:
+    """按日期区间并行回填四维分析结果"""
+
+    def __init__(
+        self,
+        start_date: date,
+        end_date: date,
+        workers: int = 4,
+        chunk_days: int = 20,
+        trading_days_only: bool = True,
+        comm_codes: Optional[List[str]] = None,
+        run_id: Optional[str] = None,
+        checkpoint_dir: Path = CHECKPOINT_DIR
+    ):
+        """
+        Args:
+            start_date: 开始日期（含）
+            end_date: 结束日期（含）
+            workers: 进程数
+            chunk_days: 每块天数（也是检查点粒度）
+            trading_days_only: 只回填交易日
+            comm_codes: 限定品种，默认全部
+            run_id: 检查点标识，相同 run_id 会跳过已完成的日期；默认按参数生成
+            checkpoint_dir: 检查点目录
+        """
+        if start_date > end_date:
+            raise ValueError(f"开始日期 {start_date} 晚于结束日期 {end_date}")
+        invalid_codes = [code for code in comm_codes or [] if not COMM_CODE_PATTERN.match(code)]
+        if invalid_codes:
+            raise ValueError(f"无效的品种代码: {invalid_codes}")
+
+        self.start_date = start_date
+        self.end_date = end_date
+        self.workers = min(max(1, workers), MAX_WORKERS)
+        self.chunk_days = max(1, chunk_days)
+        self.trading_days_only = trading_days_only
+        self.comm_codes = comm_codes
+        self.run_id = run_id or self.default_run_id(start_date, end_date, comm_codes)
+        if not RUN_ID_PATTERN.match(self.run_id):
+            raise ValueError(f"无效的 run_id: {self.run_id}")
+        self.checkpoint_path = Path(checkpoint_dir) / f"{self.run_id}.json"
+
+    @staticmethod
+    def default_run_id(start_date: date, end_date: date, comm_codes: Optional[List[str]] = None) -> str:
+        run_id = f"{start_date:%Y%m%d}_{end_date:%Y%m%d}"
+        if comm_codes:
+            run_id += "_" + "-".join(sorted(comm_codes))
+        return run_id
+
+    def days(self) -> List[str]:
+        """需要回填的所有日期"""
+        if self.trading_days_only:
+            days = get_trading_calendar().trading_days(self.start_date, self.end_date)
+        else:
+            days = [
+                self.start_date + timedelta(days=i)
+                for i in range((self.end_date - self.start_date).days + 1)
+            ]
+        return [d.isoformat() for d in days]
+
+    def run(self, restart: bool = False) -> Dict:
+        """
+        执行回填（阻塞直到完成）
+
+        Args:
+            restart: 忽略已有检查点，从头开始
+
+        Returns:
+            检查点内容（进度与结果）
+        """
+        checkpoint = None if restart else load_checkpoint(self.run_id, self.checkpoint_path.parent)
+        all_days = self.days()
+        completed = set(checkpoint["completed_days"]) if checkpoint else set()
+        pending = [d for d in all_days if d not in completed]
+
+        state = {
+            "run_id": self.run_id,
+            "start_date": self.start_date.isoformat(),
+            "end_date": self.end_date.isoformat(),
+            "comm_codes": self.comm_codes,
+            "status": "running",
+            "total_days": len(all_days),
+            "completed_days": sorted(completed & set(all_days)),
+            "records_written": checkpoint.get("records_written", 0) if checkpoint else 0,
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "updated_at": None,
+            "error": None,
+        }
+        self._save(state)
+
+        if completed:
+            logger.info(f"[回填 {self.run_id}] 从检查点续跑: 已完成 {len(state['completed_days'])}/{len(all_days)} 天")
+
+        chunks = [pending[i:i + self.chunk_days] for i in range(0, len(pending), self.chunk_days)]
+        logger.info(
+            f"[回填 {self.run_id}] 共 {len(pending)} 天待处理, "
+            f"{len(chunks)} 块, {self.workers} 个进程"
+        )
+
+        try:
+            with ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            ) as pool:
+                futures = {pool.submit(_backfill_chunk, chunk, self.comm_codes): chunk for chunk in chunks}
+                for future in as_completed(futures):
+                    chunk = futures[future]
+                    state["records_written"] += future.result()
+                    state["completed_days"] = sorted(set(state["completed_days"]) | set(chunk))
+                    self._save(state)
+                    logger.info(
+                        f"[回填 {self.run_id}] {chunk[0]}~{chunk[-1]} 完成 "
+                        f"({len(state['completed_days'])}/{len(all_days)})"
+                    )
+        except Exception as e:
+            state["status"] = "failed"
+            state["error"] = str(e)
+            self._save(state)
+            logger.error(f"[回填 {self.run_id}] 失败: {e}")
+            raise
+
+        state["status"] = "completed"
+        self._save(state)
+        logger.info(f"[回填 {self.run_id}] 完成: 写入 {state['records_written']} 条")
+        return state
+
+    def _save(self, state: Dict):
+        state["updated_at"] = datetime.now().isoformat(timespec="seconds")
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.checkpoint_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        tmp_path.replace(self.checkpoint_path)
+
+
+def load_checkpoint(run_id: str, checkpoint_dir: Path = CHECKPOINT_DIR) -> Optional[Dict]:
+    """读取检查点，不存在（或 run_id 不合法）时返回 None"""
+    if not RUN_ID_PATTERN.match(run_id):
+        return None
+    path = Path(checkpoint_dir) / f"{run_id}.json"
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# 通过 API 启动、仍在运行的回填
+_running: Dict[str, threading.Thread] = {}
+
+
+def start_backfill_in_background(backfill: AnalysisBackfill, restart: bool = False) -> bool:
+    """
+    在后台线程中执行回填（供 API 调用，立即返回）
+
+    Returns:
+        是否新启动；同一 run_id 正在运行时返回 False
+    """
+    thread = _running.get(backfill.run_id)
+    if thread is not None and thread.is_alive():
+        return False
+
+    def target():
+        try:
+            backfill.run(restart=restart)
+        except Exception:
+            pass  # 错误已写入检查点
+        finally:
+            _running.pop(backfill.run_id, None)
+
+    thread = threading.Thread(target=target, name=f"backfill-{backfill.run_id}", daemon=True)
+    _running[backfill.run_id] = thread
+    thread.start()
+    return True
@@ -0,0 +1,374 @@
+"""
+四维信号回测
+将 MarketAnalysisSummary 的方向信号（或按日重算的得分）与期货日线对齐，计算：
+1. 各持有期的前瞻收益、胜率、多/空分项
+2. 各维度得分的归因（得分方向胜率、得分与收益的相关系数 IC）
+3. 分品种统计
+
+日线按合约缓存到本地（data/bar_cache/futures_daily.pkl），前瞻收益按"信号日主力合约"
+在自身序列上计算，避免主力换月造成的跳空。全部计算在 pandas/NumPy 上向量化完成。
+"""
+import logging
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from app.models.models import MarketAnalysisSummary, DirectionEnum
+
+logger = logging.getLogger(__name__)
+
+BAR_CACHE_FILE = Path(__file__).parent.parent.parent / "data" / "bar_cache" / "futures_daily.pkl"
+
+# 日线缓存覆盖的交易所（优矿代码）
+BAR_EXCHANGES = ["XSGE", "XDCE", "XZCE", "CCFX"]
+
+# 单次请求的日期跨度（天），避免单次返回过多行
+BAR_FETCH_WINDOW_DAYS = 90
+
+DIMENSIONS = ["fundamental", "capital", "technical", "message"]
+
+DIRECTION_SIGN = {
+    DirectionEnum.LONG: 1,
+    DirectionEnum.SHORT: -1,
+    DirectionEnum.NEUTRAL: 0,
+}
+
+
+class BarCache:
+    """期货日线本地缓存（全部合约）"""
+
+    COLUMNS = ["trade_date", "ticker", "comm_code", "close", "open_interest"]
+
+    def __init__(self, path: Path = BAR_CACHE_FILE):
+        self.path = Path(path)
+        self._frame: Optional[pd.DataFrame] = None
+        self._mtime: Optional[float] = None
+        self._closes: Optional[Dict[pd.Timestamp, pd.Series]] = None
+        self._closes_frame: Optional[pd.DataFrame] = None
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def load(self) -> pd.DataFrame:
+        """读取缓存（文件未变化时复用内存中的 DataFrame）"""
+        if not self.path.exists():
+            return pd.DataFrame(columns=self.COLUMNS)
+        mtime = self.path.stat().st_mtime
+        if self._frame is None or self._mtime != mtime:
+            self._frame = pd.read_pickle(self.path)
+            self._mtime = mtime
+        return self._frame
+
+    def closes_on(self, trade_date: date) -> pd.Series:
+        """某交易日各品种主力合约收盘价（index 为品种代码），缓存中没有该日时为空"""
+        frame = self.load()
+        if self._closes is None or self._closes_frame is not frame:
+            self._closes = {
+                day: prices.droplevel("trade_date")
+                for day, prices in main_contract_closes(frame).groupby(level="trade_date")
+            }
+            self._closes_frame = frame
+        return self._closes.get(pd.Timestamp(trade_date), pd.Series(dtype=float))
+
+    def refresh(
+        self,
+        start_date: date,
+        end_date: date,
+        exchanges: Sequence[str] = BAR_EXCHANGES,
+        client=None
+    ) -> int:
+        """
+        从优矿拉取 [start_date, end_date] 的全部合约日线并合并进缓存
+
+        Returns:
+            缓存中的总行数
+        """
+        if client is None:
+            from app.services.uqer_sdk_client import get_uqer_sdk_client, init_uqer_sdk_client
+            from config.settings import get_settings
+
+            client = get_uqer_sdk_client() or init_uqer_sdk_client(get_settings().UQER_TOKEN)
+
+        existing = self.load()
+        frames = [existing] if not existing.empty else []
+        window_start = start_date
+        while window_start <= end_date:
+            window_end = min(window_start + timedelta(days=BAR_FETCH_WINDOW_DAYS - 1), end_date)
+            for exchange_cd in exchanges:
+                raw = client.get_futures_daily(
+                    begin_date=window_start.strftime("%Y%m%d"),
+                    end_date=window_end.strftime("%Y%m%d"),
+                    exchange_cd=exchange_cd
+                )
+                if raw is not None and not raw.empty:
+                    frames.append(self.normalize(raw))
+            logger.info(f"日线缓存: 已拉取 {window_start} ~ {window_end}")
+            window_start = window_end + timedelta(days=1)
+
+        if not frames:
+            logger.warning(f"日线缓存: {start_date} ~ {end_date} 未获取到数据")
+            return 0
+        bars = pd.concat(frames, ignore_index=True)
+        bars = bars.drop_duplicates(["trade_date", "ticker"], keep="last")
+        bars = bars.sort_values(["ticker", "trade_date"]).reset_index(drop=True)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        bars.to_pickle(self.path)
+        self._frame, self._mtime = bars, self.path.stat().st_mtime
+        logger.info(f"日线缓存已更新: {len(bars)} 行 -> {self.path}")
+        return len(bars)
+
+    @classmethod
+    def normalize(cls, raw: pd.DataFrame) -> pd.DataFrame:
+        """优矿 MktFutdGet 结果 -> 缓存列（收盘价缺失时用结算价）"""
+        close = raw["closePrice"] if "closePrice" in raw.columns else pd.Series(np.nan, index=raw.index)
+        if "settlPrice" in raw.columns:
+            close = close.where(close > 0, raw["settlPrice"])
+        bars = pd.DataFrame({
+            "trade_date": pd.to_datetime(raw["tradeDate"]).astype("datetime64[ns]"),
+            "ticker": raw["ticker"].astype(str),
+            "comm_code": raw["contractObject"].astype(str).str.upper(),
+            "close": pd.to_numeric(close, errors="coerce"),
+            "open_interest": pd.to_numeric(raw.get("openInt"), errors="coerce").fillna(0),
+        })
+        return bars[bars.close > 0]
+
+
+def main_contract_returns(bars: pd.DataFrame, horizons: Sequence[int], entry_lag: int = 1) -> pd.DataFrame:
+    """
+    每个 品种+交易日 的主力合约（持仓量最大）及其前瞻收益
+
+    Args:
+        bars: BarCache 格式的日线
+        horizons: 持有期（交易日）
+        entry_lag: 信号日之后第几个交易日收盘入场（信号在收盘后生成，默认次日）
+
+    Returns:
+        DataFrame[comm_code, trade_date, ticker, fwd_ret_{h}...]
+    """
+    bars = bars.sort_values(["ticker", "trade_date"])
+    close = bars.groupby("ticker", sort=False).close
+    entry = close.shift(-entry_lag) if entry_lag else bars.close
+
+    returns = bars[["comm_code", "trade_date", "ticker", "open_interest"]].copy()
+    for h in horizons:
+        returns[f"fwd_ret_{h}"] = close.shift(-(entry_lag + h)) / entry - 1
+
+    # 主力合约：同一品种同一天持仓量最大的合约
+    returns = returns.sort_values(["comm_code", "trade_date", "open_interest"], ascending=[True, True, False])
+    returns = returns.drop_duplicates(["comm_code", "trade_date"]).drop(columns="open_interest")
+    return returns.reset_index(drop=True)
+
+
+def load_stored_signals(
+    db: Session,
+    start_date: date,
+    end_date: date,
+    comm_codes: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """读取已保存的四维得分与方向（一次查询）"""
+    query = db.query(
+        MarketAnalysisSummary.comm_code,
+        MarketAnalysisSummary.date,
+        MarketAnalysisSummary.fundamental_score,
+        MarketAnalysisSummary.capital_score,
+        MarketAnalysisSummary.technical_score,
+        MarketAnalysisSummary.message_score,
+        MarketAnalysisSummary.total_direction
+    ).filter(
+        MarketAnalysisSummary.date >= start_date,
+        MarketAnalysisSummary.date <= end_date
+    )
+    if comm_codes:
+        query = query.filter(MarketAnalysisSummary.comm_code.in_(comm_codes))
+
+    signals = pd.DataFrame(query.all(), columns=[
+        "comm_code", "date", *[f"{d}_score" for d in DIMENSIONS], "total_direction"
+    ])
+    signals["direction"] = signals.total_direction.map(DIRECTION_SIGN).fillna(0).astype(int)
+    return signals.drop(columns="total_direction")
+
+
+def main_contract_closes(bars: pd.DataFrame) -> pd.Series:
+    """每个 交易日+品种 的主力合约（持仓量最大）收盘价"""
+    closes = bars.sort_values(["trade_date", "comm_code", "open_interest"], ascending=[True, True, False])
+    closes = closes.drop_duplicates(["trade_date", "comm_code"])
+    return closes.set_index(["trade_date", "comm_code"]).close
+
+
+def recompute_signals(
+    db: Session,
+    start_date: date,
+    end_date: date,
+    comm_codes: Optional[List[str]] = None,
+    bars: Optional[pd.DataFrame] = None
+) -> pd.DataFrame:
+    """
+    按当前规则逐日重算得分（不写库），用于评估尚未回填的新规则
+
+    评分只读取截至信号日的数据；资金面市值按当日主力合约收盘价计算（bars 为空时无价格，资金面记 0 分），
+    不使用 ContractInfo 中的最新价
+    """
+    from app.models.models import Commodity
+    from app.services.analysis import AnalysisService
+    from app.services.trading_calendar import get_trading_calendar
+
+    if not comm_codes:
+        comm_codes = [code for (code,) in db.query(Commodity.code).all()]
+    if not comm_codes:
+        return load_stored_signals(db, start_date, start_date - timedelta(days=1))
+
+    closes = main_contract_closes(bars if bars is not None else get_bar_cache().load())
+    prices_by_day = {day: prices.droplevel("trade_date") for day, prices in closes.groupby(level="trade_date")}
+    empty_prices = pd.Series(dtype=float)
+
+    service = AnalysisService(db)
+    frames = []
+    for day in get_trading_calendar().trading_days(start_date, end_date):
+        prices = prices_by_day.get(pd.Timestamp(day), empty_prices)
+        scores = service.score_commodities(comm_codes, day, prices=prices)
+        frames.append(scores.assign(date=day).reset_index())
+
+    signals = pd.concat(frames, ignore_index=True)
+    signals["direction"] = signals.total_direction.map(DIRECTION_SIGN).fillna(0).astype(int)
+    return signals[["comm_code", "date", *[f"{d}_score" for d in DIMENSIONS], "direction"]]
+
+
+def run_backtest(
+    signals: pd.DataFrame,
+    returns: pd.DataFrame,
+    horizons: Sequence[int]
+) -> Dict:
+    """
+    计算回测统计
+
+    Args:
+        signals: load_stored_signals / recompute_signals 的结果
+        returns: main_contract_returns 的结果
+        horizons: 持有期
+
+    Returns:
+        {"samples", "horizons": {h: {"direction", "long", "short", "dimensions", "by_variety"}}}
+    """
+    signals = signals.assign(trade_date=pd.to_datetime(signals["date"]).astype("datetime64[ns]"))
+    merged = signals.merge(returns, on=["comm_code", "trade_date"], how="inner")
+
+    result = {"samples": int(len(merged)), "matched_varieties": int(merged.comm_code.nunique()), "horizons": {}}
+    direction = merged.direction.to_numpy()
+    codes = merged.comm_code.to_numpy()
+
+    for h in horizons:
+        ret = merged[f"fwd_ret_{h}"].to_numpy(dtype=float)
+        valid = ~np.isnan(ret)
+
+        dimensions = {}
+        for dim in DIMENSIONS:
+            score = merged[f"{dim}_score"].to_numpy(dtype=float)
+            stats = _signal_stats(np.sign(score), ret, valid)
+            stats["ic"] = _correlation(score[valid], ret[valid])
+            dimensions[dim] = stats
+
+        result["horizons"][str(h)] = {
+            "direction": _signal_stats(direction, ret, valid),
+            "long": _signal_stats(np.where(direction > 0, 1, 0), ret, valid),
+            "short": _signal_stats(np.where(direction < 0, -1, 0), ret, valid),
+            "dimensions": dimensions,
+            "by_variety": _by_variety(codes, direction, ret, valid),
+        }
+    return result
+
+
+def _signal_stats(sign: np.ndarray, ret: np.ndarray, valid: np.ndarray) -> Dict:
+    """有方向（非0）且有前瞻收益的样本上的胜率与收益"""
+    active = valid & (sign != 0)
+    n = int(active.sum())
+    if n == 0:
+        return {"signals": 0, "hit_rate": None, "avg_return": None, "total_return": None}
+    pnl = sign[active] * ret[active]
+    return {
+        "signals": n,
+        "hit_rate": round(float((pnl > 0).mean()), 4),
+        "avg_return": round(float(pnl.mean()), 6),
+        "total_return": round(float(pnl.sum()), 6),
+    }
+
+
+def _correlation(x: np.ndarray, y: np.ndarray) -> Optional[float]:
+    if len(x) < 3 or np.std(x) == 0 or np.std(y) == 0:
+        return None
+    return round(float(np.corrcoef(x, y)[0, 1]), 4)
+
+
+def _by_variety(codes: np.ndarray, direction: np.ndarray, ret: np.ndarray, valid: np.ndarray) -> Dict:
+    active = valid & (direction != 0)
+    if not active.any():
+        return {}
+    pnl = direction[active] * ret[active]
+    stats = pd.DataFrame({"comm_code": codes[active], "pnl": pnl, "hit": pnl > 0}).groupby("comm_code").agg(
+        signals=("pnl", "size"), hit_rate=("hit", "mean"), avg_return=("pnl", "mean"), total_return=("pnl", "sum")
+    )
+    stats = stats.round({"hit_rate": 4, "avg_return": 6, "total_return": 6})
+    return {
+        code: {key: (int(value) if key == "signals" else float(value)) for key, value in row.items()}
+        for code, row in stats.iterrows()
+    }
+
+
+# 进程内共享的日线缓存（按文件修改时间失效）
+_bar_cache: Optional[BarCache] = None
+
+
+def get_bar_cache() -> BarCache:
+    """获取日线缓存单例"""
+    global _bar_cache
+    if _bar_cache is None:
+        _bar_cache = BarCache()
+    return _bar_cache
+
+
+def backtest_signals(
+    db: Session,
+    start_date: date,
+    end_date: date,
+    horizons: Sequence[int] = (1, 5, 10),
+    comm_codes: Optional[List[str]] = None,
+    recompute: bool = False,
+    entry_lag: int = 1
+) -> Dict:
+    """
+    回测入口
+
+    Args:
+        db: 数据库会话
+        start_date, end_date: 信号日期区间
+        horizons: 持有期（交易日）
+        comm_codes: 限定品种
+        recompute: 按当前规则重算得分，而不是读取已保存的结果
+        entry_lag: 信号日之后第几个交易日收盘入场
+    """
+    started = datetime.now()
+    bars = get_bar_cache().load()
+    if bars.empty:
+        raise ValueError("日线缓存为空，请先运行 scripts/backtest_signals.py --refresh-bars")
+
+    if recompute:
+        signals = recompute_signals(db, start_date, end_date, comm_codes, bars=bars)
+    else:
+        signals = load_stored_signals(db, start_date, end_date, comm_codes)
+    if comm_codes:
+        bars = bars[bars.comm_code.isin([code.upper() for code in comm_codes])]
+
+    returns = main_contract_returns(bars, horizons, entry_lag)
+    result = run_backtest(signals, returns, horizons)
+    result.update({
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "source": "recompute" if recompute else "stored",
+        "entry_lag": entry_lag,
+        "elapsed_seconds": round((datetime.now() - started).total_seconds(), 3),
+    })
+    return result
@@ -0,0 +1,95 @@
+"""
+分析变更日志（脏集合）
+采集任务写入分析相关数据后，调用 record_changes 记录受影响的 (品种, 日期)；
+增量分析任务只重算这些组合，无需每次全品种重算。
+
+每个 (品种, 日期) 只保留一行：updated_at 为最近一次变更时间，
+analyzed_at 为最近一次重算开始时间，analyzed_at 为空或早于 updated_at 即为待重算。
+"""
+import logging
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import or_, tuple_
+from sqlalchemy.orm import Session
+
+from app.models.models import AnalysisChangeLog
+from app.services.ingestion import bulk_upsert, IN_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+def record_changes(
+    db: Session,
+    pairs: Iterable[Tuple[str, date]],
+    source: str,
+    commit: bool = True
+) -> int:
+    """
+    记录受影响的 (品种, 日期)
+
+    Args:
+        db: 数据库会话（可与数据写入共用，commit=False 时随数据一起提交）
+        pairs: (comm_code, record_date) 集合
+        source: 数据源名称
+        commit: 是否立即提交
+
+    Returns:
+        记录的组合数
+    """
+    now = datetime.now()
+    rows = [
+        {"comm_code": comm_code, "record_date": record_date, "source": source, "updated_at": now}
+        for comm_code, record_date in {(c, d) for c, d in pairs if c}
+    ]
+    if not rows:
+        return 0
+
+    bulk_upsert(
+        db, AnalysisChangeLog, rows,
+        key_columns=("comm_code", "record_date"),
+        update_columns=("source",),
+        commit=commit
+    )
+    return len(rows)
+
+
+def pending_changes(db: Session, limit: Optional[int] = None) -> Dict[date, List[str]]:
+    """
+    读取待重算的组合
+
+    Returns:
+        {日期: [品种代码, ...]}，按变更时间先后
+    """
+    query = db.query(AnalysisChangeLog.comm_code, AnalysisChangeLog.record_date).filter(
+        or_(
+            AnalysisChangeLog.analyzed_at.is_(None),
+            AnalysisChangeLog.analyzed_at < AnalysisChangeLog.updated_at
+        )
+    ).order_by(AnalysisChangeLog.updated_at)
+    if limit:
+        query = query.limit(limit)
+
+    pending: Dict[date, List[str]] = defaultdict(list)
+    for comm_code, record_date in query.all():
+        pending[record_date].append(comm_code)
+    return dict(pending)
+
+
+def mark_analyzed(db: Session, pairs: List[Tuple[str, date]], analyzed_at: datetime):
+    """
+    标记组合已重算
+
+    analyzed_at 应取重算开始时间：重算期间到达的新变更 updated_at 更晚，仍会保留为待重算
+    """
+    for start in range(0, len(pairs), IN_CHUNK_SIZE):
+        chunk = pairs[start:start + IN_CHUNK_SIZE]
+        db.query(AnalysisChangeLog).filter(
+            tuple_(AnalysisChangeLog.comm_code, AnalysisChangeLog.record_date).in_(chunk)
+        ).update(
+            # 不触发 onupdate，保持 updated_at 为最近一次数据变更时间
+            {AnalysisChangeLog.analyzed_at: analyzed_at,
+             AnalysisChangeLog.updated_at: AnalysisChangeLog.updated_at},
+            synchronize_session=False
+        )
+    db.commit()
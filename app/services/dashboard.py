@@ -0,0 +1,260 @@
+"""
+首页看板
+一次性构建全部品种的 四维总览 + 资金面 + 技术面 + 期权资金流向，替代前端按品种逐个请求
+/summary/{code}/summary、/capital/{code}/flow、/technical/{code}/indicators 等接口。
+
+每个维度一条按品种分组的查询（共 5 条），结果按交易日缓存：
+当前交易日缓存 DASHBOARD_CACHE_TTL 秒；历史交易日不按时间过期，
+但缓存记录了四维总览/品种表的数据版本，增量分析或历史回填改写总览后自动重建。
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.middleware.http_cache import DataVersionTracker
+from app.models.models import (
+    Commodity, InstitutionalPosition, MarketAnalysisSummary, TechnicalIndicator
+)
+from app.services.option_flow_rollup import flow_totals_query
+from app.services.trading_calendar import get_trading_calendar
+from config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# 最多缓存的交易日数
+MAX_CACHED_DAYS = 30
+
+# 缓存随这些表的数据版本失效（回填/增量分析会改写历史日期的总览）
+DASHBOARD_SOURCES = ("market_analysis_summary", "commodities")
+
+
+async def _load_commodities(db: AsyncSession) -> Dict[str, Commodity]:
+    rows = (await db.execute(select(Commodity))).scalars().all()
+    return {c.code: c for c in rows}
+
+
+async def _load_summaries(db: AsyncSession, trade_date: date) -> Dict[str, MarketAnalysisSummary]:
+    rows = (await db.execute(
+        select(MarketAnalysisSummary).where(MarketAnalysisSummary.date == trade_date)
+    )).scalars().all()
+    return {s.comm_code: s for s in rows}
+
+
+async def _load_capital_flows(db: AsyncSession, trade_date: date, days: int) -> Dict[str, List[Dict]]:
+    """各品种近 days 天的席位净持仓/增减仓（按日汇总，日期升序）"""
+    rows = (await db.execute(
+        select(
+            InstitutionalPosition.comm_code,
+            InstitutionalPosition.record_date,
+            func.sum(InstitutionalPosition.net_position).label('total_net'),
+            func.sum(InstitutionalPosition.position_change).label('total_change')
+        ).where(
+            InstitutionalPosition.record_date.between(trade_date - timedelta(days=days), trade_date)
+        ).group_by(
+            InstitutionalPosition.comm_code, InstitutionalPosition.record_date
+        ).order_by(InstitutionalPosition.comm_code, InstitutionalPosition.record_date)
+    )).all()
+
+    flows: Dict[str, List[Dict]] = {}
+    for row in rows:
+        flows.setdefault(row.comm_code, []).append({
+            "date": str(row.record_date),
+            "total_net_position": row.total_net,
+            "total_change": row.total_change
+        })
+    return flows
+
+
+async def _load_technical(db: AsyncSession, trade_date: date) -> Dict[str, TechnicalIndicator]:
+    """各品种截至 trade_date 的最新一条技术指标"""
+    day_end = datetime.combine(trade_date + timedelta(days=1), datetime.min.time())
+    latest = select(
+        TechnicalIndicator.comm_code,
+        func.max(TechnicalIndicator.record_time).label('latest_time')
+    ).where(
+        TechnicalIndicator.record_time < day_end
+    ).group_by(TechnicalIndicator.comm_code).subquery()
+
+    rows = (await db.execute(
+        select(TechnicalIndicator).join(latest, and_(
+            TechnicalIndicator.comm_code == latest.c.comm_code,
+            TechnicalIndicator.record_time == latest.c.latest_time
+        ))
+    )).scalars().all()
+    return {t.comm_code: t for t in rows}
+
+
+async def _load_option_flows(db: AsyncSession, trade_date: date, hours: int) -> Dict[str, Dict]:
+    """各品种前 hours 小时的期权资金流向汇总（最近交易日截至当前时间，历史日期截至当日结束）"""
+    if trade_date >= get_trading_calendar().latest_trading_day():
+        end_time = datetime.now()
+    else:
+        end_time = datetime.combine(trade_date + timedelta(days=1), datetime.min.time())
+    start_time = end_time - timedelta(hours=hours)
+    rows = (await db.execute(flow_totals_query(start_time, end_time))).all()
+
+    return {
+        row.comm_code: {
+            "total_net_flow": row.total_net_flow or 0,
+            "total_volume": row.total_volume or 0,
+            "flow_direction": "流入" if (row.total_net_flow or 0) > 0 else "流出",
+            "count": int(row.record_count or 0)
+        }
+        for row in rows
+    }
+
+
+async def build_dashboard(db: AsyncSession, trade_date: date) -> Dict:
+    """构建某一交易日的全品种看板"""
+    settings = get_settings()
+    commodities = await _load_commodities(db)
+    summaries = await _load_summaries(db, trade_date)
+    capital_flows = await _load_capital_flows(db, trade_date, settings.DASHBOARD_FLOW_DAYS)
+    technical = await _load_technical(db, trade_date)
+    option_flows = await _load_option_flows(db, trade_date, settings.DASHBOARD_OPTION_FLOW_HOURS)
+
+    codes = set(summaries) | set(capital_flows) | set(technical) | set(option_flows)
+    varieties = []
+    for code in codes:
+        commodity = commodities.get(code)
+        summary = summaries.get(code)
+        flow = capital_flows.get(code, [])
+        indicator = technical.get(code)
+
+        summary_data = None
+        if summary is not None:
+            scores = {
+                "fundamental": summary.fundamental_score,
+                "capital": summary.capital_score,
+                "technical": summary.technical_score,
+                "message": summary.message_score
+            }
+            summary_data = {
+                "scores": scores,
+                "total_score": sum(score or 0 for score in scores.values()),
+                "direction": summary.total_direction.value if summary.total_direction else "中性",
+                "reason": summary.main_reason or ""
+            }
+
+        varieties.append({
+            "code": code,
+            "name": commodity.name if commodity else code,
+            "exchange": commodity.exchange if commodity else None,
+            "category": commodity.category if commodity else None,
+            "summary": summary_data,
+            "capital": {
+                "net_position": flow[-1]["total_net_position"] if flow else None,
+                "position_change": flow[-1]["total_change"] if flow else None,
+                "flow_data": flow
+            },
+            "technical": {
+                "iv_rank": indicator.iv_rank,
+                "term_structure": indicator.term_structure,
+                "pcr_ratio": indicator.pcr_ratio,
+                "record_time": indicator.record_time.isoformat()
+            } if indicator else None,
+            "option_flow": option_flows.get(code)
+        })
+
+    # 有总览的按总分降序，其余按代码
+    varieties.sort(key=lambda v: (
+        v["summary"] is None,
+        -(v["summary"]["total_score"] if v["summary"] else 0),
+        v["code"]
+    ))
+
+    directions = [v["summary"]["direction"] for v in varieties if v["summary"]]
+    return {
+        "date": str(trade_date),
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "stats": {
+            "total": len(varieties),
+            "analyzed": len(directions),
+            "long": directions.count("多"),
+            "short": directions.count("空"),
+            "neutral": directions.count("中性")
+        },
+        "varieties": varieties
+    }
+
+
+class DashboardCache:
+    """按交易日缓存已序列化的看板"""
+
+    def __init__(self, ttl: float, max_days: int = MAX_CACHED_DAYS, version_ttl: float = 0):
+        self.ttl = ttl
+        self.max_days = max_days
+        self.tracker = DataVersionTracker(version_ttl)
+        self._entries: "OrderedDict[date, Tuple[Tuple[str, ...], Optional[float], bytes]]" = OrderedDict()
+        self._locks: Dict[date, asyncio.Lock] = {}
+
+    def _fresh(self, trade_date: date, version: Tuple[str, ...]) -> Optional[bytes]:
+        entry = self._entries.get(trade_date)
+        if entry is None:
+            return None
+        entry_version, expires_at, body = entry
+        if entry_version != version:
+            return None
+        if expires_at is not None and expires_at <= time.monotonic():
+            return None
+        self._entries.move_to_end(trade_date)
+        return body
+
+    async def get(self, db: AsyncSession, trade_date: date, refresh: bool = False) -> bytes:
+        version = await self.tracker.version(DASHBOARD_SOURCES)
+        if not refresh:
+            body = self._fresh(trade_date, version)
+            if body is not None:
+                return body
+
+        # 同一交易日只构建一次，并发请求等待结果
+        lock = self._locks.setdefault(trade_date, asyncio.Lock())
+        async with lock:
+            body = None if refresh else self._fresh(trade_date, version)
+            if body is not None:
+                return body
+
+            started = time.perf_counter()
+            dashboard = await build_dashboard(db, trade_date)
+            body = json.dumps(dashboard, ensure_ascii=False, default=str).encode("utf-8")
+            logger.info(
+                f"看板已构建: {trade_date} {dashboard['stats']['total']} 个品种 "
+                f"({time.perf_counter() - started:.2f}s)"
+            )
+
+            is_history = trade_date < get_trading_calendar().latest_trading_day()
+            expires_at = None if is_history else time.monotonic() + self.ttl
+            self._entries[trade_date] = (version, expires_at, body)
+            self._entries.move_to_end(trade_date)
+            while len(self._entries) > self.max_days:
+                oldest, _ = self._entries.popitem(last=False)
+                self._locks.pop(oldest, None)
+            return body
+
+    def invalidate(self, trade_date: Optional[date] = None):
+        """丢弃缓存（trade_date 为空时全部丢弃）"""
+        if trade_date is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(trade_date, None)
+
+
+_dashboard_cache: Optional[DashboardCache] = None
+
+
+def get_dashboard_cache() -> DashboardCache:
+    """获取看板缓存单例"""
+    global _dashboard_cache
+    if _dashboard_cache is None:
+        settings = get_settings()
+        _dashboard_cache = DashboardCache(
+            settings.DASHBOARD_CACHE_TTL, version_ttl=settings.HTTP_CACHE_VERSION_TTL
+        )
+    return _dashboard_cache
@@ -10,7 +10,7 @@ import asyncio
 import logging
 from typing import Callable, Any, List, Dict, Optional
 from app.models.database import SessionLocal
-from app.models.data_governance import DataSource, DataCollectionLog, DataQualityMetric
+from app.models.data_governance import DataSource, DataCollectionLog, DataQualityMetric, CrawlCursor
 
 logger = logging.getLogger(__name__)
 
@@ -158,9 +158,10 @@ class DataCollector:
                 if attempt < self.max_retries:
                     continue
                 else:
-                    # 最终失败，发送告警
+                    # 最终失败，发送告警（同步 HTTP 请求，放到线程池）
                     if self.enable_alert:
-                        self._send_failure_alert(e, attempt + 1)
+                        from app.services.job_runner import get_job_runner
+                        await get_job_runner().run_in_thread(self._send_failure_alert, e, attempt + 1)
                     raise
 
         raise last_exception
@@ -194,116 +195,79 @@ class DataCollector:
         raise last_exception
 
     async def _execute_single_attempt_async(self, func: Callable, args: tuple, kwargs: dict, attempt_num: int):
-        """执行单次异步采集尝试"""
-        db = SessionLocal()
+        """执行单次异步采集尝试（日志与数据源状态的读写在线程池中执行，不阻塞事件循环）"""
+        from app.services.job_runner import get_job_runner
+
+        runner = get_job_runner()
         start_time = time.time()
         collect_time = datetime.now()
 
         # 获取数据源ID
-        source = db.query(DataSource).filter_by(source_name=self.source_name).first()
-        if not source:
-            logger.warning(f"⚠️ 数据源未注册: {self.source_name}")
-            db.close()
+        source_id = await runner.run_in_thread(self._lookup_source_id)
+        if source_id is None:
             return await func(*args, **kwargs)
 
-        source_id = source.id
-
         try:
             # 执行采集（支持超时）
             result = await asyncio.wait_for(
                 func(*args, **kwargs),
                 timeout=self.timeout
             )
-
-            duration = int(time.time() - start_time)
-
-            # 分析结果
-            records_collected = self._count_records(result)
-            quality_score, missing_rate = self._calculate_quality(result) if self.calculate_quality else (None, None)
-
-            # 记录成功日志
-            log = DataCollectionLog(
-                source_id=source_id,
-                source_name=self.source_name,
-                collect_time=collect_time,
-                status='success',
-                duration_seconds=duration,
-                records_collected=records_collected,
-                records_inserted=records_collected,
-                data_quality_score=quality_score,
-                missing_rate=missing_rate
-            )
-            db.add(log)
-
-            # 更新数据源状态
-            source.last_collect_time = collect_time
-            source.last_collect_status = 'success'
-            source.last_record_count = records_collected
-            source.health_status = 'healthy' if quality_score is None or quality_score >= 80 else 'warning'
-
-            db.commit()
-
-            logger.info(f"✅ [{self.source_name}] 采集成功: {records_collected}条数据，耗时{duration}秒")
-
-            return result
-
         except Exception as e:
-            duration = int(time.time() - start_time)
-            error_msg = str(e)
-            error_trace = traceback.format_exc()
-
-            # 记录失败日志
-            log = DataCollectionLog(
-                source_id=source_id,
-                source_name=self.source_name,
-                collect_time=collect_time,
-                status='failed',
-                duration_seconds=duration,
-                records_collected=0,
-                error_message=error_msg,
-                error_traceback=error_trace
+            await runner.run_in_thread(
+                self._record_failure, source_id, collect_time,
+                int(time.time() - start_time), str(e), traceback.format_exc()
             )
-            db.add(log)
-
-            # 更新数据源状态
-            source.last_collect_time = collect_time
-            source.last_collect_status = 'failed'
-            source.health_status = 'critical'
-
-            db.commit()
-
-            logger.error(f"❌ [{self.source_name}] 采集失败: {error_msg}")
-
             raise
 
-        finally:
-            db.close()
+        await runner.run_in_thread(
+            self._record_success, source_id, collect_time, int(time.time() - start_time), result
+        )
+        return result
 
     def _execute_single_attempt_sync(self, func: Callable, args: tuple, kwargs: dict, attempt_num: int):
         """执行单次同步采集尝试"""
-        db = SessionLocal()
         start_time = time.time()
         collect_time = datetime.now()
 
         # 获取数据源ID
-        source = db.query(DataSource).filter_by(source_name=self.source_name).first()
-        if not source:
-            logger.warning(f"⚠️ 数据源未注册: {self.source_name}")
-            db.close()
+        source_id = self._lookup_source_id()
+        if source_id is None:
             return func(*args, **kwargs)
 
-        source_id = source.id
-
         try:
             # 执行采集
             result = func(*args, **kwargs)
+        except Exception as e:
+            self._record_failure(
+                source_id, collect_time, int(time.time() - start_time), str(e), traceback.format_exc()
+            )
+            raise
 
-            duration = int(time.time() - start_time)
+        self._record_success(source_id, collect_time, int(time.time() - start_time), result)
+        return result
 
-            # 分析结果
-            records_collected = self._count_records(result)
-            quality_score, missing_rate = self._calculate_quality(result) if self.calculate_quality else (None, None)
+    def _lookup_source_id(self) -> Optional[int]:
+        """已注册数据源的ID，未注册时返回 None"""
+        db = SessionLocal()
+        try:
+            source = db.query(DataSource).filter_by(source_name=self.source_name).first()
+            if not source:
+                logger.warning(f"⚠️ 数据源未注册: {self.source_name}")
+                return None
+            return source.id
+        finally:
+            db.close()
 
+    def _record_success(self, source_id: int, collect_time: datetime, duration: int, result: Any):
+        """记录成功日志并更新数据源状态"""
+        # 分析结果
+        records_collected = self._count_records(result)
+        records_inserted, records_updated = self._count_written(result, records_collected)
+        quality_score, missing_rate = self._calculate_quality(result) if self.calculate_quality else (None, None)
+
+        db = SessionLocal()
+        try:
             # 记录成功日志
             log = DataCollectionLog(
                 source_id=source_id,
@@ -312,29 +276,38 @@ class DataCollector:
                 status='success',
                 duration_seconds=duration,
                 records_collected=records_collected,
-                records_inserted=records_collected,
+                records_inserted=records_inserted,
+                records_updated=records_updated,
                 data_quality_score=quality_score,
                 missing_rate=missing_rate
             )
             db.add(log)
 
             # 更新数据源状态
-            source.last_collect_time = collect_time
-            source.last_collect_status = 'success'
-            source.last_record_count = records_collected
-            source.health_status = 'healthy' if quality_score is None or quality_score >= 80 else 'warning'
+            source = db.get(DataSource, source_id)
+            if source is not None:
+                source.last_collect_time = collect_time
+                source.last_collect_status = 'success'
+                source.last_record_count = records_collected
+                source.health_status = 'healthy' if quality_score is None or quality_score >= 80 else 'warning'
 
             db.commit()
+        finally:
+            db.close()
 
-            logger.info(f"✅ [{self.source_name}] 采集成功: {records_collected}条数据，耗时{duration}秒")
-
-            return result
-
-        except Exception as e:
-            duration = int(time.time() - start_time)
-            error_msg = str(e)
-            error_trace = traceback.format_exc()
+        logger.info(f"✅ [{self.source_name}] 采集成功: {records_collected}条数据，耗时{duration}秒")
 
+    def _record_failure(
+        self,
+        source_id: int,
+        collect_time: datetime,
+        duration: int,
+        error_msg: str,
+        error_trace: str
+    ):
+        """记录失败日志并更新数据源状态"""
+        db = SessionLocal()
+        try:
             # 记录失败日志
             log = DataCollectionLog(
                 source_id=source_id,
@@ -349,19 +322,18 @@ class DataCollector:
             db.add(log)
 
             # 更新数据源状态
-            source.last_collect_time = collect_time
-            source.last_collect_status = 'failed'
-            source.health_status = 'critical'
+            source = db.get(DataSource, source_id)
+            if source is not None:
+                source.last_collect_time = collect_time
+                source.last_collect_status = 'failed'
+                source.health_status = 'critical'
 
             db.commit()
-
-            logger.error(f"❌ [{self.source_name}] 采集失败: {error_msg}")
-
-            raise
-
         finally:
             db.close()
 
+        logger.error(f"❌ [{self.source_name}] 采集失败: {error_msg}")
+
     def _send_failure_alert(self, exception: Exception, total_attempts: int):
         """发送失败告警"""
         title = f"🚨 数据采集失败告警 - {self.source_name}"
@@ -390,9 +362,23 @@ class DataCollector:
         if isinstance(result, list):
             return len(result)
         if isinstance(result, dict):
+            if 'records_collected' in result:
+                return result['records_collected']
             return len(result)
         return 1
 
+    def _count_written(self, result: Any, records_collected: int) -> tuple:
+        """
+        统计插入/更新记录数
+
+        采集函数返回的 dict 中带 records_inserted / records_updated 时使用其值
+        （见 app.services.ingestion.UpsertResult.as_collector_stats），
+        否则视为全部为新增
+        """
+        if isinstance(result, dict) and 'records_inserted' in result:
+            return result['records_inserted'], result.get('records_updated', 0)
+        return records_collected, 0
+
     def _calculate_quality(self, result: Any) -> tuple:
         """计算数据质量评分"""
         if not result:
@@ -478,3 +464,51 @@ def register_data_source(
 
     finally:
         db.close()
+
+
+def get_crawl_cursor(source_name: str, cursor_key: str) -> Optional[str]:
+    """
+    读取增量采集游标
+
+    Args:
+        source_name: 数据源名称
+        cursor_key: 游标键
+
+    Returns:
+        游标值，从未采集过时返回 None
+    """
+    db = SessionLocal()
+    try:
+        cursor = db.query(CrawlCursor).filter_by(
+            source_name=source_name, cursor_key=cursor_key
+        ).first()
+        return cursor.cursor_value if cursor else None
+    finally:
+        db.close()
+
+
+def save_crawl_cursor(source_name: str, cursor_key: str, cursor_value: str):
+    """
+    保存增量采集游标（不存在则创建）
+
+    Args:
+        source_name: 数据源名称
+        cursor_key: 游标键
+        cursor_value: 游标值
+    """
+    db = SessionLocal()
+    try:
+        cursor = db.query(CrawlCursor).filter_by(
+            source_name=source_name, cursor_key=cursor_key
+        ).first()
+        if cursor:
+            cursor.cursor_value = cursor_value
+        else:
+            db.add(CrawlCursor(
+                source_name=source_name,
+                cursor_key=cursor_key,
+                cursor_value=cursor_value
+            ))
+        db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,217 @@
+"""
+批量入库工具
+替代"逐条 SELECT ... first() 再 add"的写法：
+1. 一次 IN 查询取出批次内已存在的业务主键
+2. bulk_update_mappings / bulk_insert_mappings 批量写入，单次提交
+3. 返回新增/更新/跳过条数，供 DataCollector 记录采集日志
+
+业务主键（如 MarketFullView 的 品种+日期）在表上没有唯一约束，
+无法直接使用 INSERT ... ON CONFLICT，因此在应用层按主键比对。
+"""
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Type
+from sqlalchemy.orm import Session
+
+from app.models.models import MarketFullView, ResearchReport, ResearchSummaryCache
+
+logger = logging.getLogger(__name__)
+
+# 单条 IN 查询的参数上限（SQLite 旧版本默认 999 个绑定参数）
+IN_CHUNK_SIZE = 500
+
+# MarketFullView 可更新的字段（品种名称、日期属于主键信息，不覆盖）
+FULL_VIEW_UPDATE_COLUMNS = [
+    "excessive_num", "excessive_ratio", "neutral_num", "neutral_ratio",
+    "empty_num", "empty_ratio", "total_num", "more_port", "more_rate", "main_sentiment"
+]
+
+
+@dataclass
+class UpsertResult:
+    """批量写入结果"""
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.inserted + self.updated + self.skipped
+
+    def __add__(self, other: "UpsertResult") -> "UpsertResult":
+        return UpsertResult(
+            inserted=self.inserted + other.inserted,
+            updated=self.updated + other.updated,
+            skipped=self.skipped + other.skipped
+        )
+
+    def as_collector_stats(self) -> Dict[str, int]:
+        """转换为 DataCollector 识别的统计字段"""
+        return {
+            "records_collected": self.total,
+            "records_inserted": self.inserted,
+            "records_updated": self.updated,
+        }
+
+
+def bulk_upsert(
+    db: Session,
+    model: Type,
+    rows: Sequence[Dict],
+    key_columns: Sequence[str],
+    update_columns: Optional[Sequence[str]] = None,
+    commit: bool = True
+) -> UpsertResult:
+    """
+    按业务主键批量写入
+
+    Args:
+        db: 数据库会话
+        model: ORM 模型
+        rows: 待写入记录（列名 -> 值）
+        key_columns: 业务主键列
+        update_columns: 已存在时更新的列；为 None 时已存在的记录跳过（只插入新记录）
+        commit: 是否提交
+
+    Returns:
+        UpsertResult
+    """
+    # 批次内按主键去重，后出现的覆盖先出现的
+    unique: Dict[Tuple, Dict] = {}
+    for row in rows:
+        unique[tuple(row[col] for col in key_columns)] = row
+    if not unique:
+        return UpsertResult()
+
+    existing_ids = _load_existing_ids(db, model, key_columns, list(unique))
+
+    now = datetime.now()
+    updates, inserts = [], []
+    skipped = len(rows) - len(unique)
+    for key, row in unique.items():
+        rid = existing_ids.get(key)
+        if rid is None:
+            inserts.append(row)
+        elif update_columns is None:
+            skipped += 1
+        else:
+            update = {col: row[col] for col in update_columns if col in row}
+            update.update(id=rid, updated_at=now)
+            updates.append(update)
+
+    try:
+        if updates:
+            db.bulk_update_mappings(model, updates)
+        if inserts:
+            db.bulk_insert_mappings(model, inserts)
+        if commit:
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    result = UpsertResult(inserted=len(inserts), updated=len(updates), skipped=skipped)
+    logger.info(
+        f"{model.__tablename__} 批量写入: 新增{result.inserted}条, "
+        f"更新{result.updated}条, 跳过{result.skipped}条"
+    )
+    return result
+
+
+def _load_existing_ids(
+    db: Session,
+    model: Type,
+    key_columns: Sequence[str],
+    keys: List[Tuple]
+) -> Dict[Tuple, int]:
+    """一次（分块）IN 查询取出已存在记录的 主键 -> id"""
+    columns = [getattr(model, col) for col in key_columns]
+    existing: Dict[Tuple, int] = {}
+
+    # 按第一列分块做 IN 查询，其余列取批次内的取值集合，结果再按完整主键过滤
+    first_values = sorted({key[0] for key in keys})
+    other_filters = [
+        column.in_({key[i] for key in keys})
+        for i, column in enumerate(columns[1:], start=1)
+    ]
+    wanted = set(keys)
+    for start in range(0, len(first_values), IN_CHUNK_SIZE):
+        chunk = first_values[start:start + IN_CHUNK_SIZE]
+        query = db.query(model.id, *columns).filter(columns[0].in_(chunk), *other_filters)
+        for rid, *values in query.all():
+            key = tuple(values)
+            if key in wanted:
+                existing.setdefault(key, rid)
+    return existing
+
+
+# ========================================
+# 智汇期讯
+# ========================================
+def full_view_row(item: Dict, record_date: date) -> Dict:
+    """fetch_full_view 返回的一条数据 -> MarketFullView 记录"""
+    return {
+        "comm_code": item['variety_code'],
+        "variety_name": item['variety_name'],
+        "record_date": record_date,
+        "excessive_num": item['excessive_num'],
+        "excessive_ratio": item['excessive_ratio'],
+        "neutral_num": item['neutral_num'],
+        "neutral_ratio": item['neutral_ratio'],
+        "empty_num": item['empty_num'],
+        "empty_ratio": item['empty_ratio'],
+        "total_num": item['sum'],
+        "more_port": item['more_port'],
+        "more_rate": item['more_rate'],
+        "main_sentiment": item['main_sentiment'],
+    }
+
+
+def research_report_row(report: Dict) -> Dict:
+    """fetch_research_reports 返回的一条研报 -> ResearchReport 记录"""
+    return {
+        "report_id": report['report_id'],
+        "comm_code": report['variety_code'],
+        "variety_name": report['variety'],
+        "institution_id": report['institution_id'],
+        "institution_name": report['institution_name'],
+        "publish_date": datetime.strptime(report['publish_date'], '%Y-%m-%d').date(),
+        "view_port": report['view_port'],
+        "sentiment": report['sentiment'],
+        "trade_logic": report['trade_logic'],
+        "related_data": report['related_data'],
+        "risk_factor": report['risk_factor'],
+        "report_link": report['link'],
+    }
+
+
+def upsert_full_view(db: Session, items: Iterable[Dict], record_date: date) -> UpsertResult:
+    """写入多空全景：按 品种+日期 已存在则更新，否则新增"""
+    rows = [full_view_row(item, record_date) for item in items]
+    return bulk_upsert(
+        db, MarketFullView, rows,
+        key_columns=("comm_code", "record_date"),
+        update_columns=FULL_VIEW_UPDATE_COLUMNS
+    )
+
+
+def insert_research_reports(db: Session, reports: Iterable[Dict]) -> UpsertResult:
+    """写入研报：按 report_id 去重，已存在的研报跳过；有新研报时清理对应的AI汇总缓存"""
+    rows = [research_report_row(report) for report in reports]
+    result = bulk_upsert(db, ResearchReport, rows, key_columns=("report_id",), commit=False)
+    if result.inserted:
+        invalidate_research_summaries(db, {(row["comm_code"], row["publish_date"]) for row in rows})
+    db.commit()
+    return result
+
+
+def invalidate_research_summaries(db: Session, pairs: Iterable[Tuple[str, date]]) -> int:
+    """删除 (品种, 日期) 的研报汇总缓存（不提交）"""
+    deleted = 0
+    for comm_code, publish_date in pairs:
+        deleted += db.query(ResearchSummaryCache).filter(
+            ResearchSummaryCache.comm_code == comm_code,
+            ResearchSummaryCache.publish_date == publish_date
+        ).delete(synchronize_session=False)
+    return deleted
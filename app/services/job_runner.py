@@ -0,0 +1,285 @@
+"""
+定时任务执行层
+调度器与 FastAPI 共用同一个事件循环，阻塞操作（requests、优矿SDK、同步 SQLAlchemy 提交、
+OCR 解析等）直接在协程里执行会卡住所有 API 请求。这里提供：
+1. 有界线程池：I/O 型同步代码（HTTP 请求、数据库读写）
+2. 有界进程池：CPU 型同步代码（需可 pickle 的模块级函数）
+3. 事件循环延迟监控：按任务统计运行期间的最大/平均循环延迟
+
+用法：
+    runner = get_job_runner()
+
+    @runner.job("虚实比数据", executor="thread")
+    def crawl_sync(): ...                 # 整个同步任务放到线程池
+
+    @runner.job("智汇期讯")
+    async def crawl_async():              # 异步任务在事件循环上执行，只统计延迟
+        data = await runner.run_in_thread(blocking_fetch)
+"""
+import asyncio
+import functools
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, Optional
+from config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _LagWindow:
+    """单次任务运行期间的循环延迟统计"""
+    job_name: str
+    samples: int = 0
+    total: float = 0.0
+    max_lag: float = 0.0
+
+    def record(self, lag: float):
+        self.samples += 1
+        self.total += lag
+        self.max_lag = max(self.max_lag, lag)
+
+    @property
+    def mean_lag(self) -> float:
+        return self.total / self.samples if self.samples else 0.0
+
+
+class LoopLagMonitor:
+    """
+    事件循环延迟监控
+
+    每 interval 秒 sleep 一次，实际唤醒时间比预期晚多少即为循环延迟；
+    延迟会同时记入所有正在运行任务的统计窗口。
+    """
+
+    def __init__(self, interval: float = 0.5, warn_threshold: float = 0.2):
+        """
+        Args:
+            interval: 采样间隔（秒）
+            warn_threshold: 单次延迟超过该值（秒）时输出告警日志
+        """
+        self.interval = interval
+        self.warn_threshold = warn_threshold
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._windows: Dict[int, _LagWindow] = {}
+        self._next_token = 0
+        self._expected: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """在当前事件循环中启动监控（重复调用无副作用）"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def open_window(self, job_name: str) -> int:
+        """开始统计一个任务，返回窗口标识"""
+        self._next_token += 1
+        self._windows[self._next_token] = _LagWindow(job_name)
+        return self._next_token
+
+    def close_window(self, token: int) -> _LagWindow:
+        """结束统计并返回该任务运行期间的延迟"""
+        window = self._windows.pop(token, _LagWindow(""))
+        # 任务刚阻塞完循环就结束时，采样协程还没来得及醒来，补记这段未采到的延迟
+        if self._expected is not None and self._task is not None and not self._task.done():
+            overdue = asyncio.get_running_loop().time() - self._expected
+            if overdue > 0:
+                window.record(overdue)
+        return window
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - self._expected)
+
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            for window in self._windows.values():
+                window.record(lag)
+
+            if lag >= self.warn_threshold:
+                running = sorted({w.job_name for w in self._windows.values()})
+                logger.warning(
+                    f"事件循环延迟 {lag * 1000:.0f}ms (运行中任务: {', '.join(running) or '无'})"
+                )
+
+
+class JobRunner:
+    """定时任务执行器：线程池 / 进程池 + 循环延迟统计"""
+
+    EXECUTORS = (None, "thread", "process")
+
+    def __init__(
+        self,
+        thread_workers: int = 4,
+        process_workers: int = 2,
+        lag_interval: float = 0.5,
+        lag_warn_threshold: float = 0.2
+    ):
+        """
+        Args:
+            thread_workers: 线程池大小
+            process_workers: 进程池大小
+            lag_interval: 循环延迟采样间隔（秒）
+            lag_warn_threshold: 循环延迟告警阈值（秒）
+        """
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self.monitor = LoopLagMonitor(lag_interval, lag_warn_threshold)
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._stats: Dict[str, Dict] = {}
+
+    # ----------------------------------------
+    # 执行器
+    # ----------------------------------------
+    async def run_in_thread(self, func: Callable, *args, **kwargs):
+        """在线程池中执行同步函数"""
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                max_workers=self.thread_workers,
+                thread_name_prefix="job"
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._thread_pool, functools.partial(func, *args, **kwargs)
+        )
+
+    async def run_in_process(self, func: Callable, *args, **kwargs):
+        """在进程池中执行同步函数（func 及参数须可 pickle，即模块级函数）"""
+        if self._process_pool is None:
+            # spawn 避免 fork 继承事件循环线程和数据库连接
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.process_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._process_pool, functools.partial(func, *args, **kwargs)
+        )
+
+    # ----------------------------------------
+    # 任务装饰器
+    # ----------------------------------------
+    def job(self, name: Optional[str] = None, executor: Optional[str] = None):
+        """
+        包装定时任务，记录耗时和运行期间的循环延迟
+
+        Args:
+            name: 任务名称，默认取函数名
+            executor: 同步函数的执行位置 - 'thread'（默认）/ 'process'；
+                      异步函数只能为 None，内部的阻塞调用需自行 run_in_thread
+
+        进程池执行的函数必须能按模块路径 pickle，被装饰的函数本身不满足，
+        因此 'process' 需搭配一个未装饰的模块级函数使用：
+            runner.job("分析", executor="process")(module_level_func)
+        """
+        if executor not in self.EXECUTORS:
+            raise ValueError(f"未知的执行器: {executor}")
+
+        def decorator(func: Callable) -> Callable:
+            job_name = name or func.__name__
+            is_async = asyncio.iscoroutinefunction(func)
+            if is_async and executor is not None:
+                raise ValueError(f"异步任务 {job_name} 不能指定执行器 {executor}")
+            mode = "loop" if is_async else (executor or "thread")
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                if is_async:
+                    run = func(*args, **kwargs)
+                elif mode == "process":
+                    run = self.run_in_process(func, *args, **kwargs)
+                else:
+                    run = self.run_in_thread(func, *args, **kwargs)
+                return await self._measure(job_name, mode, run)
+
+            return wrapper
+
+        return decorator
+
+    async def _measure(self, job_name: str, mode: str, run):
+        """执行任务并记录耗时、循环延迟"""
+        self.monitor.start()
+        token = self.monitor.open_window(job_name)
+        started_at = datetime.now()
+        start = time.perf_counter()
+        status = "failed"
+        try:
+            result = await run
+            status = "success"
+            return result
+        finally:
+            duration = time.perf_counter() - start
+            window = self.monitor.close_window(token)
+            stats = self._stats.setdefault(job_name, {"runs": 0, "failures": 0})
+            stats["runs"] += 1
+            if status == "failed":
+                stats["failures"] += 1
+            stats.update({
+                "executor": mode,
+                "last_status": status,
+                "last_start": started_at.isoformat(timespec="seconds"),
+                "last_duration_s": round(duration, 3),
+                "last_max_loop_lag_ms": round(window.max_lag * 1000, 1),
+                "last_mean_loop_lag_ms": round(window.mean_lag * 1000, 1),
+            })
+            logger.info(
+                f"[任务] {job_name} ({mode}) {status}, 耗时 {duration:.2f}s, "
+                f"循环延迟 max {window.max_lag * 1000:.0f}ms / mean {window.mean_lag * 1000:.0f}ms"
+            )
+
+    # ----------------------------------------
+    # 状态 / 关闭
+    # ----------------------------------------
+    def stats(self) -> Dict:
+        """各任务最近一次执行统计及当前循环延迟"""
+        return {
+            "loop_lag_ms": round(self.monitor.last_lag * 1000, 1),
+            "max_loop_lag_ms": round(self.monitor.max_lag * 1000, 1),
+            "jobs": dict(self._stats),
+        }
+
+    async def shutdown(self):
+        """停止延迟监控并关闭线程池/进程池"""
+        await self.monitor.stop()
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False, cancel_futures=True)
+            self._thread_pool = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+
+
+# 全局单例
+_job_runner: Optional[JobRunner] = None
+
+
+def get_job_runner() -> JobRunner:
+    """获取任务执行器单例"""
+    global _job_runner
+    if _job_runner is None:
+        settings = get_settings()
+        _job_runner = JobRunner(
+            thread_workers=settings.JOB_THREAD_WORKERS,
+            process_workers=settings.JOB_PROCESS_WORKERS,
+            lag_interval=settings.LOOP_LAG_INTERVAL,
+            lag_warn_threshold=settings.LOOP_LAG_WARN_THRESHOLD
+        )
+    return _job_runner
@@ -0,0 +1,141 @@
+"""
+数据文件内存缓存
+脚本定时生成的数据文件（如 data/term_structure_data*.json、V2 分析结果 CSV）被接口高频轮询，
+每次请求都重新打开并解析文件代价较高。此处按文件 (mtime, size) 缓存：
+1. 解析结果（data，JSON 为 dict，CSV 为 DataFrame）
+2. 由 data 派生的结构（derive，如按市场结构分类后的列表）
+3. 已序列化的响应字节（render，按调用方给定的 key 缓存）
+
+文件变化（mtime 或 size 改变）后下一次访问时重新加载，派生结果与响应字节一并失效。
+文件写到一半解析失败时继续使用上一次成功加载的版本。
+"""
+import json
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 每个文件最多缓存的已序列化响应数
+MAX_RENDERED_RESPONSES = 256
+
+
+class JsonSnapshot:
+    """某一版本文件的解析结果及派生缓存"""
+
+    def __init__(self, data: Any, signature: Tuple[int, int]):
+        self.data = data
+        self.signature = signature
+        self.loaded_at = datetime.now()
+        self._derived: Dict[str, Any] = {}
+        self._rendered: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def derive(self, name: str, builder: Callable[[Any], Any]) -> Any:
+        """由 data 计算的派生结果（每个版本只计算一次）"""
+        with self._lock:
+            if name not in self._derived:
+                self._derived[name] = builder(self.data)
+            return self._derived[name]
+
+    def render(self, key: Hashable, builder: Callable[[], Any]) -> bytes:
+        """序列化后的响应体（按 key 缓存，超过上限时淘汰最早的）"""
+        with self._lock:
+            body = self._rendered.get(key)
+            if body is not None:
+                self._rendered.move_to_end(key)
+                return body
+
+        body = json.dumps(builder(), ensure_ascii=False, default=str).encode("utf-8")
+        with self._lock:
+            self._rendered[key] = body
+            while len(self._rendered) > MAX_RENDERED_RESPONSES:
+                self._rendered.popitem(last=False)
+        return body
+
+
+def _load_json(path: Path) -> Any:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _load_csv(path: Path) -> pd.DataFrame:
+    return pd.read_csv(path)
+
+
+class JsonFileCache:
+    """按 (mtime, size) 失效的数据文件缓存（响应序列化为 JSON）"""
+
+    def __init__(self, path: Path, loader: Callable[[Path], Any] = _load_json):
+        self.path = Path(path)
+        self.loader = loader
+        self._snapshot: Optional[JsonSnapshot] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[JsonSnapshot]:
+        """
+        获取当前版本
+
+        Returns:
+            JsonSnapshot；文件不存在且从未加载成功时返回 None
+        """
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            logger.warning(f"数据文件不存在: {self.path}")
+            return self._snapshot
+
+        signature = (stat.st_mtime_ns, stat.st_size)
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.signature == signature:
+            return snapshot
+
+        with self._lock:
+            if self._snapshot is not None and self._snapshot.signature == signature:
+                return self._snapshot
+            try:
+                data = self.loader(self.path)
+            except Exception as e:
+                logger.error(f"加载数据文件失败 {self.path}: {e}")
+                return self._snapshot
+
+            self._snapshot = JsonSnapshot(data, signature)
+            logger.info(f"已加载数据文件: {self.path.name} ({stat.st_size} 字节)")
+            return self._snapshot
+
+    def invalidate(self):
+        """丢弃缓存，下次访问时重新加载"""
+        with self._lock:
+            self._snapshot = None
+
+
+_caches: Dict[Path, JsonFileCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_json_file_cache(path: Path, loader: Callable[[Path], Any] = _load_json) -> JsonFileCache:
+    """获取指定文件的缓存单例"""
+    path = Path(path).resolve()
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = JsonFileCache(path, loader)
+        return _caches[path]
+
+
+def get_csv_file_cache(path: Path) -> JsonFileCache:
+    """获取 CSV 文件的缓存单例（data 为 pandas 按列推断类型后的 DataFrame）"""
+    return get_json_file_cache(path, _load_csv)
+
+
+def invalidate_file_caches(directory: Path):
+    """丢弃目录下所有文件的缓存（生成脚本运行结束后调用）"""
+    directory = Path(directory).resolve()
+    with _caches_lock:
+        caches = [cache for path, cache in _caches.items() if path.parent == directory]
+    for cache in caches:
+        cache.invalidate()
@@ -0,0 +1,285 @@
+"""
+期权资金流向汇总
+Openvlab 分钟级采集的 OptionFlow 原始记录增长很快，按时间窗口汇总时不再逐条读取：
+1. 写入原始记录时同步累加到 option_flow_rollups（1分钟/5分钟/1小时/1天 四种粒度，按 品种+合约）
+2. 查询时把时间窗口拆成尽量粗的整段：中间用粗粒度，两端依次用细粒度，
+   不足 1 分钟的零头读原始记录；各段 UNION ALL 后在数据库内分组求和
+
+例：10:37:22 查询近 1 小时 -> 原始[09:37:22,09:38) + 1m[09:38,09:40) + 5m[09:40,10:00)
+                           + 5m[10:00,10:35) + 1m[10:35,10:37) + 原始[10:37,10:37:22]
+
+增量累加按"先读已有汇总再写回"实现，写入方需串行（采集任务本身不会并发运行）；
+数据异常或历史数据补录后可用 rebuild_rollups 按原始记录重建（仅限原始记录保留期内）。
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, delete, func, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from app.models.models import OptionFlow, OptionFlowRollup
+
+logger = logging.getLogger(__name__)
+
+# 粒度 -> 时间段长度，由粗到细
+RESOLUTIONS: Dict[str, timedelta] = {
+    "1d": timedelta(days=1),
+    "1h": timedelta(hours=1),
+    "5m": timedelta(minutes=5),
+    "1m": timedelta(minutes=1),
+}
+
+# 单条 IN 查询的参数上限
+IN_CHUNK_SIZE = 500
+
+RollupKey = Tuple[str, datetime, str, str]
+
+
+def bucket_start(ts: datetime, resolution: str) -> datetime:
+    """ts 所在时间段的起点"""
+    if resolution == "1d":
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    if resolution == "1h":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    if resolution == "5m":
+        return ts.replace(minute=ts.minute - ts.minute % 5, second=0, microsecond=0)
+    return ts.replace(second=0, microsecond=0)
+
+
+def _ceil_bucket(ts: datetime, resolution: str) -> datetime:
+    start = bucket_start(ts, resolution)
+    return start if start == ts else start + RESOLUTIONS[resolution]
+
+
+def _aggregate(flows: Iterable[Tuple[str, str, float, float, datetime]]) -> Dict[RollupKey, List[float]]:
+    """(品种, 合约, 净流入, 成交量, 时间) -> {(粒度, 时间段, 品种, 合约): [净流入, 成交量, 条数]}"""
+    totals: Dict[RollupKey, List[float]] = {}
+    for comm_code, contract_code, net_flow, volume, record_time in flows:
+        for resolution in RESOLUTIONS:
+            key = (resolution, bucket_start(record_time, resolution), comm_code, contract_code or "")
+            total = totals.get(key)
+            if total is None:
+                total = totals[key] = [0.0, 0.0, 0]
+            total[0] += net_flow or 0
+            total[1] += volume or 0
+            total[2] += 1
+    return totals
+
+
+def _load_existing(db: Session, keys: Sequence[RollupKey]) -> Dict[RollupKey, Tuple[int, float, float, int]]:
+    """批次内涉及的已有汇总行 -> (id, 净流入, 成交量, 条数)（按 粒度+时间段 分组做 IN 查询）"""
+    by_bucket: Dict[Tuple[str, datetime], set] = {}
+    for resolution, start, comm_code, _ in keys:
+        by_bucket.setdefault((resolution, start), set()).add(comm_code)
+
+    wanted = set(keys)
+    existing: Dict[RollupKey, Tuple[int, float, float, int]] = {}
+    for (resolution, start), codes in by_bucket.items():
+        codes = sorted(codes)
+        for i in range(0, len(codes), IN_CHUNK_SIZE):
+            rows = db.query(
+                OptionFlowRollup.id, OptionFlowRollup.comm_code, OptionFlowRollup.contract_code,
+                OptionFlowRollup.net_flow, OptionFlowRollup.volume, OptionFlowRollup.record_count
+            ).filter(
+                OptionFlowRollup.resolution == resolution,
+                OptionFlowRollup.bucket_start == start,
+                OptionFlowRollup.comm_code.in_(codes[i:i + IN_CHUNK_SIZE])
+            ).all()
+            for rid, comm_code, contract_code, net_flow, volume, count in rows:
+                key = (resolution, start, comm_code, contract_code)
+                if key in wanted:
+                    existing[key] = (rid, net_flow or 0, volume or 0, count or 0)
+    return existing
+
+
+def _write_totals(
+    db: Session,
+    totals: Dict[RollupKey, List[float]],
+    existing: Dict[RollupKey, Tuple[int, float, float, int]]
+):
+    now = datetime.now()
+    updates, inserts = [], []
+    for key, (net_flow, volume, count) in totals.items():
+        current = existing.get(key)
+        if current is None:
+            resolution, start, comm_code, contract_code = key
+            inserts.append({
+                "resolution": resolution,
+                "bucket_start": start,
+                "comm_code": comm_code,
+                "contract_code": contract_code,
+                "net_flow": net_flow,
+                "volume": volume,
+                "record_count": count,
+                "updated_at": now,
+            })
+        else:
+            rid, current_flow, current_volume, current_count = current
+            updates.append({
+                "id": rid,
+                "net_flow": current_flow + net_flow,
+                "volume": current_volume + volume,
+                "record_count": current_count + count,
+                "updated_at": now,
+            })
+    if updates:
+        db.bulk_update_mappings(OptionFlowRollup, updates)
+    if inserts:
+        db.bulk_insert_mappings(OptionFlowRollup, inserts)
+
+
+def apply_option_flows(db: Session, records: Sequence[OptionFlow], commit: bool = False) -> int:
+    """
+    把新写入的原始记录累加到各粒度汇总
+
+    Args:
+        db: 数据库会话（与原始记录共用，commit=False 时随原始记录一起提交）
+        records: 本批新增的 OptionFlow
+        commit: 是否立即提交
+
+    Returns:
+        涉及的汇总行数
+    """
+    totals = _aggregate(
+        (r.comm_code, r.contract_code, r.net_flow, r.volume, r.record_time)
+        for r in records if r.comm_code
+    )
+    if not totals:
+        return 0
+
+    _write_totals(db, totals, _load_existing(db, list(totals)))
+    if commit:
+        db.commit()
+    return len(totals)
+
+
+def rebuild_rollups(db: Session, start: datetime, end: datetime) -> int:
+    """
+    按原始记录重建 [start, end) 覆盖的各粒度汇总（start/end 按天取整）
+
+    原始记录超过保留天数后已被归档删除（见 retention），汇总表是这部分时间唯一的数据，
+    因此 start 早于保留起点时截断到保留起点，不删除也不重建更早的汇总。
+
+    Returns:
+        重建的原始记录数
+    """
+    from app.services.retention import option_flow_cutoff
+
+    start = bucket_start(start, "1d")
+    end = _ceil_bucket(end, "1d")
+    cutoff = option_flow_cutoff()
+    if cutoff is not None and start < cutoff:
+        logger.warning(f"期权资金流向原始记录只保留到 {cutoff}，{start} ~ {cutoff} 的汇总保留不重建")
+        start = cutoff
+    if start >= end:
+        return 0
+    try:
+        db.execute(delete(OptionFlowRollup).where(
+            OptionFlowRollup.bucket_start >= start,
+            OptionFlowRollup.bucket_start < end
+        ))
+
+        # 逐天读取原始记录汇总后写入（区间内旧汇总已删除，只需插入）
+        count = 0
+        day = start
+        while day < end:
+            next_day = day + RESOLUTIONS["1d"]
+            rows = db.query(
+                OptionFlow.comm_code, OptionFlow.contract_code, OptionFlow.net_flow,
+                OptionFlow.volume, OptionFlow.record_time
+            ).filter(
+                OptionFlow.record_time >= day,
+                OptionFlow.record_time < next_day,
+                OptionFlow.comm_code != ""
+            ).all()
+            if rows:
+                _write_totals(db, _aggregate(rows), {})
+                count += len(rows)
+            day = next_day
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    logger.info(f"期权资金流向汇总已重建: {start} ~ {end}, 原始记录 {count} 条")
+    return count
+
+
+def plan_segments(
+    start: datetime,
+    end: datetime,
+    resolutions: Sequence[str] = tuple(RESOLUTIONS)
+) -> List[Tuple[Optional[str], datetime, datetime]]:
+    """
+    把 [start, end) 拆成 (粒度, 段起点, 段终点)，粒度为 None 表示读原始记录
+
+    中间部分用能整段覆盖的最粗粒度，两端剩余部分递归使用更细的粒度。
+    """
+    if start >= end:
+        return []
+    for i, resolution in enumerate(resolutions):
+        inner_start = _ceil_bucket(start, resolution)
+        inner_end = bucket_start(end, resolution)
+        if inner_start < inner_end:
+            finer = resolutions[i + 1:]
+            return (
+                plan_segments(start, inner_start, finer)
+                + [(resolution, inner_start, inner_end)]
+                + plan_segments(inner_end, end, finer)
+            )
+    return [(None, start, end)]
+
+
+def flow_totals_query(
+    start: datetime,
+    end: datetime,
+    comm_codes: Optional[Sequence[str]] = None,
+    by_contract: bool = False
+):
+    """
+    [start, end] 内的期权资金流向合计（同步/异步会话均可执行）
+
+    Returns:
+        Select，列为 comm_code[, contract_code], total_net_flow, total_volume, record_count
+    """
+    # 原始记录的查询条件含 end 本身，与 between 的语义保持一致
+    end = end + timedelta(microseconds=1)
+    parts = []
+    for resolution, seg_start, seg_end in plan_segments(start, end):
+        if resolution is None:
+            columns = [
+                OptionFlow.comm_code,
+                func.coalesce(OptionFlow.contract_code, "").label("contract_code"),
+                func.coalesce(OptionFlow.net_flow, 0).label("net_flow"),
+                func.coalesce(OptionFlow.volume, 0).label("volume"),
+                literal(1).label("record_count"),
+            ]
+            conditions = [OptionFlow.record_time >= seg_start, OptionFlow.record_time < seg_end]
+            if comm_codes is not None:
+                conditions.append(OptionFlow.comm_code.in_(list(comm_codes)))
+        else:
+            columns = [
+                OptionFlowRollup.comm_code,
+                OptionFlowRollup.contract_code,
+                OptionFlowRollup.net_flow,
+                OptionFlowRollup.volume,
+                OptionFlowRollup.record_count,
+            ]
+            conditions = [
+                OptionFlowRollup.resolution == resolution,
+                OptionFlowRollup.bucket_start >= seg_start,
+                OptionFlowRollup.bucket_start < seg_end,
+            ]
+            if comm_codes is not None:
+                conditions.append(OptionFlowRollup.comm_code.in_(list(comm_codes)))
+        parts.append(select(*columns).where(and_(*conditions)))
+
+    segments = union_all(*parts).subquery()
+    keys = [segments.c.comm_code] + ([segments.c.contract_code] if by_contract else [])
+    return select(
+        *keys,
+        func.sum(segments.c.net_flow).label("total_net_flow"),
+        func.sum(segments.c.volume).label("total_volume"),
+        func.sum(segments.c.record_count).label("record_count")
+    ).group_by(*keys)
@@ -0,0 +1,58 @@
+"""
+令牌桶限流器
+按站点限制爬虫请求速率，多个并发任务共享同一个桶
+"""
+import asyncio
+import time
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """异步令牌桶"""
+
+    def __init__(self, rate: float, capacity: int = 1):
+        """
+        Args:
+            rate: 每秒补充的令牌数（即平均请求速率）
+            capacity: 桶容量（允许的瞬时突发请求数）
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self, tokens: int = 1):
+        """获取令牌，不足时等待补充"""
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+# 站点 -> 令牌桶
+_limiters: Dict[str, TokenBucket] = {}
+
+
+def get_rate_limiter(site: str, rate: Optional[float] = None, capacity: int = 1) -> TokenBucket:
+    """
+    获取站点共享的令牌桶（首次调用时按参数创建）
+
+    Args:
+        site: 站点标识，如 'jiaoyikecha'
+        rate: 每秒令牌数
+        capacity: 桶容量
+    """
+    if site not in _limiters:
+        if rate is None:
+            raise ValueError(f"站点 {site} 的限流器未初始化，需要指定 rate")
+        _limiters[site] = TokenBucket(rate=rate, capacity=capacity)
+    return _limiters[site]
@@ -0,0 +1,153 @@
+"""
+研报AI汇总缓存
+/zhihui/research-summary 对多篇研报调用 Gemini 汇总，耗时数秒。汇总结果写入 research_summary_cache：
+1. 按 (品种, 日期, 排序后 report_id 列表的哈希) 缓存，研报集合不变时直接读取
+2. 新研报入库时（insert_research_reports）删除对应 品种+日期 的缓存；即使未删除，哈希变化也不会命中旧结果
+3. AI 调用失败时返回结构化拼接的降级结果，不写入缓存，下次访问重试
+4. 每晚预计算最近交易日所有品种的汇总，页面访问时无需等待 AI
+
+单篇研报不调用 AI，也不缓存。
+"""
+import hashlib
+import logging
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.models import ResearchReport, ResearchSummaryCache
+from app.services.analysis import fallback_research_summary, summarize_research_reports
+from app.services.ingestion import bulk_upsert, invalidate_research_summaries
+from app.services.trading_calendar import get_trading_calendar
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_FIELDS = ("trade_logic", "related_data", "risk_factor")
+
+
+def reports_hash(reports: Iterable[ResearchReport]) -> str:
+    """排序后 report_id 列表的哈希"""
+    ids = sorted(str(r.report_id if r.report_id is not None else f"row{r.id}") for r in reports)
+    return hashlib.sha1(",".join(ids).encode()).hexdigest()
+
+
+def cached_summary_query(comm_code: str, publish_date: date, digest: str):
+    """查询缓存（同步/异步会话均可执行）"""
+    return select(ResearchSummaryCache).where(
+        ResearchSummaryCache.comm_code == comm_code,
+        ResearchSummaryCache.publish_date == publish_date,
+        ResearchSummaryCache.reports_hash == digest
+    ).limit(1)
+
+
+def cache_to_summary(row: ResearchSummaryCache) -> Dict[str, str]:
+    return {field: getattr(row, field) or "" for field in SUMMARY_FIELDS}
+
+
+def build_summary(reports: List[ResearchReport]) -> Tuple[Dict[str, str], bool]:
+    """
+    汇总研报内容（多篇时调用 AI，阻塞数秒）
+
+    Returns:
+        (汇总, 是否可缓存)；单篇研报或 AI 调用失败时不可缓存
+    """
+    trade_logics = [r.trade_logic for r in reports if r.trade_logic]
+    related_datas = [r.related_data for r in reports if r.related_data]
+    risk_factors = [r.risk_factor for r in reports if r.risk_factor]
+
+    if len(trade_logics) <= 1:
+        # 单个研报直接返回
+        return {
+            "trade_logic": trade_logics[0] if trade_logics else "暂无数据",
+            "related_data": related_datas[0] if related_datas else "暂无数据",
+            "risk_factor": risk_factors[0] if risk_factors else "暂无数据"
+        }, False
+
+    try:
+        summary = summarize_research_reports(
+            trade_logics=trade_logics,
+            related_datas=related_datas,
+            risk_factors=risk_factors,
+            variety_name=reports[0].variety_name,
+            raise_on_error=True
+        )
+    except Exception:
+        return fallback_research_summary(trade_logics, related_datas, risk_factors), False
+    return summary, True
+
+
+def save_summary(
+    db: Session,
+    comm_code: str,
+    publish_date: date,
+    digest: str,
+    reports_count: int,
+    summary: Dict[str, str]
+):
+    """写入缓存，并清理同一 品种+日期 的旧研报集合的缓存"""
+    invalidate_research_summaries(db, [(comm_code, publish_date)])
+    bulk_upsert(
+        db, ResearchSummaryCache,
+        [{
+            "comm_code": comm_code,
+            "publish_date": publish_date,
+            "reports_hash": digest,
+            "reports_count": reports_count,
+            **{field: summary.get(field, "") for field in SUMMARY_FIELDS}
+        }],
+        key_columns=("comm_code", "publish_date", "reports_hash"),
+        update_columns=("reports_count",) + SUMMARY_FIELDS
+    )
+
+
+def precompute_summaries(db: Session, publish_date: date) -> Dict[str, int]:
+    """
+    预计算某日所有品种的研报汇总（已有缓存的跳过）
+
+    Returns:
+        {"varieties", "cached", "computed", "failed"}
+    """
+    reports = db.query(ResearchReport).filter(
+        ResearchReport.publish_date == publish_date
+    ).order_by(ResearchReport.comm_code).all()
+
+    by_code: Dict[str, List[ResearchReport]] = {}
+    for report in reports:
+        by_code.setdefault(report.comm_code, []).append(report)
+
+    stats = {"varieties": 0, "cached": 0, "computed": 0, "failed": 0}
+    for comm_code, code_reports in by_code.items():
+        if sum(1 for r in code_reports if r.trade_logic) <= 1:
+            continue
+        stats["varieties"] += 1
+
+        digest = reports_hash(code_reports)
+        if db.execute(cached_summary_query(comm_code, publish_date, digest)).scalars().first():
+            stats["cached"] += 1
+            continue
+
+        summary, cacheable = build_summary(code_reports)
+        if not cacheable:
+            stats["failed"] += 1
+            continue
+        save_summary(db, comm_code, publish_date, digest, len(code_reports), summary)
+        stats["computed"] += 1
+
+    logger.info(
+        f"[研报汇总] {publish_date} 预计算完成: {stats['varieties']} 个品种, "
+        f"已缓存 {stats['cached']}, 新汇总 {stats['computed']}, 失败 {stats['failed']}"
+    )
+    return stats
+
+
+def run_research_summary_job(publish_date: Optional[date] = None) -> Dict[str, int]:
+    """定时任务入口（线程池中执行），默认预计算最近交易日"""
+    from app.models.database import SessionLocal
+
+    publish_date = publish_date or get_trading_calendar().latest_trading_day()
+    db = SessionLocal()
+    try:
+        return precompute_summaries(db, publish_date)
+    finally:
+        db.close()
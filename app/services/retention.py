@@ -0,0 +1,185 @@
+"""
+数据保留与归档
+高频写入的表（分钟级 OptionFlow、每次采集一条的 DataCollectionLog）不清理会持续膨胀，
+索引无法常驻内存。按表配置保留天数，过期数据：
+1. 按时间列顺序分批读取（每批 RETENTION_BATCH_SIZE 行）
+2. 按日期分区导出到 backups/archive/<表名>/date=YYYY-MM-DD/part-<时间戳>.parquet
+   （依赖 pyarrow；环境中缺少 pyarrow 时降级为 .csv.gz 并告警）
+3. 导出成功后按 id 删除并提交，失败时停止该表的清理，不丢数据
+
+保留天数为 None 的表（如期权资金流向汇总）永久保留，只在报告中列出。
+"""
+import json
+import logging
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Type
+
+import pandas as pd
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.models.data_governance import DataCollectionLog
+from app.models.models import OptionFlow, OptionFlowRollup
+from config.settings import get_settings
+
+try:
+    import pyarrow  # noqa: F401
+    ARCHIVE_FORMAT = "parquet"
+except ImportError:  # requirements.txt 已包含 pyarrow，缺失时降级为 gzip 压缩的 CSV
+    ARCHIVE_FORMAT = "csv.gz"
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = Path(__file__).parent.parent.parent / "backups" / "archive"
+
+
+@dataclass
+class RetentionPolicy:
+    """单表保留策略"""
+    model: Type
+    time_column: str
+    keep_days: Optional[int]  # None 表示永久保留
+
+    @property
+    def table_name(self) -> str:
+        return self.model.__tablename__
+
+    def cutoff(self, today: Optional[date] = None) -> Optional[datetime]:
+        """早于该时间的数据过期（按天取整）"""
+        if self.keep_days is None:
+            return None
+        today = today or date.today()
+        return datetime.combine(today - timedelta(days=self.keep_days), datetime.min.time())
+
+
+def default_policies() -> List[RetentionPolicy]:
+    settings = get_settings()
+    return [
+        RetentionPolicy(OptionFlow, "record_time", settings.RETENTION_OPTION_FLOW_DAYS),
+        RetentionPolicy(OptionFlowRollup, "bucket_start", None),
+        RetentionPolicy(DataCollectionLog, "collect_time", settings.RETENTION_COLLECTION_LOG_DAYS),
+    ]
+
+
+def option_flow_cutoff() -> Optional[datetime]:
+    """OptionFlow 原始记录的保留起点，早于该时间的原始记录已归档删除，汇总无法再由原始记录重建"""
+    return RetentionPolicy(OptionFlow, "record_time", get_settings().RETENTION_OPTION_FLOW_DAYS).cutoff()
+
+
+def _write_partition(df: pd.DataFrame, directory: Path, stamp: str) -> Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"part-{stamp}.{ARCHIVE_FORMAT}"
+    # 先写临时文件再改名，避免留下不完整的分区文件
+    tmp_path = path.with_name(path.name + ".tmp")
+    if ARCHIVE_FORMAT == "parquet":
+        df.to_parquet(tmp_path, index=False, compression="zstd")
+    else:
+        df.to_csv(tmp_path, index=False, compression="gzip")
+    tmp_path.replace(path)
+    return path
+
+
+def archive_batch(policy: RetentionPolicy, rows: List[Dict], archive_dir: Path = ARCHIVE_DIR) -> List[Path]:
+    """把一批过期行按日期分区导出"""
+    df = pd.DataFrame(rows)
+    # JSON 列（dict/list）序列化为字符串，保证各分区列类型一致
+    for column in df.columns[df.dtypes == object]:
+        if df[column].map(lambda v: isinstance(v, (dict, list))).any():
+            df[column] = df[column].map(
+                lambda v: json.dumps(v, ensure_ascii=False) if isinstance(v, (dict, list)) else v
+            )
+    partition = pd.to_datetime(df[policy.time_column]).dt.strftime("%Y-%m-%d")
+    stamp = f"{datetime.now():%Y%m%d_%H%M%S_%f}_{int(df['id'].min())}"
+    return [
+        _write_partition(part, archive_dir / policy.table_name / f"date={day}", stamp)
+        for day, part in df.groupby(partition, sort=True)
+    ]
+
+
+def apply_policy(
+    db: Session,
+    policy: RetentionPolicy,
+    batch_size: int,
+    archive_dir: Path = ARCHIVE_DIR,
+    dry_run: bool = False
+) -> Dict:
+    """
+    归档并删除一张表的过期数据
+
+    Returns:
+        {"table", "cutoff", "archived", "files", "elapsed_seconds"}；dry_run 时 archived 为待处理行数
+    """
+    started = time.perf_counter()
+    result = {"table": policy.table_name, "cutoff": None, "archived": 0, "files": 0}
+    cutoff = policy.cutoff()
+    if cutoff is None:
+        result["elapsed_seconds"] = 0
+        return result
+    result["cutoff"] = cutoff.isoformat()
+
+    table = policy.model.__table__
+    time_col = table.c[policy.time_column]
+    if dry_run:
+        result["archived"] = db.query(policy.model).filter(time_col < cutoff).count()
+        result["elapsed_seconds"] = round(time.perf_counter() - started, 2)
+        return result
+
+    while True:
+        rows = [
+            dict(row) for row in db.execute(
+                select(table).where(time_col < cutoff).order_by(time_col, table.c.id).limit(batch_size)
+            ).mappings()
+        ]
+        if not rows:
+            break
+
+        try:
+            files = archive_batch(policy, rows, archive_dir)
+        except Exception as e:
+            logger.error(f"[数据保留] {policy.table_name} 导出失败，停止清理: {e}")
+            db.rollback()
+            break
+
+        db.execute(delete(table).where(table.c.id.in_([row["id"] for row in rows])))
+        db.commit()
+        result["archived"] += len(rows)
+        result["files"] += len(files)
+        logger.info(f"[数据保留] {policy.table_name} 已归档并删除 {result['archived']} 行")
+
+        if len(rows) < batch_size:
+            break
+
+    result["elapsed_seconds"] = round(time.perf_counter() - started, 2)
+    return result
+
+
+def apply_retention(
+    db: Session,
+    policies: Optional[List[RetentionPolicy]] = None,
+    archive_dir: Path = ARCHIVE_DIR,
+    dry_run: bool = False
+) -> List[Dict]:
+    """按策略清理所有表"""
+    batch_size = get_settings().RETENTION_BATCH_SIZE
+    if ARCHIVE_FORMAT != "parquet" and not dry_run:
+        logger.warning("[数据保留] 未安装 pyarrow，归档降级为 csv.gz，请按 requirements.txt 安装依赖")
+    results = []
+    for policy in policies or default_policies():
+        if policy.keep_days is None:
+            logger.info(f"[数据保留] {policy.table_name} 永久保留")
+        results.append(apply_policy(db, policy, batch_size, archive_dir, dry_run))
+    return results
+
+
+def run_retention_job(dry_run: bool = False) -> List[Dict]:
+    """定时任务入口（线程池中执行）"""
+    from app.models.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return apply_retention(db, dry_run=dry_run)
+    finally:
+        db.close()
@@ -0,0 +1,243 @@
+"""
+后台脚本任务
+接口触发的外部脚本（如 V2 分析系统）以异步子进程运行，不阻塞事件循环：
+1. start 立即返回任务，同名任务运行中时不重复启动
+2. 逐行读取脚本输出，保留最近的日志并解析 "当前/总数" 形式的进度
+3. 超时终止子进程；成功后执行回调（如清理结果缓存）
+
+状态轮询：get(job_id).to_dict(since=上次返回的 next_offset) 只返回新增日志。
+"""
+import asyncio
+import logging
+import os
+import re
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 日志中形如 "12/61" 的进度
+PROGRESS_PATTERN = re.compile(r"(\d+)\s*/\s*(\d+)")
+
+# 保留的历史任务数
+MAX_JOB_HISTORY = 20
+
+# 子进程输出单行的最大字节数（asyncio 默认 64 KiB），超出的行丢弃
+OUTPUT_LINE_LIMIT = 1024 * 1024
+
+# 日志中保留的单行最大字符数
+MAX_LOG_LINE_CHARS = 2000
+
+RUNNING_STATUSES = ("pending", "running")
+
+
+@dataclass
+class ScriptJob:
+    """一次脚本运行"""
+    job_id: str
+    name: str
+    command: List[str]
+    max_log_lines: int = 500
+    status: str = "pending"  # pending/running/succeeded/failed/timeout/cancelled
+    created_at: datetime = field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    returncode: Optional[int] = None
+    error: Optional[str] = None
+    progress: Optional[float] = None
+    lines_total: int = 0
+    logs: Deque[str] = field(default_factory=deque)
+
+    @property
+    def running(self) -> bool:
+        return self.status in RUNNING_STATUSES
+
+    def append_log(self, line: str):
+        self.logs.append(line)
+        if len(self.logs) > self.max_log_lines:
+            self.logs.popleft()
+        self.lines_total += 1
+
+        match = PROGRESS_PATTERN.search(line)
+        if match:
+            current, total = int(match.group(1)), int(match.group(2))
+            if 0 < total and current <= total:
+                self.progress = round(current / total, 4)
+
+    def to_dict(self, since: int = 0) -> Dict:
+        """
+        任务状态
+
+        Args:
+            since: 日志偏移（上次返回的 next_offset），只返回之后的日志
+        """
+        first_kept = self.lines_total - len(self.logs)
+        start = max(since, first_kept) - first_kept
+        end_time = self.finished_at or datetime.now()
+        return {
+            "job_id": self.job_id,
+            "name": self.name,
+            "status": self.status,
+            "progress": 1.0 if self.status == "succeeded" else self.progress,
+            "created_at": self.created_at.isoformat(timespec="seconds"),
+            "started_at": self.started_at.isoformat(timespec="seconds") if self.started_at else None,
+            "finished_at": self.finished_at.isoformat(timespec="seconds") if self.finished_at else None,
+            "elapsed_seconds": round((end_time - self.started_at).total_seconds(), 1) if self.started_at else 0,
+            "returncode": self.returncode,
+            "error": self.error,
+            "logs": list(self.logs)[start:],
+            "next_offset": self.lines_total,
+        }
+
+
+class ScriptJobManager:
+    """后台脚本任务管理"""
+
+    def __init__(self, max_history: int = MAX_JOB_HISTORY):
+        self.max_history = max_history
+        self._jobs: "OrderedDict[str, ScriptJob]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._processes: Dict[str, asyncio.subprocess.Process] = {}
+
+    def start(
+        self,
+        name: str,
+        command: List[str],
+        cwd: Optional[Path] = None,
+        timeout: Optional[float] = None,
+        max_log_lines: int = 500,
+        on_success: Optional[Callable[[ScriptJob], None]] = None
+    ) -> Tuple[ScriptJob, bool]:
+        """
+        启动脚本（需在事件循环中调用，立即返回）
+
+        Returns:
+            (任务, 是否新启动)；同名任务运行中时返回该任务和 False
+        """
+        current = self.latest(name)
+        if current is not None and current.running:
+            return current, False
+
+        job = ScriptJob(
+            job_id=uuid.uuid4().hex[:12],
+            name=name,
+            command=list(command),
+            max_log_lines=max_log_lines
+        )
+        self._jobs[job.job_id] = job
+        while len(self._jobs) > self.max_history:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if oldest.running:
+                break
+            self._jobs.pop(oldest_id)
+
+        self._tasks[job.job_id] = asyncio.create_task(self._run(job, cwd, timeout, on_success))
+        logger.info(f"[{name}] 任务已启动: {job.job_id}")
+        return job, True
+
+    def get(self, job_id: str) -> Optional[ScriptJob]:
+        return self._jobs.get(job_id)
+
+    def latest(self, name: str) -> Optional[ScriptJob]:
+        """最近一次同名任务"""
+        for job in reversed(self._jobs.values()):
+            if job.name == name:
+                return job
+        return None
+
+    async def _run(
+        self,
+        job: ScriptJob,
+        cwd: Optional[Path],
+        timeout: Optional[float],
+        on_success: Optional[Callable[[ScriptJob], None]]
+    ):
+        env = {**os.environ, "PYTHONUNBUFFERED": "1", "PYTHONIOENCODING": "utf-8"}
+        job.started_at = datetime.now()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *job.command,
+                cwd=str(cwd) if cwd else None,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                env=env,
+                limit=OUTPUT_LINE_LIMIT
+            )
+            self._processes[job.job_id] = process
+            job.status = "running"
+
+            try:
+                await asyncio.wait_for(self._read_output(job, process), timeout=timeout)
+                job.returncode = await process.wait()
+            except asyncio.TimeoutError:
+                process.kill()
+                job.returncode = await process.wait()
+                job.status = "timeout"
+                job.error = f"运行超时（>{timeout}秒）"
+            else:
+                if job.returncode == 0:
+                    job.status = "succeeded"
+                else:
+                    job.status = "failed"
+                    job.error = f"退出码 {job.returncode}"
+        except asyncio.CancelledError:
+            process = self._processes.get(job.job_id)
+            if process is not None and process.returncode is None:
+                process.kill()
+            job.status = "cancelled"
+            raise
+        except Exception as e:
+            # 读取输出出错时终止子进程，避免脚本脱离管理继续运行
+            process = self._processes.get(job.job_id)
+            if process is not None and process.returncode is None:
+                process.kill()
+                job.returncode = await process.wait()
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now()
+            self._processes.pop(job.job_id, None)
+            self._tasks.pop(job.job_id, None)
+
+        logger.info(f"[{job.name}] 任务结束: {job.job_id} {job.status}")
+        if job.status == "succeeded" and on_success is not None:
+            try:
+                on_success(job)
+            except Exception as e:
+                logger.error(f"[{job.name}] 完成回调失败: {e}")
+
+    @staticmethod
+    async def _read_output(job: ScriptJob, process: asyncio.subprocess.Process):
+        while True:
+            try:
+                line = await process.stdout.readline()
+            except ValueError:
+                # 单行超过 OUTPUT_LINE_LIMIT：readline 已丢弃缓冲区中的该行，继续读取后续输出
+                job.append_log(f"[日志行超过 {OUTPUT_LINE_LIMIT} 字节，已丢弃]")
+                continue
+            if not line:
+                break
+            job.append_log(line.decode("utf-8", errors="replace").rstrip()[:MAX_LOG_LINE_CHARS])
+
+    async def shutdown(self):
+        """终止运行中的任务"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+_manager: Optional[ScriptJobManager] = None
+
+
+def get_script_job_manager() -> ScriptJobManager:
+    """获取后台脚本任务管理器单例"""
+    global _manager
+    if _manager is None:
+        _manager = ScriptJobManager()
+    return _manager
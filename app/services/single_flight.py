@@ -0,0 +1,74 @@
+"""
+请求合并（single-flight）
+数据缺失时接口会实时爬取上游，多个并发请求同一 (接口, 日期) 时只应爬取一次：
+1. do(key, fn)：同一 key 已有进行中的任务时直接等待其结果，否则启动新任务
+2. start(key, fn)：后台启动（已在进行中则不重复启动），调用方立即返回"pending"
+
+任务以独立的 asyncio.Task 运行，发起请求的客户端断开不会取消共享的任务；
+任务结束后从进行中列表移除，下一次缺失时重新爬取。
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """按 key 合并并发的异步任务"""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    def start(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[asyncio.Task, bool]:
+        """
+        启动任务（需在事件循环中调用，立即返回）
+
+        Returns:
+            (任务, 是否新启动)；同一 key 进行中时返回该任务和 False
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            return task, False
+
+        task = asyncio.create_task(fn())
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._finish(key, t))
+        return task, True
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """执行或等待同一 key 的任务，返回其结果（任务异常时抛出同一异常）"""
+        task, started = self.start(key, fn)
+        if not started:
+            logger.info(f"[single-flight] 等待进行中的任务: {key}")
+        # shield：当前请求被取消时不取消共享任务
+        return await asyncio.shield(task)
+
+    async def shutdown(self):
+        """取消进行中的任务"""
+        tasks = list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            self._inflight.pop(key)
+        if not task.cancelled() and task.exception() is not None:
+            # 后台任务可能没有等待方，这里记录异常
+            logger.error(f"[single-flight] 任务失败 {key}: {task.exception()}")
+
+
+_single_flight: Optional[SingleFlight] = None
+
+
+def get_single_flight() -> SingleFlight:
+    """获取请求合并单例"""
+    global _single_flight
+    if _single_flight is None:
+        _single_flight = SingleFlight()
+    return _single_flight
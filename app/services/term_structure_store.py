@@ -0,0 +1,166 @@
+"""
+期限结构快照存取
+更新脚本每次运行后把各品种的合约曲线写入 term_structure_snapshots（品种+日期+合约 一行），
+接口按日期查询历史曲线；返回结构与 data/term_structure_data*.json 中的品种数据一致。
+"""
+import logging
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.models import TermStructureSnapshot
+from app.services.ingestion import bulk_upsert, UpsertResult
+
+logger = logging.getLogger(__name__)
+
+# 市场结构 -> (结构描述, 交易建议, 建议理由)
+STRUCTURE_DESCRIPTIONS = {
+    "正向市场": (
+        "远期合约价格高于近期合约，市场预期价格上涨",
+        "做空",
+        "Contango结构下，远期合约价格偏高，适合做空远期合约",
+    ),
+    "反向市场": (
+        "近期合约价格高于远期合约，市场预期价格下跌或现货紧张",
+        "做多",
+        "Backwardation结构下，近期合约价格偏高，现货紧张，适合做多",
+    ),
+    "平坦市场": (
+        "各合约价格基本持平",
+        "观望",
+        "期限结构平坦，暂无明显套利机会",
+    ),
+    "数据不足": ("", "无", ""),
+}
+
+SNAPSHOT_UPDATE_COLUMNS = [
+    "variety_name", "month", "price", "volume", "open_interest", "source",
+    "market_structure", "grade", "structure_score", "recommend"
+]
+
+
+def snapshot_rows(all_data: Dict[str, Dict]) -> List[Dict]:
+    """更新脚本生成的 {品种代码: 品种数据} -> 快照记录（每个合约一行）"""
+    rows = []
+    for code, variety in all_data.items():
+        for contract in variety["contracts"]:
+            rows.append({
+                "comm_code": code,
+                "variety_name": variety["variety_name"],
+                "trade_date": date.fromisoformat(contract["date"]),
+                "symbol": contract["symbol"],
+                "month": contract["month"],
+                "price": contract["price"],
+                "volume": contract.get("volume", 0),
+                "open_interest": contract.get("open_interest", 0),
+                "source": contract.get("source"),
+                "market_structure": variety["market_structure"],
+                "grade": variety.get("grade", "C"),
+                "structure_score": variety.get("structure_score", 0),
+                "recommend": bool(variety.get("recommend", False)),
+            })
+    return rows
+
+
+def save_snapshots(db: Session, all_data: Dict[str, Dict]) -> UpsertResult:
+    """写入快照：按 品种+日期+合约 已存在则更新，否则新增"""
+    return bulk_upsert(
+        db, TermStructureSnapshot, snapshot_rows(all_data),
+        key_columns=("comm_code", "trade_date", "symbol"),
+        update_columns=SNAPSHOT_UPDATE_COLUMNS
+    )
+
+
+def resolve_snapshot_date(db: Session, query_date: Optional[date] = None) -> Optional[date]:
+    """不晚于 query_date 的最近一个快照日期（query_date 为空时取最新）"""
+    query = db.query(func.max(TermStructureSnapshot.trade_date))
+    if query_date is not None:
+        query = query.filter(TermStructureSnapshot.trade_date <= query_date)
+    return query.scalar()
+
+
+def load_structures(
+    db: Session,
+    snapshot_date: date,
+    recommended_only: bool = False,
+    comm_code: Optional[str] = None
+) -> Dict[str, Dict]:
+    """
+    读取某一日期的期限结构
+
+    Returns:
+        {品种代码: 品种数据}，结构与 term_structure_data*.json 相同
+    """
+    query = db.query(TermStructureSnapshot).filter(TermStructureSnapshot.trade_date == snapshot_date)
+    if comm_code:
+        query = query.filter(TermStructureSnapshot.comm_code == comm_code)
+    if recommended_only:
+        query = query.filter(TermStructureSnapshot.recommend.is_(True))
+    rows = query.order_by(TermStructureSnapshot.comm_code, TermStructureSnapshot.month).all()
+    return _group_varieties(rows)
+
+
+def load_variety_history(
+    db: Session,
+    comm_code: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+) -> List[Dict]:
+    """
+    单个品种的历史曲线，按日期升序
+
+    Returns:
+        [品种数据 + {"date": YYYY-MM-DD}, ...]
+    """
+    query = db.query(TermStructureSnapshot).filter(TermStructureSnapshot.comm_code == comm_code)
+    if start_date:
+        query = query.filter(TermStructureSnapshot.trade_date >= start_date)
+    if end_date:
+        query = query.filter(TermStructureSnapshot.trade_date <= end_date)
+    rows = query.order_by(TermStructureSnapshot.trade_date, TermStructureSnapshot.month).all()
+
+    by_date: "OrderedDict[date, List[TermStructureSnapshot]]" = OrderedDict()
+    for row in rows:
+        by_date.setdefault(row.trade_date, []).append(row)
+    return [
+        {"date": trade_date.isoformat(), **_group_varieties(day_rows)[comm_code]}
+        for trade_date, day_rows in by_date.items()
+    ]
+
+
+def _group_varieties(rows: List[TermStructureSnapshot]) -> Dict[str, Dict]:
+    """按品种组装合约行（rows 已按品种、月份排序）"""
+    varieties: Dict[str, Dict] = {}
+    for row in rows:
+        variety = varieties.get(row.comm_code)
+        if variety is None:
+            desc, suggestion, reason = STRUCTURE_DESCRIPTIONS.get(row.market_structure, ("", "无", ""))
+            updated_at = row.updated_at or row.created_at
+            variety = varieties[row.comm_code] = {
+                "variety_code": row.comm_code,
+                "variety_name": row.variety_name,
+                "market_structure": row.market_structure,
+                "structure_desc": desc,
+                "trade_suggestion": suggestion,
+                "trade_reason": reason,
+                "contracts": [],
+                "total_contracts": 0,
+                "structure_score": row.structure_score,
+                "grade": row.grade,
+                "recommend": row.recommend,
+                "update_time": updated_at.strftime("%Y-%m-%d %H:%M:%S") if updated_at else "",
+            }
+        variety["contracts"].append({
+            "symbol": row.symbol,
+            "month": row.month,
+            "price": row.price,
+            "volume": row.volume,
+            "open_interest": row.open_interest,
+            "date": row.trade_date.isoformat(),
+            "source": row.source,
+        })
+        variety["total_contracts"] += 1
+    return varieties
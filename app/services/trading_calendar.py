@@ -0,0 +1,322 @@
+"""
+交易日历服务
+从本地文件 data/trading_calendar.json 加载：
+1. 交易所节假日（周末自动视为休市）
+2. 各交易所日盘交易时段
+3. 各品种所属交易所及夜盘时段（无夜盘品种 night 为 null）
+
+并提供 APScheduler 触发器，使定时任务只在真实交易时段/交易日触发。
+
+夜盘规则：交易日 D 的晚上有夜盘，当且仅当下一个交易日就是 D 之后的第一个工作日
+（即长假前最后一个交易日没有夜盘，周五夜盘正常）。
+"""
+import json
+import logging
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple, Iterable
+
+from apscheduler.triggers.base import BaseTrigger
+from apscheduler.util import astimezone, localize
+
+logger = logging.getLogger(__name__)
+
+CALENDAR_FILE = Path(__file__).parent.parent.parent / "data" / "trading_calendar.json"
+
+# 交易所所在时区，交易时段均按北京时间配置
+EXCHANGE_TIMEZONE = "Asia/Shanghai"
+
+# 向后搜索交易时段的最大天数（覆盖春节等长假）
+MAX_LOOKAHEAD_DAYS = 30
+
+Session = Tuple[datetime, datetime]
+
+
+def _parse_time(value: str) -> time:
+    return datetime.strptime(value, "%H:%M").time()
+
+
+class TradingCalendar:
+    """交易日历"""
+
+    def __init__(self, config_path: Path = CALENDAR_FILE):
+        self.config_path = Path(config_path)
+        self.holidays: Set[date] = set()
+        self.day_sessions: Dict[str, List[Tuple[time, time]]] = {}
+        self.variety_exchange: Dict[str, str] = {}
+        self.night_sessions: Dict[str, Tuple[time, time]] = {}
+        self.load()
+
+    def load(self):
+        """加载（或重新加载）日历文件"""
+        with open(self.config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+
+        self.holidays = {
+            datetime.strptime(d, "%Y-%m-%d").date()
+            for days in config.get('holidays', {}).values()
+            for d in days
+        }
+        self.day_sessions = {
+            exchange: [(_parse_time(start), _parse_time(end)) for start, end in item['day']]
+            for exchange, item in config.get('exchanges', {}).items()
+        }
+        self.variety_exchange = {}
+        self.night_sessions = {}
+        for code, item in config.get('varieties', {}).items():
+            self.variety_exchange[code.upper()] = item['exchange']
+            if item.get('night'):
+                start, end = item['night']
+                self.night_sessions[code.upper()] = (_parse_time(start), _parse_time(end))
+
+        logger.info(
+            f"交易日历已加载: {len(self.holidays)} 个节假日, "
+            f"{len(self.variety_exchange)} 个品种, {len(self.night_sessions)} 个夜盘品种"
+        )
+
+    # ----------------------------------------
+    # 交易日
+    # ----------------------------------------
+    def is_trading_day(self, d: date) -> bool:
+        """是否为交易日"""
+        return d.weekday() < 5 and d not in self.holidays
+
+    def next_trading_day(self, d: date) -> date:
+        """d 之后的下一个交易日（不含 d）"""
+        d += timedelta(days=1)
+        while not self.is_trading_day(d):
+            d += timedelta(days=1)
+        return d
+
+    def previous_trading_day(self, d: date) -> date:
+        """d 之前的上一个交易日（不含 d）"""
+        d -= timedelta(days=1)
+        while not self.is_trading_day(d):
+            d -= timedelta(days=1)
+        return d
+
+    def latest_trading_day(self, ref: Optional[date] = None) -> date:
+        """截至 ref（默认今天）的最近一个交易日（含 ref）"""
+        ref = ref or date.today()
+        return ref if self.is_trading_day(ref) else self.previous_trading_day(ref)
+
+    def trading_days(self, start: date, end: date) -> List[date]:
+        """[start, end] 区间内的所有交易日"""
+        days = []
+        d = start
+        while d <= end:
+            if self.is_trading_day(d):
+                days.append(d)
+            d += timedelta(days=1)
+        return days
+
+    def has_night_session(self, d: date) -> bool:
+        """交易日 d 的晚上是否有夜盘"""
+        if not self.is_trading_day(d):
+            return False
+        next_weekday = d + timedelta(days=1)
+        while next_weekday.weekday() >= 5:
+            next_weekday += timedelta(days=1)
+        return self.next_trading_day(d) == next_weekday
+
+    # ----------------------------------------
+    # 交易时段
+    # ----------------------------------------
+    def exchange_of(self, variety: str) -> Optional[str]:
+        """品种所属交易所"""
+        return self.variety_exchange.get(variety.upper())
+
+    def sessions(
+        self,
+        d: date,
+        varieties: Optional[Iterable[str]] = None,
+        exchanges: Optional[Iterable[str]] = None
+    ) -> List[Session]:
+        """
+        自然日 d 开始的所有交易时段（已合并重叠时段，按开始时间排序）
+
+        夜盘跨越午夜时结束时间落在 d+1。
+
+        Args:
+            d: 自然日
+            varieties: 限定品种，如 ['RB', 'AU']
+            exchanges: 限定交易所，如 ['SHFE']；两者都为空时取全部品种的并集
+        """
+        if not self.is_trading_day(d):
+            return []
+
+        varieties = [v.upper() for v in varieties] if varieties else None
+        if varieties is not None:
+            exchange_set = {self.variety_exchange[v] for v in varieties if v in self.variety_exchange}
+        elif exchanges is not None:
+            exchange_set = set(exchanges)
+        else:
+            exchange_set = set(self.day_sessions)
+
+        if varieties is None:
+            varieties = [v for v, ex in self.variety_exchange.items() if ex in exchange_set]
+
+        intervals: List[Session] = []
+        for exchange in exchange_set:
+            for start, end in self.day_sessions.get(exchange, []):
+                intervals.append((datetime.combine(d, start), datetime.combine(d, end)))
+
+        if self.has_night_session(d):
+            for variety in varieties:
+                night = self.night_sessions.get(variety)
+                if not night:
+                    continue
+                start, end = night
+                end_day = d + timedelta(days=1) if end <= start else d
+                intervals.append((datetime.combine(d, start), datetime.combine(end_day, end)))
+
+        return self._merge(intervals)
+
+    def is_in_session(
+        self,
+        dt: Optional[datetime] = None,
+        varieties: Optional[Iterable[str]] = None,
+        exchanges: Optional[Iterable[str]] = None
+    ) -> bool:
+        """dt（默认现在）是否处于交易时段内"""
+        dt = dt or datetime.now()
+        # 凌晨时段可能属于前一自然日开始的夜盘
+        for d in (dt.date() - timedelta(days=1), dt.date()):
+            for start, end in self.sessions(d, varieties, exchanges):
+                if start <= dt <= end:
+                    return True
+        return False
+
+    def next_session_time(
+        self,
+        dt: datetime,
+        varieties: Optional[Iterable[str]] = None,
+        exchanges: Optional[Iterable[str]] = None
+    ) -> Optional[datetime]:
+        """不早于 dt 的第一个交易时刻（dt 在时段内则返回 dt 本身）"""
+        varieties = list(varieties) if varieties else None
+        exchanges = list(exchanges) if exchanges else None
+        d = dt.date() - timedelta(days=1)
+        for _ in range(MAX_LOOKAHEAD_DAYS + 1):
+            for start, end in self.sessions(d, varieties, exchanges):
+                if dt <= end:
+                    return max(dt, start)
+            d += timedelta(days=1)
+        return None
+
+    @staticmethod
+    def _merge(intervals: List[Session]) -> List[Session]:
+        merged: List[Session] = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
+
+
+# ========================================
+# APScheduler 触发器
+# ========================================
+class TradingSessionTrigger(BaseTrigger):
+    """
+    交易时段内按固定间隔触发，非交易时段（午休、收盘后、周末、节假日）不唤醒
+
+    例：TradingSessionTrigger(minutes=1) 在所有品种交易时段内每分钟触发一次
+    """
+
+    def __init__(
+        self,
+        minutes: int = 0,
+        seconds: int = 0,
+        varieties: Optional[List[str]] = None,
+        exchanges: Optional[List[str]] = None,
+        calendar: Optional[TradingCalendar] = None,
+        timezone: str = EXCHANGE_TIMEZONE
+    ):
+        self.interval = timedelta(minutes=minutes, seconds=seconds) or timedelta(minutes=1)
+        self.varieties = varieties
+        self.exchanges = exchanges
+        self.calendar = calendar or get_trading_calendar()
+        self.timezone = astimezone(timezone)
+
+    def get_next_fire_time(self, previous_fire_time, now):
+        if previous_fire_time:
+            candidate = previous_fire_time + self.interval
+        else:
+            candidate = now
+        # 日历按北京时间的 naive datetime 计算
+        local = candidate.astimezone(self.timezone).replace(tzinfo=None, microsecond=0)
+        next_time = self.calendar.next_session_time(local, self.varieties, self.exchanges)
+        if next_time is None:
+            return None
+        return localize(next_time, self.timezone)
+
+    def __str__(self):
+        return f"trading_session[interval={self.interval}]"
+
+    def __repr__(self):
+        return (
+            f"<{self.__class__.__name__} (interval={self.interval!r}, "
+            f"varieties={self.varieties!r}, exchanges={self.exchanges!r})>"
+        )
+
+
+class TradingDayTrigger(BaseTrigger):
+    """
+    仅在交易日的固定时刻触发（替代每天触发的 CronTrigger）
+
+    Args:
+        hour, minute: 触发时刻（北京时间）
+        night_session_only: 仅在当晚有夜盘的交易日触发（如夜盘前的提示类任务）
+    """
+
+    def __init__(
+        self,
+        hour: int,
+        minute: int = 0,
+        night_session_only: bool = False,
+        calendar: Optional[TradingCalendar] = None,
+        timezone: str = EXCHANGE_TIMEZONE
+    ):
+        self.fire_time = time(hour, minute)
+        self.night_session_only = night_session_only
+        self.calendar = calendar or get_trading_calendar()
+        self.timezone = astimezone(timezone)
+
+    def get_next_fire_time(self, previous_fire_time, now):
+        base = previous_fire_time + timedelta(seconds=1) if previous_fire_time else now
+        local = base.astimezone(self.timezone).replace(tzinfo=None)
+        d = local.date()
+        for _ in range(MAX_LOOKAHEAD_DAYS + 1):
+            candidate = datetime.combine(d, self.fire_time)
+            if candidate >= local and self._matches(d):
+                return localize(candidate, self.timezone)
+            d += timedelta(days=1)
+        return None
+
+    def _matches(self, d: date) -> bool:
+        if self.night_session_only:
+            return self.calendar.has_night_session(d)
+        return self.calendar.is_trading_day(d)
+
+    def __str__(self):
+        return f"trading_day[{self.fire_time.strftime('%H:%M')}]"
+
+    def __repr__(self):
+        return (
+            f"<{self.__class__.__name__} (time='{self.fire_time.strftime('%H:%M')}', "
+            f"night_session_only={self.night_session_only})>"
+        )
+
+
+# 全局单例
+_trading_calendar: Optional[TradingCalendar] = None
+
+
+def get_trading_calendar() -> TradingCalendar:
+    """获取交易日历单例"""
+    global _trading_calendar
+    if _trading_calendar is None:
+        _trading_calendar = TradingCalendar()
+    return _trading_calendar
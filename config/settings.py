@@ -27,6 +27,49 @@ class Settings(BaseSettings):
     # 飞书告警配置
     FEISHU_WEBHOOK: str = ""  # 飞书机器人 Webhook URL
 
+    # 浏览器池配置
+    BROWSER_POOL_MAX_BROWSERS: int = 1  # 常驻 Chromium 实例数
+    BROWSER_POOL_MAX_CONTEXTS: int = 4  # 同时租出的上下文上限
+    BROWSER_POOL_MAX_CONTEXT_USES: int = 50  # 上下文复用次数上限，超过后重建
+    BROWSER_POOL_MAX_BROWSER_CONTEXTS: int = 200  # 单个浏览器创建上下文上限，超过后重启
+
+    # 交易可查席位爬取
+    JYK_POSITIONS_CONCURRENCY: int = 3  # 并发页面数，1为串行
+    JYK_RATE_LIMIT: float = 0.5  # 每秒请求数（令牌补充速率）
+    JYK_RATE_BURST: int = 2  # 令牌桶容量（允许突发请求数）
+
+    # 智汇期讯研报分页拉取
+    ZHIHUI_REPORT_PAGE_SIZE: int = 100  # 每页研报数
+    ZHIHUI_REPORT_CONCURRENCY: int = 4  # 并发请求页数
+
+    # 定时任务执行器
+    JOB_THREAD_WORKERS: int = 4  # 阻塞I/O任务线程池大小
+    JOB_PROCESS_WORKERS: int = 2  # CPU密集任务进程池大小
+    LOOP_LAG_INTERVAL: float = 0.5  # 事件循环延迟采样间隔（秒）
+    LOOP_LAG_WARN_THRESHOLD: float = 0.2  # 事件循环延迟告警阈值（秒）
+
+    # 增量分析
+    ANALYSIS_INCREMENTAL_INTERVAL_MINUTES: int = 10  # 按变更日志重算的间隔（分钟）
+
+    # V2分析脚本
+    ANALYSIS_V2_REFRESH_TIMEOUT: int = 300  # 单次运行超时（秒）
+    ANALYSIS_V2_LOG_LINES: int = 500  # 每个任务保留的日志行数
+
+    # HTTP缓存与压缩
+    HTTP_CACHE_VERSION_TTL: float = 2.0  # 数据版本探测结果的复用时间（秒）
+    HTTP_CACHE_MAX_ENTRIES: int = 256  # 缓存的响应数上限
+    HTTP_COMPRESS_MIN_SIZE: int = 1024  # 超过该字节数的JSON响应才压缩
+
+    # 首页看板
+    DASHBOARD_CACHE_TTL: int = 300  # 当前交易日看板的缓存时间（秒），历史日期不过期
+    DASHBOARD_FLOW_DAYS: int = 7  # 资金流向趋势的天数
+    DASHBOARD_OPTION_FLOW_HOURS: int = 24  # 期权资金流向的汇总时长（小时）
+
+    # 数据保留与归档（过期数据先导出到 backups/archive 再删除）
+    RETENTION_OPTION_FLOW_DAYS: int = 30  # 期权资金流向原始记录保留天数（汇总表永久保留）
+    RETENTION_COLLECTION_LOG_DAYS: int = 90  # 采集日志保留天数
+    RETENTION_BATCH_SIZE: int = 5000  # 每批归档并删除的行数
+
     # 项目配置
     DEBUG: bool = True
     LOG_LEVEL: str = "INFO"
@@ -11,6 +11,7 @@ from datetime import date
 sys.path.append(str(Path(__file__).parent))
 
 from app.crawlers.jiaoyikecha_spider import JiaoyiKechaSpider
+from app.crawlers.browser_pool import close_browser_pool
 from app.models.database import SessionLocal
 from app.models.models import DailyBlueprint
 
@@ -98,6 +99,7 @@ async def main():
         db.rollback()
     finally:
         await spider.close()
+        await close_browser_pool()
         db.close()
         print("=" * 60)
         print("✅ 完成")
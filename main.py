@@ -6,7 +6,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from app.models.database import init_db
-from app.routers import summary, fundamental, capital, technical, daily, data_governance
+from app.middleware.http_cache import HttpCacheMiddleware
+from app.routers import summary, fundamental, capital, technical, daily, data_governance, dashboard
 import logging
 from pathlib import Path
 
@@ -23,6 +24,9 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# ETag/304 与响应压缩（先注册，位于 CORS 内层）
+app.add_middleware(HttpCacheMiddleware)
+
 # 配置CORS
 app.add_middleware(
     CORSMiddleware,
@@ -34,6 +38,7 @@ app.add_middleware(
 
 # 注册路由
 app.include_router(summary.router, prefix="/api/v1/summary", tags=["总览"])
+app.include_router(dashboard.router, prefix="/api/v1/dashboard", tags=["看板"])
 app.include_router(fundamental.router, prefix="/api/v1/fundamental", tags=["基本面"])
 app.include_router(capital.router, prefix="/api/v1/capital", tags=["资金面"])
 app.include_router(technical.router, prefix="/api/v1/technical", tags=["技术面"])
@@ -69,12 +74,34 @@ async def startup_event():
     init_scheduler()
     start_scheduler()
 
+    # 预热浏览器池（分钟级 Openvlab 任务免去冷启动）
+    from app.crawlers.browser_pool import get_browser_pool
+    try:
+        await get_browser_pool().warmup(['openvlab'])
+    except Exception as e:
+        logger.warning(f"浏览器池预热失败，将在首次爬取时启动: {e}")
+
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """关闭时停止定时任务"""
     from app.scheduler import stop_scheduler
     stop_scheduler()
+
+    from app.services.job_runner import get_job_runner
+    await get_job_runner().shutdown()
+
+    from app.services.script_jobs import get_script_job_manager
+    await get_script_job_manager().shutdown()
+
+    from app.services.single_flight import get_single_flight
+    await get_single_flight().shutdown()
+
+    from app.crawlers.browser_pool import close_browser_pool
+    await close_browser_pool()
+
+    from app.models.database import dispose_async_engine
+    await dispose_async_engine()
     logger.info("应用关闭完成")
 
 
@@ -4,14 +4,14 @@
 import sys
 import logging
 from pathlib import Path
-from datetime import date, datetime
+from datetime import date
 
 # 添加项目路径
 sys.path.insert(0, str(Path(__file__).parent))
 
 from app.crawlers.zhihui_spider import ZhihuiQixunSpider
 from app.models.database import SessionLocal
-from app.models.models import MarketFullView, ResearchReport
+from app.services.ingestion import upsert_full_view, insert_research_reports
 
 logging.basicConfig(
     level=logging.INFO,
@@ -38,51 +38,8 @@ def main():
 
             db = SessionLocal()
             try:
-                today = date.today()
-                saved_count = 0
-                updated_count = 0
-
-                for item in full_view:
-                    existing = db.query(MarketFullView).filter(
-                        MarketFullView.comm_code == item['variety_code'],
-                        MarketFullView.record_date == today
-                    ).first()
-
-                    if existing:
-                        # 更新现有记录
-                        existing.excessive_num = item['excessive_num']
-                        existing.excessive_ratio = item['excessive_ratio']
-                        existing.neutral_num = item['neutral_num']
-                        existing.neutral_ratio = item['neutral_ratio']
-                        existing.empty_num = item['empty_num']
-                        existing.empty_ratio = item['empty_ratio']
-                        existing.total_num = item['sum']
-                        existing.more_port = item['more_port']
-                        existing.more_rate = item['more_rate']
-                        existing.main_sentiment = item['main_sentiment']
-                        updated_count += 1
-                    else:
-                        # 创建新记录
-                        record = MarketFullView(
-                            comm_code=item['variety_code'],
-                            variety_name=item['variety_name'],
-                            record_date=today,
-                            excessive_num=item['excessive_num'],
-                            excessive_ratio=item['excessive_ratio'],
-                            neutral_num=item['neutral_num'],
-                            neutral_ratio=item['neutral_ratio'],
-                            empty_num=item['empty_num'],
-                            empty_ratio=item['empty_ratio'],
-                            total_num=item['sum'],
-                            more_port=item['more_port'],
-                            more_rate=item['more_rate'],
-                            main_sentiment=item['main_sentiment']
-                        )
-                        db.add(record)
-                        saved_count += 1
-
-                db.commit()
-                logger.info(f"✅ 多空全景数据已保存: 新增{saved_count}条, 更新{updated_count}条")
+                written = upsert_full_view(db, full_view, date.today())
+                logger.info(f"✅ 多空全景数据已保存: 新增{written.inserted}条, 更新{written.updated}条")
             finally:
                 db.close()
 
@@ -140,37 +97,8 @@ def main():
         if total_reports:
             db = SessionLocal()
             try:
-                saved_count = 0
-                skipped_count = 0
-
-                for report_dict in total_reports:
-                    # 检查是否已存在
-                    existing = db.query(ResearchReport).filter(
-                        ResearchReport.report_id == report_dict['report_id']
-                    ).first()
-
-                    if not existing:
-                        report = ResearchReport(
-                            report_id=report_dict['report_id'],
-                            comm_code=report_dict['variety_code'],
-                            variety_name=report_dict['variety'],
-                            institution_id=report_dict['institution_id'],
-                            institution_name=report_dict['institution_name'],
-                            publish_date=datetime.strptime(report_dict['publish_date'], '%Y-%m-%d').date(),
-                            view_port=report_dict['view_port'],
-                            sentiment=report_dict['sentiment'],
-                            trade_logic=report_dict['trade_logic'],
-                            related_data=report_dict['related_data'],
-                            risk_factor=report_dict['risk_factor'],
-                            report_link=report_dict['link']
-                        )
-                        db.add(report)
-                        saved_count += 1
-                    else:
-                        skipped_count += 1
-
-                db.commit()
-                logger.info(f"\n✅ 研报数据已保存到数据库: 新增{saved_count}条, 已存在{skipped_count}条")
+                written = insert_research_reports(db, total_reports)
+                logger.info(f"\n✅ 研报数据已保存到数据库: 新增{written.inserted}条, 已存在{written.skipped}条")
             finally:
                 db.close()
 
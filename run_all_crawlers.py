@@ -4,8 +4,10 @@ from app.crawlers.zhihui_spider import ZhihuiQixunSpider
 from app.crawlers.fangqi_spider import FangqiSpider
 from app.crawlers.rongda_spider import RongdaSpider
 from app.crawlers.openvlab_spider import OpenvlabSpider
+from app.crawlers.browser_pool import close_browser_pool
 # from app.crawlers.jiaoyikecha_spider import JiaoyiKechaSpider # JYK might be slow/need login, skip for quick demo or try later
 from app.services.analysis import AnalysisService
+from app.services.option_flow_rollup import apply_option_flows
 from app.models.database import SessionLocal
 from app.models.models import FundamentalReport, TechnicalIndicator, ContractInfo, Commodity, OptionFlow
 from datetime import datetime
@@ -112,6 +114,7 @@ async def run_crawlers():
     await ov_spider.init_browser(headless=True)
     try:
         flow_data = await ov_spider.fetch_option_flow_data()
+        flows = []
         for item in flow_data:
             flow = OptionFlow(
                 comm_code=item.get('variety', ''),
@@ -122,11 +125,14 @@ async def run_crawlers():
                 record_time=datetime.now()
             )
             db.add(flow)
+            flows.append(flow)
+        apply_option_flows(db, flows)
         db.commit()
     except Exception as e:
         logger.error(f"Openvlab Error: {e}")
     finally:
         await ov_spider.close()
+        await close_browser_pool()
 
     # 5. Run Analysis
     logger.info("Running Analysis...")
@@ -15,11 +15,13 @@ from app.crawlers.zhihui_spider import ZhihuiQixunSpider
 from app.crawlers.fangqi_spider import FangqiSpider
 from app.crawlers.jiaoyikecha_spider import JiaoyiKechaSpider
 from app.crawlers.openvlab_spider import OpenvlabSpider
+from app.crawlers.browser_pool import close_browser_pool
 from app.models.database import SessionLocal
 from app.models.models import (
     DailyBlueprint, FundamentalReport,
     InstitutionalPosition, OptionFlow
 )
+from app.services.option_flow_rollup import apply_option_flows
 
 logging.basicConfig(
     level=logging.INFO,
@@ -218,6 +220,7 @@ async def crawl_openvlab():
         if option_flow:
             db = SessionLocal()
             try:
+                records = []
                 for item in option_flow:
                     flow_record = OptionFlow(
                         comm_code=item.get('variety', ''),
@@ -229,7 +232,9 @@ async def crawl_openvlab():
                         created_at=datetime.now()
                     )
                     db.add(flow_record)
+                    records.append(flow_record)
 
+                apply_option_flows(db, records)
                 db.commit()
                 print(f"✅ Openvlab: 成功保存 {len(option_flow)} 条数据")
             finally:
@@ -257,6 +262,7 @@ async def main():
     await crawl_fangqi()
     await crawl_jiaoyikecha()
     await crawl_openvlab()
+    await close_browser_pool()
 
     end_time = datetime.now()
     duration = (end_time - start_time).total_seconds()
@@ -0,0 +1,37 @@
+"""
+数据保留与归档脚本
+按保留策略把过期数据导出到 backups/archive 后删除（定时任务每天 03:30 自动执行）
+
+示例：
+    python scripts/apply_retention.py --dry-run
+    python scripts/apply_retention.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import logging
+
+from app.services.retention import ARCHIVE_FORMAT, run_retention_job
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='数据保留与归档')
+    parser.add_argument('--dry-run', action='store_true', help='只统计过期行数，不导出不删除')
+    args = parser.parse_args()
+
+    logger.info(f"归档格式: {ARCHIVE_FORMAT}")
+    for result in run_retention_job(dry_run=args.dry_run):
+        if result["cutoff"] is None:
+            logger.info(f"  {result['table']:<24} 永久保留")
+            continue
+        action = "待归档" if args.dry_run else "已归档"
+        logger.info(
+            f"  {result['table']:<24} 早于 {result['cutoff']} {action} {result['archived']} 行, "
+            f"文件 {result['files']} 个, 耗时 {result['elapsed_seconds']}s"
+        )
@@ -0,0 +1,56 @@
+"""
+四维分析历史回填脚本
+规则调整后按日期区间并行重算 MarketAnalysisSummary，中断后再次执行相同命令即可续跑
+
+示例：
+    python scripts/backfill_analysis.py 2024-01-01 2025-12-31 --workers 8
+    python scripts/backfill_analysis.py 2025-06-01 2025-06-30 --codes RB HC --restart
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import logging
+from datetime import date
+
+from app.services.backfill import AnalysisBackfill
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='四维分析历史回填')
+    parser.add_argument('start_date', type=date.fromisoformat, help='开始日期 YYYY-MM-DD')
+    parser.add_argument('end_date', type=date.fromisoformat, help='结束日期 YYYY-MM-DD')
+    parser.add_argument('--workers', type=int, default=4, help='进程数')
+    parser.add_argument('--chunk-days', type=int, default=20, help='每块天数（检查点粒度）')
+    parser.add_argument('--all-days', action='store_true', help='包含非交易日')
+    parser.add_argument('--codes', nargs='+', help='限定品种代码，默认全部')
+    parser.add_argument('--run-id', type=str, help='检查点标识，默认按日期区间生成')
+    parser.add_argument('--restart', action='store_true', help='忽略检查点，从头开始')
+
+    args = parser.parse_args()
+
+    backfill = AnalysisBackfill(
+        args.start_date,
+        args.end_date,
+        workers=args.workers,
+        chunk_days=args.chunk_days,
+        trading_days_only=not args.all_days,
+        comm_codes=args.codes,
+        run_id=args.run_id
+    )
+
+    try:
+        result = backfill.run(restart=args.restart)
+    except KeyboardInterrupt:
+        logger.warning(f"\n⚠️ 回填已中断，再次执行相同命令可从检查点续跑 (run_id: {backfill.run_id})")
+        sys.exit(130)
+    except Exception as e:
+        logger.error(f"\n❌ 回填失败: {e}")
+        sys.exit(1)
+
+    logger.info(f"\n✅ 回填完成: {result['total_days']} 天, 写入 {result['records_written']} 条")
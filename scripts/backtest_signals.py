@@ -0,0 +1,93 @@
+"""
+四维信号回测脚本
+日线首次使用前需拉取到本地缓存（--refresh-bars），之后回测只读本地缓存
+
+示例：
+    python scripts/backtest_signals.py 2024-01-01 2025-12-31 --refresh-bars
+    python scripts/backtest_signals.py 2025-01-01 2025-06-30 --horizons 1 5 20 --codes RB HC
+    python scripts/backtest_signals.py 2025-01-01 2025-06-30 --recompute --output result.json
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import logging
+from datetime import date, timedelta
+
+from app.models.database import SessionLocal
+from app.services.backtest import backtest_signals, get_bar_cache, DIMENSIONS
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def _pct(value):
+    return "-" if value is None else f"{value * 100:.2f}%"
+
+
+def print_report(result):
+    """按持有期打印汇总"""
+    logger.info(
+        f"\n样本 {result['samples']} 条, 品种 {result['matched_varieties']} 个, "
+        f"耗时 {result['elapsed_seconds']}s"
+    )
+    for horizon, stats in result["horizons"].items():
+        logger.info(f"\n持有 {horizon} 日:")
+        for name in ["direction", "long", "short"]:
+            s = stats[name]
+            logger.info(
+                f"  {name:<12} 信号 {s['signals']:>6}  胜率 {_pct(s['hit_rate']):>8}  "
+                f"平均收益 {_pct(s['avg_return']):>8}"
+            )
+        for dim in DIMENSIONS:
+            s = stats["dimensions"][dim]
+            logger.info(
+                f"  {dim:<12} 信号 {s['signals']:>6}  胜率 {_pct(s['hit_rate']):>8}  "
+                f"平均收益 {_pct(s['avg_return']):>8}  IC {s['ic'] if s['ic'] is not None else '-'}"
+            )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='四维信号回测')
+    parser.add_argument('start_date', type=date.fromisoformat, help='信号开始日期 YYYY-MM-DD')
+    parser.add_argument('end_date', type=date.fromisoformat, help='信号结束日期 YYYY-MM-DD')
+    parser.add_argument('--horizons', type=int, nargs='+', default=[1, 5, 10], help='持有期（交易日）')
+    parser.add_argument('--codes', nargs='+', help='限定品种代码，默认全部')
+    parser.add_argument('--recompute', action='store_true', help='按当前规则重算得分（不写库）')
+    parser.add_argument('--entry-lag', type=int, default=1, help='信号日之后第几个交易日收盘入场')
+    parser.add_argument('--refresh-bars', action='store_true', help='先从优矿拉取区间日线到本地缓存')
+    parser.add_argument('--output', type=str, help='结果另存为 JSON 文件')
+
+    args = parser.parse_args()
+
+    if args.refresh_bars:
+        # 多拉一段，保证区间末尾的信号也有前瞻收益
+        bars_end = min(args.end_date + timedelta(days=max(args.horizons) * 2 + 10), date.today())
+        get_bar_cache().refresh(args.start_date, bars_end)
+
+    db = SessionLocal()
+    try:
+        result = backtest_signals(
+            db,
+            args.start_date,
+            args.end_date,
+            horizons=sorted(set(args.horizons)),
+            comm_codes=[c.upper() for c in args.codes] if args.codes else None,
+            recompute=args.recompute,
+            entry_lag=args.entry_lag
+        )
+    except Exception as e:
+        logger.error(f"\n❌ 回测失败: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+    print_report(result)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        logger.info(f"\n结果已保存: {args.output}")
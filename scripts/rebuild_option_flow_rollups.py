@@ -0,0 +1,45 @@
+"""
+按原始记录重建期权资金流向汇总（option_flow_rollups）
+首次上线汇总表、补录历史数据或汇总与原始记录不一致时运行
+
+注意：原始记录只保留 RETENTION_OPTION_FLOW_DAYS 天（更早的已归档删除），
+开始日期早于保留起点时自动截断到保留起点，更早的汇总保持不变。
+
+示例：
+    python scripts/rebuild_option_flow_rollups.py 2025-01-01 2025-06-30
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import logging
+from datetime import date, datetime, time, timedelta
+
+from app.models.database import SessionLocal, init_db
+from app.services.option_flow_rollup import rebuild_rollups
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='重建期权资金流向汇总')
+    parser.add_argument('start_date', type=date.fromisoformat, help='开始日期 YYYY-MM-DD')
+    parser.add_argument('end_date', type=date.fromisoformat, help='结束日期 YYYY-MM-DD（含）')
+    args = parser.parse_args()
+
+    # 确保汇总表已创建
+    init_db()
+
+    db = SessionLocal()
+    try:
+        count = rebuild_rollups(
+            db,
+            datetime.combine(args.start_date, time.min),
+            datetime.combine(args.end_date + timedelta(days=1), time.min)
+        )
+        logger.info(f"重建完成: 原始记录 {count} 条")
+    finally:
+        db.close()
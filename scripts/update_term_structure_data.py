@@ -4,10 +4,16 @@
 
 数据源优先级:
 1. AKShare新浪数据 (主要)
-2. 直接爬取交易所网站 (备用)
+2. 直接爬取交易所网站 (备用) - 每个交易所每个交易日的日行情文件只下载解析一次,
+   以gzip压缩JSON缓存在 data/exchange_daily_cache/ 下,合约查询走内存字典
 3. 本地缓存数据 (降级)
 """
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
 import akshare as ak
+import gzip
 import json
 import requests
 from datetime import datetime, timedelta
@@ -17,9 +23,180 @@ import time
 import re
 from bs4 import BeautifulSoup
 
+from app.services.trading_calendar import get_trading_calendar
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 交易所日行情文件缓存目录
+EXCHANGE_CACHE_DIR = Path(__file__).parent.parent / "data" / "exchange_daily_cache"
+
+# 交易所备用数据源回溯天数
+EXCHANGE_LOOKBACK_DAYS = 10
+
+
+class ExchangeDailyCache:
+    """
+    交易所日行情文件缓存
+
+    每个(交易所, 交易日)的日行情文件最多下载解析一次:
+    - 内存: {(交易所, 日期): {合约代码: 行情}}
+    - 磁盘: data/exchange_daily_cache/{交易所}_{日期}.json.gz,跨进程复用
+    下载失败(未发布/休市)只记录在内存中,下次运行会重新尝试。
+    """
+
+    def __init__(self, session: requests.Session, cache_dir: Path = EXCHANGE_CACHE_DIR):
+        self.session = session
+        self.cache_dir = cache_dir
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._memory = {}
+        self._downloaders = {
+            'czce': self._download_czce,
+            'dce': self._download_dce,
+            'shfe': self._download_shfe,
+        }
+
+    def get_day(self, exchange: str, date_str: str):
+        """
+        获取某交易所某日的全部合约行情
+
+        Args:
+            exchange: czce/dce/shfe
+            date_str: 日期 YYYYMMDD
+        Returns:
+            {合约代码(大写): {"price", "volume", "open_interest"}},文件不可用时返回None
+        """
+        key = (exchange, date_str)
+        if key in self._memory:
+            return self._memory[key]
+
+        cache_file = self.cache_dir / f"{exchange}_{date_str}.json.gz"
+        if cache_file.exists():
+            try:
+                with gzip.open(cache_file, 'rt', encoding='utf-8') as f:
+                    self._memory[key] = json.load(f)
+                return self._memory[key]
+            except Exception as e:
+                logger.warning(f"读取交易所缓存失败 {cache_file.name}: {e}")
+
+        try:
+            day = self._downloaders[exchange](date_str)
+        except Exception as e:
+            logger.debug(f"下载{exchange}日行情失败 {date_str}: {e}")
+            day = None
+
+        self._memory[key] = day
+        if day:
+            with gzip.open(cache_file, 'wt', encoding='utf-8') as f:
+                json.dump(day, f, ensure_ascii=False)
+            logger.info(f"已缓存{exchange}日行情 {date_str}: {len(day)}个合约")
+        return day
+
+    def lookup(self, exchange: str, date_str: str, contract_code: str):
+        """查询单个合约在某日的行情"""
+        day = self.get_day(exchange, date_str)
+        if not day:
+            return None
+        return day.get(contract_code.upper())
+
+    def _download_czce(self, date_str):
+        """郑商所: HTML表格,合约代码为3位数字格式(如SR601)"""
+        url = f"http://www.czce.com.cn/cn/DFSStaticFiles/Future/{date_str[:4]}/{date_str}/FutureDataDaily.htm"
+        response = self.session.get(url, timeout=5)
+        if response.status_code != 200:
+            return None
+
+        response.encoding = 'utf-8'
+        soup = BeautifulSoup(response.text, 'html.parser')
+        table = soup.find('table')
+        if not table:
+            return None
+
+        day = {}
+        for row in table.find_all('tr')[1:]:  # 跳过表头
+            cols = row.find_all('td')
+            if len(cols) < 11:
+                continue
+            code = cols[0].text.strip().upper()
+            if code in day:
+                continue
+            try:
+                settle_price = float(cols[6].text.strip().replace(',', ''))
+                volume = int(cols[9].text.strip().replace(',', ''))
+                open_interest = int(cols[10].text.strip().replace(',', ''))
+            except (ValueError, IndexError):
+                continue
+            if settle_price > 0:
+                day[code] = {"price": settle_price, "volume": volume, "open_interest": open_interest}
+        return day
+
+    def _download_dce(self, date_str):
+        """大商所: POST导出CSV,按行内的合约代码字段建立索引"""
+        url = "http://www.dce.com.cn/publicweb/quotesdata/exportDayQuotesChData.html"
+        data = {
+            'dayQuotes.variety': 'all',
+            'dayQuotes.trade_type': '0',
+            'year': date_str[:4],
+            'month': str(int(date_str[4:6]) - 1),  # 月份从0开始
+            'day': date_str[6:8]
+        }
+        response = self.session.post(url, data=data, timeout=10)
+        if response.status_code != 200:
+            return None
+
+        response.encoding = 'utf-8'
+        day = {}
+        for line in response.text.split('\n'):
+            parts = line.split(',')
+            if len(parts) < 12:
+                continue
+            codes = [p.strip().upper() for p in parts if re.fullmatch(r'[A-Za-z]{1,2}\d{4}', p.strip())]
+            if not codes:
+                continue
+            try:
+                settle_price = float(parts[5].strip().replace(',', ''))
+                volume = int(parts[10].strip().replace(',', ''))
+                open_interest = int(parts[11].strip().replace(',', ''))
+            except (ValueError, IndexError):
+                continue
+            if settle_price > 0:
+                for code in codes:
+                    day.setdefault(code, {"price": settle_price, "volume": volume, "open_interest": open_interest})
+        return day
+
+    def _download_shfe(self, date_str):
+        """上期所: JSON日行情,按PRODUCTID建立索引"""
+        url = f"http://www.shfe.com.cn/data/dailydata/kx/kx{date_str}.dat"
+        response = self.session.get(url, timeout=10)
+        if response.status_code != 200:
+            return None
+
+        day = {}
+        for item in response.json().get('o_curinstrument', []):
+            code = str(item.get('PRODUCTID', '')).strip().upper()
+            if not code or code in day:
+                continue
+            try:
+                settle_price = float(item.get('SETTLEMENTPRICE', 0))
+                volume = int(item.get('VOLUME', 0))
+                open_interest = int(item.get('OPENINTEREST', 0))
+            except (ValueError, TypeError):
+                continue
+            if settle_price > 0:
+                day[code] = {"price": settle_price, "volume": volume, "open_interest": open_interest}
+        return day
+
+
+def recent_trading_dates(lookback_days: int = EXCHANGE_LOOKBACK_DAYS):
+    """最近 lookback_days 个自然日内的交易日(不含今天,由近及远),格式 YYYYMMDD"""
+    calendar = get_trading_calendar()
+    dates = []
+    for days_ago in range(1, lookback_days + 1):
+        current_date = (datetime.now() - timedelta(days=days_ago)).date()
+        if calendar.is_trading_day(current_date):
+            dates.append(current_date.strftime("%Y%m%d"))
+    return dates
+
 
 class FuturesDataFetcher:
     """期货数据获取器 - 支持多数据源"""
@@ -29,6 +206,7 @@ class FuturesDataFetcher:
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
         })
+        self.daily_cache = ExchangeDailyCache(self.session)
 
     def fetch_contract_data_akshare(self, contract_code):
         """
@@ -89,178 +267,43 @@ class FuturesDataFetcher:
         # 例如：SR2601 → SR601
         czce_contract_code = f"{variety_code}{year[1:]}{month}"
         contract_code = f"{variety_code}{year}{month}"  # 标准格式用于返回
-
-        try:
-            # 尝试最近10天的数据（跳过周末和节假日）
-            # 从最近的工作日开始尝试
-            for days_ago in range(1, 11):
-                current_date = datetime.now() - timedelta(days=days_ago)
-                # 跳过周六(5)和周日(6)
-                if current_date.weekday() in [5, 6]:
-                    continue
-
-                date_str = current_date.strftime("%Y%m%d")
-                url = f"http://www.czce.com.cn/cn/DFSStaticFiles/Future/{date_str[:4]}/{date_str}/FutureDataDaily.htm"
-
-                try:
-                    response = self.session.get(url, timeout=5)
-                    if response.status_code != 200:
-                        continue
-
-                    response.encoding = 'utf-8'
-
-                    # 解析HTML表格
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    table = soup.find('table')
-                    if not table:
-                        continue
-
-                    rows = table.find_all('tr')
-                    for row in rows[1:]:  # 跳过表头
-                        cols = row.find_all('td')
-                        if len(cols) >= 11:
-                            code = cols[0].text.strip()
-                            # 匹配合约代码（郑商所格式：如SR601）
-                            if code == czce_contract_code:
-                                try:
-                                    settle_price = float(cols[6].text.strip().replace(',', ''))
-                                    volume = int(cols[9].text.strip().replace(',', ''))
-                                    open_interest = int(cols[10].text.strip().replace(',', ''))
-
-                                    if settle_price > 0:
-                                        return {
-                                            "symbol": contract_code,
-                                            "price": settle_price,
-                                            "volume": volume,
-                                            "open_interest": open_interest,
-                                            "date": date_str,
-                                            "source": "czce"
-                                        }
-                                except (ValueError, IndexError):
-                                    continue
-                except:
-                    continue
-
-            return None
-
-        except Exception as e:
-            logger.debug(f"郑商所获取失败 {contract_code}: {e}")
-            return None
+        return self._fetch_from_exchange_cache('czce', czce_contract_code, contract_code)
 
     def _fetch_from_dce(self, variety_code, year, month):
         """从大商所获取数据"""
         contract_code = f"{variety_code}{year}{month}"
-
-        try:
-            # 尝试最近10天的数据（跳过周末和节假日）
-            for days_ago in range(1, 11):
-                current_date = datetime.now() - timedelta(days=days_ago)
-
-                # 跳过周六(5)和周日(6)
-                if current_date.weekday() in [5, 6]:
-                    continue
-
-                date_str = current_date.strftime("%Y%m%d")
-                url = f"http://www.dce.com.cn/publicweb/quotesdata/exportDayQuotesChData.html"
-
-                try:
-                    # 大商所需要POST请求
-                    data = {
-                        'dayQuotes.variety': 'all',
-                        'dayQuotes.trade_type': '0',
-                        'year': date_str[:4],
-                        'month': str(int(date_str[4:6]) - 1),  # 月份从0开始
-                        'day': date_str[6:8]
-                    }
-
-                    response = self.session.post(url, data=data, timeout=10)
-
-                    if response.status_code != 200:
-                        continue
-
-                    response.encoding = 'utf-8'
-
-                    # 解析CSV格式数据
-                    lines = response.text.split('\n')
-                    for line in lines:
-                        if contract_code in line:
-                            parts = line.split(',')
-                            if len(parts) >= 12:
-                                try:
-                                    settle_price = float(parts[5].strip().replace(',', ''))
-                                    volume = int(parts[10].strip().replace(',', ''))
-                                    open_interest = int(parts[11].strip().replace(',', ''))
-
-                                    if settle_price > 0:
-                                        return {
-                                            "symbol": contract_code,
-                                            "price": settle_price,
-                                            "volume": volume,
-                                            "open_interest": open_interest,
-                                            "date": date_str,
-                                            "source": "dce"
-                                        }
-                                except (ValueError, IndexError):
-                                    continue
-                except:
-                    continue
-
-            return None
-
-        except Exception as e:
-            logger.debug(f"大商所获取失败 {contract_code}: {e}")
-            return None
+        return self._fetch_from_exchange_cache('dce', contract_code, contract_code)
 
     def _fetch_from_shfe(self, variety_code, year, month):
         """从上期所获取数据"""
         contract_code = f"{variety_code.lower()}{year}{month}"
+        return self._fetch_from_exchange_cache('shfe', contract_code, variety_code + year + month)
 
-        try:
-            # 尝试最近10天的数据（跳过周末和节假日）
-            for days_ago in range(1, 11):
-                current_date = datetime.now() - timedelta(days=days_ago)
-
-                # 跳过周六(5)和周日(6)
-                if current_date.weekday() in [5, 6]:
-                    continue
-
-                date_str = current_date.strftime("%Y%m%d")
-                url = f"http://www.shfe.com.cn/data/dailydata/kx/kx{date_str}.dat"
-
-                try:
-                    response = self.session.get(url, timeout=10)
-
-                    if response.status_code != 200:
-                        continue
-
-                    data = response.json()
-
-                    # 查找对应合约
-                    for item in data.get('o_curinstrument', []):
-                        if item.get('PRODUCTID', '').lower() == contract_code.lower():
-                            try:
-                                settle_price = float(item.get('SETTLEMENTPRICE', 0))
-                                volume = int(item.get('VOLUME', 0))
-                                open_interest = int(item.get('OPENINTEREST', 0))
-
-                                if settle_price > 0:
-                                    return {
-                                        "symbol": variety_code + year + month,
-                                        "price": settle_price,
-                                        "volume": volume,
-                                        "open_interest": open_interest,
-                                        "date": date_str,
-                                        "source": "shfe"
-                                    }
-                            except (ValueError, KeyError):
-                                continue
-                except:
-                    continue
+    def _fetch_from_exchange_cache(self, exchange, exchange_contract_code, symbol):
+        """
+        从交易所日行情缓存中查询合约,由近及远尝试最近的交易日
 
+        Args:
+            exchange: czce/dce/shfe
+            exchange_contract_code: 交易所文件中的合约代码
+            symbol: 返回结果中使用的标准合约代码
+        """
+        try:
+            for date_str in recent_trading_dates():
+                quote = self.daily_cache.lookup(exchange, date_str, exchange_contract_code)
+                if quote:
+                    return {
+                        "symbol": symbol,
+                        "price": quote["price"],
+                        "volume": quote["volume"],
+                        "open_interest": quote["open_interest"],
+                        "date": date_str,
+                        "source": exchange
+                    }
             return None
 
         except Exception as e:
-            logger.debug(f"上期所获取失败 {contract_code}: {e}")
+            logger.debug(f"{exchange}获取失败 {symbol}: {e}")
             return None
 
     def fetch_contract_data(self, variety_code, year, month):
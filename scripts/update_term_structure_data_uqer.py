@@ -1,6 +1,7 @@
 """
 期限结构数据更新脚本 - 使用优矿API
 每天15:05运行,获取当日期货各品种合约的收盘数据
+每个交易所的日行情每次运行只下载一次,按合约标的建立索引后生成所有品种的期限结构
 
 数据源:
 1. 优矿API DataAPI.FutuGet - 获取合约信息
@@ -10,9 +11,10 @@ import json
 from datetime import datetime, timedelta
 from pathlib import Path
 import logging
-import time
 from typing import Dict, List, Optional
 
+from app.models.database import SessionLocal
+from app.services.term_structure_store import STRUCTURE_DESCRIPTIONS, save_snapshots
 from app.services.uqer_sdk_client import get_uqer_sdk_client, init_uqer_sdk_client
 from config.settings import get_settings
 import pandas as pd
@@ -97,12 +99,93 @@ class TermStructureUpdaterUqer:
             else:
                 raise ValueError("优矿Token未配置")
 
+    def fetch_contract_index(self, exchanges: List[str]) -> Dict[str, List[Dict]]:
+        """
+        每个交易所只拉取一次最近5天日行情,构建按合约标的分组的合约索引
+
+        Args:
+            exchanges: 交易所代码列表,如 ["XSGE", "XDCE"]
+
+        Returns:
+            {合约标的(小写): 按月份排序的合约列表}
+        """
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=5)  # 取最近5天数据
+
+        contract_index = {}
+        for exchange_cd in exchanges:
+            logger.info(f"获取 {exchange_cd} 全交易所行情数据...")
+            market_data = self.uqer_client.get_futures_daily(
+                begin_date=start_date.strftime("%Y%m%d"),
+                end_date=end_date.strftime("%Y%m%d"),
+                exchange_cd=exchange_cd
+            )
+
+            if market_data is None or market_data.empty:
+                logger.warning(f"{exchange_cd}: 未获取到行情数据")
+                continue
+
+            contract_index.update(self.build_contract_index(market_data))
+
+        return contract_index
+
+    @staticmethod
+    def build_contract_index(market_data: pd.DataFrame) -> Dict[str, List[Dict]]:
+        """
+        将一个交易所的日行情一次性整理为 {合约标的(小写): 合约列表}
+
+        规则与逐品种处理一致:
+        - 每个品种取自身的最新交易日
+        - 合约代码格式 cu2501 (XSGE/XDCE) / SR601 (XZCE, 月份补为 2601)
+        - 价格优先取结算价,其次收盘价,跳过价格无效的合约
+        """
+        if 'contractObject' not in market_data.columns:
+            return {}
+
+        df = market_data.copy()
+        df['tradeDate'] = pd.to_datetime(df['tradeDate'])
+        df['object_key'] = df['contractObject'].astype(str).str.lower()
+
+        # 每个品种各自的最新交易日
+        df = df[df['tradeDate'] == df.groupby('object_key')['tradeDate'].transform('max')]
+
+        # 提取合约前缀和月份,并校验前缀与品种一致
+        ticker = df['ticker'].astype(str)
+        parts = ticker.str.extract(r'^([a-zA-Z]+)(\d{3,4})')
+        df = df.assign(
+            symbol=ticker.str.upper(),
+            prefix=parts[0].str.lower(),
+            month=parts[1].where(parts[1].str.len() == 4, '2' + parts[1])
+        )
+        df = df[df['prefix'] == df['object_key']]
+
+        # 结算价优先,其次收盘价
+        settle = df['settlPrice'].fillna(0) if 'settlPrice' in df.columns else 0
+        close = df['closePrice'].fillna(0) if 'closePrice' in df.columns else 0
+        df = df.assign(price=settle.where(settle > 0, close))
+        df = df[df['price'] > 0]
+
+        df = df.assign(
+            volume=df['turnoverVol'].fillna(0).astype(int),
+            open_interest=df['openInt'].fillna(0).astype(int),
+            date=df['tradeDate'].dt.strftime("%Y-%m-%d"),
+            price=df['price'].astype(float),
+            source="uqer"
+        ).sort_values(['object_key', 'month'])
+
+        columns = ["symbol", "month", "price", "volume", "open_interest", "date", "source"]
+        return {
+            key: group[columns].to_dict('records')
+            for key, group in df.groupby('object_key', sort=False)
+        }
+
     def get_active_contracts_for_variety(
         self,
         variety_code: str,
         variety_name: str,
         contract_object: str,
-        exchange_cd: str
+        exchange_cd: str,
+        contract_index: Optional[Dict[str, List[Dict]]] = None
     ) -> List[Dict]:
         """
         获取指定品种的活跃合约数据
@@ -112,96 +195,20 @@ class TermStructureUpdaterUqer:
             variety_name: 品种中文名,如 "沪铜"
             contract_object: 合约标的(优矿格式),如 "cu"
             exchange_cd: 交易所代码,如 "XSGE"
+            contract_index: fetch_contract_index 构建的索引,为空时单独拉取该交易所
 
         Returns:
             合约列表
         """
         try:
-            # 获取最近的交易日期
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=5)  # 取最近5天数据
-
-            # 直接获取该品种所有合约的行情数据
-            logger.info(f"获取 {variety_code}({variety_name}) 的行情数据...")
-            market_data = self.uqer_client.get_futures_daily(
-                begin_date=start_date.strftime("%Y%m%d"),
-                end_date=end_date.strftime("%Y%m%d"),
-                exchange_cd=exchange_cd
-            )
-
-            if market_data is None or market_data.empty:
-                logger.warning(f"{variety_code}: 未获取到行情数据")
-                return []
-
-            # 过滤出该品种的数据 (按contractObject字段过滤)
-            if 'contractObject' in market_data.columns:
-                market_data = market_data[market_data['contractObject'].str.lower() == contract_object.lower()]
+            if contract_index is None:
+                contract_index = self.fetch_contract_index([exchange_cd])
 
-            if market_data.empty:
+            contracts = contract_index.get(contract_object.lower(), [])
+            if not contracts:
                 logger.warning(f"{variety_code}: 无该品种行情数据")
                 return []
 
-            # 按交易日期取最新
-            market_data['tradeDate'] = pd.to_datetime(market_data['tradeDate'])
-            latest_date = market_data['tradeDate'].max()
-            latest_data = market_data[market_data['tradeDate'] == latest_date]
-
-            # 提取合约代码中的月份
-            import re
-            contracts = []
-
-            for _, row in latest_data.iterrows():
-                ticker = str(row.get('ticker', ''))
-
-                # 提取品种代码和月份
-                # 格式1: cu2501 (XSGE/XDCE) -> cu, 2501
-                # 格式2: SR601 (XZCE) -> SR, 601
-                match = re.match(r'([a-zA-Z]+)(\d{3,4})', ticker, re.IGNORECASE)
-                if not match:
-                    continue
-
-                contract_prefix = match.group(1)
-                month_code = match.group(2)
-
-                # 检查是否匹配当前品种 (忽略大小写)
-                if contract_prefix.lower() != contract_object.lower():
-                    continue
-
-                # 统一月份代码格式为YYMM
-                if len(month_code) == 3:
-                    # XZCE格式: 601 -> 2601
-                    month_code = '2' + month_code
-                elif len(month_code) == 4:
-                    # XSGE/XDCE格式: 2501 -> 2501
-                    pass
-
-                # 提取价格和持仓信息
-                close_price = row.get('closePrice', 0)
-                settle_price = row.get('settlPrice', 0)
-                price = settle_price if settle_price > 0 else close_price
-
-                volume = int(row.get('turnoverVol', 0))
-                open_interest = int(row.get('openInt', 0))
-
-                # 跳过价格无效的合约 (价格<=0 或 nan)
-                if not price or price <= 0 or pd.isna(price):
-                    continue
-
-                contracts.append({
-                    "symbol": ticker.upper(),
-                    "month": month_code,
-                    "price": float(price),
-                    "volume": volume,
-                    "open_interest": open_interest,
-                    "date": row['tradeDate'].strftime("%Y-%m-%d"),
-                    "source": "uqer"
-                })
-
-                logger.info(f"✓ {ticker}: 价格={price}, 持仓={open_interest}, 成交量={volume}")
-
-            # 按月份排序
-            contracts.sort(key=lambda x: x['month'])
-
             logger.info(f"{variety_code}: 成功获取{len(contracts)}个合约")
             return contracts
 
@@ -273,6 +280,18 @@ class TermStructureUpdaterUqer:
         else:
             return "C", total_score, False
 
+    @staticmethod
+    def save_snapshots(all_data: Dict[str, Dict]):
+        """批量写入 term_structure_snapshots，失败不影响 JSON 文件"""
+        db = SessionLocal()
+        try:
+            result = save_snapshots(db, all_data)
+            logger.info(f"快照表写入: 新增{result.inserted}条, 更新{result.updated}条")
+        except Exception as e:
+            logger.error(f"写入期限结构快照失败: {e}")
+        finally:
+            db.close()
+
     def update_all_varieties(self):
         """更新所有品种的期限结构数据"""
         all_data = {}
@@ -285,12 +304,16 @@ class TermStructureUpdaterUqer:
         recommended_count = 0
         failed_varieties = []
 
+        # 每个交易所只下载一次,所有品种共用同一份索引
+        exchanges = sorted({exchange for _, _, exchange in VARIETIES.values()})
+        contract_index = self.fetch_contract_index(exchanges)
+
         for code, (name, contract_obj, exchange) in VARIETIES.items():
             logger.info(f"\n{'='*60}")
             logger.info(f"正在获取 {code}({name}) 的合约数据...")
 
             contracts = self.get_active_contracts_for_variety(
-                code, name, contract_obj, exchange
+                code, name, contract_obj, exchange, contract_index=contract_index
             )
 
             if not contracts or len(contracts) == 0:
@@ -303,32 +326,22 @@ class TermStructureUpdaterUqer:
             if len(prices) >= 2:
                 if prices[0] < prices[-1]:
                     market_structure = "正向市场"
-                    structure_desc = "远期合约价格高于近期合约，市场预期价格上涨"
-                    trade_suggestion = "做空"
-                    trade_reason = "Contango结构下，远期合约价格偏高，适合做空远期合约"
                 elif prices[0] > prices[-1]:
                     market_structure = "反向市场"
-                    structure_desc = "近期合约价格高于远期合约，市场预期价格下跌或现货紧张"
-                    trade_suggestion = "做多"
-                    trade_reason = "Backwardation结构下，近期合约价格偏高，现货紧张，适合做多"
                 else:
                     market_structure = "平坦市场"
-                    structure_desc = "各合约价格基本持平"
-                    trade_suggestion = "观望"
-                    trade_reason = "期限结构平坦，暂无明显套利机会"
 
                 grade, structure_score, recommend = self.classify_term_structure(
                     contracts, market_structure
                 )
             else:
                 market_structure = "数据不足"
-                structure_desc = ""
-                trade_suggestion = "无"
-                trade_reason = ""
                 grade = "C"
                 structure_score = 0
                 recommend = False
 
+            structure_desc, trade_suggestion, trade_reason = STRUCTURE_DESCRIPTIONS[market_structure]
+
             variety_data = {
                 "variety_code": code,
                 "variety_name": name,
@@ -354,8 +367,6 @@ class TermStructureUpdaterUqer:
             else:
                 logger.info(f"{code}({name}): {market_structure}, 等级:{grade}, 得分:{structure_score:.1f}")
 
-            time.sleep(0.2)  # 避免请求过快
-
         # 保存数据
         if all_data:
             data_dir = Path(__file__).parent.parent / "data"
@@ -371,6 +382,9 @@ class TermStructureUpdaterUqer:
             with open(recommended_output_file, 'w', encoding='utf-8') as f:
                 json.dump(recommended_data, f, ensure_ascii=False, indent=2)
 
+            # 写入快照表（按日期保留历史）
+            self.save_snapshots(all_data)
+
             logger.info(f"\n{'='*60}")
             logger.info(f"数据更新完成!")
             logger.info(f"成功更新: {successful_varieties}/{len(VARIETIES)} 个品种")